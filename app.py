@@ -3,21 +3,29 @@ Heads up to future me: This is my first time making a flask app, so I'm going to
 out of this thing and try to treat comments as like learning tools so i can come back and know what tf going on
 """
 
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context, url_for
 from db import get_campsite_by_id
-from weather import get_forecast
+from weather import ForecastPending, get_forecast_range
 from datetime import datetime, timedelta
 from search import (
+    InvalidCursor,
     get_campsite_by_name,
-    search_campsites,
+    search_campsites_page,
+    iter_search_results,
     get_all_forests,
-    get_campsites_for_map,
 )
+from geo import parse_bbox, parse_point
+import map_index
+import metrics
+import suggest
 import json
 
 # Create Flask app
 app = Flask(__name__)
 
+# Request timing + /metrics (turn off with METRICS_ENABLED=false)
+metrics.init_app(app)
+
 def build_weather_summary(forecast):
     """Small helper to turn raw forecast_json into a compact summary for templates.
 
@@ -34,10 +42,6 @@ def build_weather_summary(forecast):
         except Exception:
             return None
 
-    # If we ever decide to store multiple days, treat the first entry as "today".
-    if isinstance(forecast, list) and forecast:
-        forecast = forecast[0]
-
     if not isinstance(forecast, dict):
         return None
 
@@ -61,12 +65,63 @@ def build_weather_summary(forecast):
     except (TypeError, ValueError):
         sky = None
 
+    # Stored forecasts carry their age (see weather.get_forecast_range).
+    age_seconds = forecast.get("age_seconds")
+
     return {
         "date": date,
         "high": temp_max,
         "low": temp_min,
         "precip_in": precip,
         "sky": sky,
+        "stale": bool(forecast.get("stale")),
+        "age_hours": round(age_seconds / 3600) if age_seconds is not None else None,
+    }
+
+
+def location_filters():
+    """Read the optional ``near``/``radius_km``/``bbox`` search arguments.
+
+    e.g. /api/search?near=38.2,-120.0&radius_km=50 or
+    /api/search?bbox=-121,37,-119,39 (west,south,east,north).
+    Raises ValueError if any of them can't be parsed.
+    """
+
+    near_str = request.args.get("near")
+    radius_str = request.args.get("radius_km")
+    bbox_str = request.args.get("bbox")
+
+    radius_km = float(radius_str) if radius_str else None
+    if radius_km is not None and radius_km <= 0:
+        raise ValueError("radius_km must be positive")
+
+    return {
+        "near": parse_point(near_str) if near_str else None,
+        "radius_km": radius_km,
+        "bbox": parse_bbox(bbox_str) if bbox_str else None,
+    }
+
+
+# Search results come back a page at a time. The default page is as big as
+# the old fixed limit so existing callers see the same first page.
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+
+def page_args():
+    """Read ``page_size`` and ``cursor`` (the ``next_cursor`` of the previous page).
+
+    Raises ValueError if page_size isn't a positive number.
+    """
+
+    page_size_str = request.args.get("page_size")
+    page_size = int(page_size_str) if page_size_str else DEFAULT_PAGE_SIZE
+    if page_size <= 0:
+        raise ValueError("page_size must be positive")
+
+    return {
+        "page_size": min(page_size, MAX_PAGE_SIZE),
+        "cursor": request.args.get("cursor") or None,
     }
 
 
@@ -125,29 +180,41 @@ def weather():
     except ValueError:
         return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
 
-    forecast_data = []
+    # Only one day requested unless an end date was given
+    days = (end_date - start_date).days + 1 if end_date else 1
+    dates = [start_date + timedelta(days=i) for i in range(days)]
 
-    try:
-        if not end_date:
-            # Only one day requested
-            forecast = get_forecast(lat, lon, start_date)
-            forecast_data.append(forecast)
+    # stored days come straight from daily_forecasts (with age_seconds and
+    # a stale flag) and never wait on OpenWeather; a day that isn't stored
+    # yet or failed comes back as an error entry (pending=true while the
+    # background refresher is still fetching it)
+    forecast_data = []
+    errors = []
+    pending = 0
+    for day, forecast, error in get_forecast_range(lat, lon, dates):
+        if error is not None:
+            errors.append(str(error))
+            entry = {"date": day.strftime("%Y-%m-%d"), "error": str(error)}
+            if isinstance(error, ForecastPending):
+                entry["pending"] = True
+                pending += 1
+            forecast_data.append(entry)
         else:
-            # loop through the dates and get the weather for each day
-            days = (end_date - start_date).days + 1
-            for i in range(days):
-                current_day = start_date + timedelta(days=i)
-                forecast = get_forecast(lat, lon, current_day)
-                forecast_data.append(forecast)
-    except Exception as e:
-        return jsonify({"error": "Failed to fetch weather", "details": str(e)}), 500
+            forecast_data.append(forecast)
 
-    return jsonify({
+    if dates and len(errors) == len(dates) and not pending:
+        return jsonify({"error": "Failed to fetch weather", "details": errors[0]}), 500
+
+    payload = {
         "site_id": site_id,
         "lat": lat,
         "lon": lon,
         "forecast": forecast_data
-    })
+    }
+    # 202: nothing to show yet, try again shortly
+    if dates and len(errors) == len(dates):
+        return jsonify(payload), 202
+    return jsonify(payload)
 
 @app.route("/api/search")
 def search():
@@ -155,7 +222,18 @@ def search():
 
     Filters are applied *first* and then fuzzy text search (if provided)
     runs inside that filtered subset. A text query is optional so users can
-    search using only filters.
+    search using only filters. Location filters (``near``/``radius_km`` and
+    ``bbox``) work the same way; see ``location_filters``.
+
+    Results are paged: the body is still a JSON list (``page_size`` long at
+    most) and the ``X-Next-Cursor`` header carries the ``cursor`` to send
+    for the next page (absent on the last one). ``stream=true`` instead
+    streams every result from ``cursor`` onwards as one JSON list, fetched
+    page by page, so big result sets never sit in memory all at once.
+
+    ``facets=true`` (ignored when streaming) wraps the page as
+    ``{"results": [...], "facets": {...}}``, where the facets count every
+    match per forest and per open/water/restrooms flag.
     """
 
     query = request.args.get("query") or ""
@@ -165,23 +243,63 @@ def search():
     has_water_flag = request.args.get("has_water") == "true"
     has_restrooms_flag = request.args.get("has_restrooms") == "true"
     forest = request.args.get("forest") or None
+    stream = request.args.get("stream") == "true"
+    facets = request.args.get("facets") == "true" and not stream
 
     try:
-        matches = search_campsites(
-            query=query or None,
-            is_open=is_open_flag if is_open_flag else None,
-            has_water=has_water_flag if has_water_flag else None,
-            has_restrooms=has_restrooms_flag if has_restrooms_flag else None,
-            forest=forest,
-            limit=200,
-        )
+        location = location_filters()
+    except ValueError as e:
+        return jsonify({"error": "Invalid location filter", "details": str(e)}), 400
+
+    try:
+        paging = page_args()
+    except ValueError as e:
+        return jsonify({"error": "Invalid page_size", "details": str(e)}), 400
+
+    search_args = dict(
+        query=query or None,
+        is_open=is_open_flag if is_open_flag else None,
+        has_water=has_water_flag if has_water_flag else None,
+        has_restrooms=has_restrooms_flag if has_restrooms_flag else None,
+        forest=forest,
+        **location,
+    )
+
+    try:
+        page = search_campsites_page(**search_args, **paging, facets=facets)
+    except InvalidCursor as e:
+        # decode_cursor rejects cursors that don't belong to this search
+        return jsonify({"error": "Invalid cursor", "details": str(e)}), 400
     except Exception as e:
         return jsonify({"error": "Search failed", "details": str(e)}), 500
 
-    if not matches:
+    if stream:
+        # The first page was fetched above so errors still get a proper
+        # status code; the rest is pulled lazily as the client reads.
+        def generate():
+            yield "["
+            for i, result in enumerate(page["results"]):
+                yield ("," if i else "") + app.json.dumps(result)
+            if page["next_cursor"]:
+                rest = iter_search_results(
+                    page_size=paging["page_size"], cursor=page["next_cursor"], **search_args
+                )
+                for result in rest:
+                    yield "," + app.json.dumps(result)
+            yield "]"
+
+        return Response(stream_with_context(generate()), mimetype="application/json")
+
+    if not page["results"] and not paging["cursor"]:
         return jsonify({"message": "No matches found"}), 404
 
-    return jsonify(matches)
+    if facets:
+        response = jsonify({"results": page["results"], "facets": page["facets"]})
+    else:
+        response = jsonify(page["results"])
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    return response
 
 @app.route("/results")
 def results():
@@ -189,7 +307,9 @@ def results():
 
     This uses the same filter-first search pipeline as ``/api/search`` but
     always returns HTML instead of JSON. A text query is optional; users can
-    browse using only filters.
+    browse using only filters. Long result lists get a "Next page" link that
+    carries the ``cursor`` (see ``page_args``), and the facet counts link to
+    the same search narrowed to a forest or amenity.
     """
 
     query = request.args.get("query") or ""
@@ -202,16 +322,55 @@ def results():
     end_str = request.args.get("end")
 
     try:
-        campsites = search_campsites(
+        location = location_filters()
+    except ValueError as e:
+        return f"Invalid location filter: {e}", 400
+
+    try:
+        paging = page_args()
+    except ValueError as e:
+        return f"Invalid page_size: {e}", 400
+
+    try:
+        page = search_campsites_page(
             query=query or None,
             is_open=is_open_flag if is_open_flag else None,
             has_water=has_water_flag if has_water_flag else None,
             has_restrooms=has_restrooms_flag if has_restrooms_flag else None,
             forest=forest,
-            limit=200,
+            **location,
+            **paging,
+            facets=True,
         )
+    except InvalidCursor as e:
+        return f"Invalid cursor: {e}", 400
     except Exception as e:
         return f"Search failed: {e}", 500
+    campsites = page["results"]
+
+    # Same search, next page: keep every argument and swap in the new cursor.
+    next_url = None
+    if page["next_cursor"]:
+        next_args = request.args.to_dict()
+        next_args["cursor"] = page["next_cursor"]
+        next_url = url_for("results", **next_args)
+
+    # Each facet links to this search with that one filter added (and the
+    # cursor dropped, since the result set changes).
+    base_args = request.args.to_dict()
+    base_args.pop("cursor", None)
+    facets = page["facets"]
+    facet_links = {
+        "forests": [
+            dict(f, url=url_for("results", **dict(base_args, forest=f["forest_name"])))
+            for f in facets["forests"]
+        ],
+        "flags": [
+            {"label": label, "count": facets[flag], "active": request.args.get(flag) == "true",
+             "url": url_for("results", **dict(base_args, **{flag: "true"}))}
+            for flag, label in (("is_open", "Open"), ("has_water", "Water"), ("has_restrooms", "Restrooms"))
+        ],
+    }
 
     # Attach normalized weather summaries for the template.
     enriched = []
@@ -227,6 +386,9 @@ def results():
         campsites=enriched,
         start_date=start_str,
         end_date=end_str,
+        next_url=next_url,
+        facets=facets,
+        facet_links=facet_links,
     )
 
 
@@ -237,14 +399,48 @@ def map_campsites():
     Limited to campsites that have coordinates and belong to a National
     Forest so the map highlights match the California reference map
     conceptually.
+
+    With ``bbox=west,south,east,north`` and ``zoom`` the response only covers
+    the visible area: per-forest clusters (count + centroid) at low zoom and
+    individual campsites once zoomed in. Without them it returns every point
+    like it always did.
     """
 
+    bbox_str = request.args.get("bbox")
+    zoom = request.args.get("zoom", type=int)
+
+    try:
+        bbox = parse_bbox(bbox_str) if bbox_str else None
+    except ValueError as e:
+        return jsonify({"error": "Invalid bbox", "details": str(e)}), 400
+
     try:
-        sites = get_campsites_for_map()
+        if bbox is None and zoom is None:
+            return jsonify(map_index.all_points())
+        payload = map_index.query_map(bbox=bbox, zoom=zoom)
     except Exception as e:
         return jsonify({"error": "Failed to load map data", "details": str(e)}), 500
 
-    return jsonify(sites)
+    return jsonify(payload)
+
+
+@app.route("/api/suggest")
+def suggest_names():
+    """Typeahead for the search box: ``?q=<partial text>&limit=<n>``.
+
+    Returns up to ``limit`` (default 8, max 20) campsite/forest names whose
+    normalized text starts with ``q``, topped up with close typo matches.
+    """
+
+    q = request.args.get("q", "")
+    limit = request.args.get("limit", default=suggest.DEFAULT_LIMIT, type=int)
+
+    try:
+        suggestions = suggest.suggest(q, limit=limit)
+    except Exception as e:
+        return jsonify({"error": "Failed to load suggestions", "details": str(e)}), 500
+
+    return jsonify(suggestions)
 
 
 @app.route("/campsite/<int:campsite_id>")
@@ -289,16 +485,21 @@ def campsite(campsite_id):
 
     daily_forecast = []
     if lat is not None and lon is not None:
-        try:
-            days = (end_date - start_date).days + 1
-            for i in range(max(days, 1)):
-                current_day = start_date + timedelta(days=i)
-                raw = get_forecast(lat, lon, current_day)
-                summary = build_weather_summary(raw)
-                if summary:
-                    daily_forecast.append(summary)
-        except Exception:
-            daily_forecast = []
+        days = (end_date - start_date).days + 1
+        dates = [start_date + timedelta(days=i) for i in range(max(days, 1))]
+        # Stored days come from daily_forecasts without waiting on the API
+        # (stale ones are refreshed in the background); days we don't have
+        # yet get a placeholder card instead of vanishing.
+        for day, raw, error in get_forecast_range(lat, lon, dates):
+            summary = build_weather_summary(raw) if error is None else None
+            if summary:
+                daily_forecast.append(summary)
+            else:
+                daily_forecast.append({
+                    "date": day.strftime("%Y-%m-%d"),
+                    "unavailable": True,
+                    "pending": isinstance(error, ForecastPending),
+                })
 
     return render_template(
         "campsite.html",
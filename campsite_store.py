@@ -0,0 +1,211 @@
+"""Columnar in-memory copy of the campsite search rows.
+
+The whole catalogue is small enough to keep resident, so instead of a SQL
+round trip per search (just to apply three checkboxes and a forest LIKE),
+search.py loads every ``campsite_search`` row once into a ``CampsiteStore``
+and filters it in-process:
+
+* each row is a ``CampsiteRecord``: a tuple in the same column order as the
+  SQL rows (so the search code handles both alike) with no per-row dict;
+* names and forest names are interned, so the ~20 forest strings exist once;
+* coordinates are also kept as float64 NumPy columns for bbox filtering;
+* ``is_open`` / ``water`` / ``restrooms`` and every forest get a packed
+  bitmap (one bit per row), so any combination of filters is a few bitwise
+  ANDs over ``rows / 8`` bytes.
+
+Rows are kept in id order, which is the order the SQL search returned them
+in, so ranking ties come out the same either way.
+
+Memory budget, per 100k sites (measured with tracemalloc on synthetic data
+from scripts/synthetic_data.py; ``nbytes()`` covers the NumPy parts):
+
+* id + coordinate columns: 2.4 MB (3 x 8 bytes per row)
+* bitmaps: 12.5 KB each, so ~0.3 MB for the three flags and ~20 forests
+* browse order: 0.8 MB index array + ~7 MB of sort-key tuples
+* records: ~12 MB of tuples
+
+That is ~25 MB of structure. The row values it points at come on top, about
+55 MB in the same test and mostly the per-site forecast JSON (~0.65 KB for
+each site that has one); names and forests are interned, so they are shared.
+search.py builds the new store before dropping the old one, so budget for
+twice the total (~160 MB per 100k sites) while it reloads.
+"""
+
+import bisect
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+FLAGS = ("is_open", "water", "restrooms")
+
+
+class CampsiteRecord(
+    namedtuple(
+        "CampsiteRecord",
+        "id name forest_name latitude longitude is_open forecast_json water restrooms",
+    )
+):
+    """One search row, in ``search._SEARCH_SELECT`` column order."""
+
+    __slots__ = ()
+
+
+def _pack(bools):
+    return np.packbits(np.asarray(bools, dtype=bool))
+
+
+# Set bits per byte value, for counting rows in a packed bitmap.
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+
+def _count(bits):
+    return int(_POPCOUNT[bits].sum())
+
+
+def _float_column(values):
+    return np.array([float(v) if v is not None else np.nan for v in values], dtype=np.float64)
+
+
+class CampsiteStore:
+    """Every campsite search row, held column-wise with bitmap filter indexes."""
+
+    def __init__(self, rows, version=None):
+        self.version = version
+
+        intern = sys.intern
+        records = []
+        for row in sorted(rows, key=lambda r: r[0]):
+            site_id, name, forest_name, *rest = row
+            records.append(
+                CampsiteRecord(
+                    site_id,
+                    intern(name) if name is not None else None,
+                    intern(forest_name) if forest_name is not None else None,
+                    *rest,
+                )
+            )
+        self.records = records
+        self.size = n = len(records)
+
+        self.ids = np.fromiter((r.id for r in records), dtype=np.int64, count=n)
+        self.latitude = _float_column([r.latitude for r in records])
+        self.longitude = _float_column([r.longitude for r in records])
+
+        # Same truth test as the SQL filters ("= TRUE"): NULL counts as no.
+        self.flags = {flag: _pack([getattr(r, flag) is True for r in records]) for flag in FLAGS}
+        self._everything = _pack(np.ones(n, dtype=bool))
+
+        forest_rows = {}
+        for i, r in enumerate(records):
+            if r.forest_name is not None:
+                forest_rows.setdefault(r.forest_name, []).append(i)
+        self.forests = {}
+        for forest_name, indexes in forest_rows.items():
+            bools = np.zeros(n, dtype=bool)
+            bools[indexes] = True
+            self.forests[forest_name] = _pack(bools)
+        self._forests_lower = {name: name.lower() for name in self.forests}
+
+        # Browse order matches search._BROWSE_KEY_SQL: forest, name, id with
+        # plain codepoint comparison (COLLATE "C").
+        keys = [(r.forest_name or "", r.name, r.id) for r in records]
+        order = sorted(range(n), key=keys.__getitem__)
+        self._browse_order = np.array(order, dtype=np.int64)
+        self._browse_keys = [keys[i] for i in order]
+
+    def __len__(self):
+        return self.size
+
+    def nbytes(self):
+        """Bytes held by the NumPy columns and bitmaps (not the records)."""
+        arrays = [self.ids, self.latitude, self.longitude, self._everything, self._browse_order]
+        arrays += list(self.flags.values()) + list(self.forests.values())
+        return sum(a.nbytes for a in arrays)
+
+    def select(self, is_open=None, has_water=None, has_restrooms=None, forest=None, bbox=None):
+        """Boolean mask (one entry per row) of the rows matching the filters.
+
+        Same semantics as ``search._filter_sql``: flags only apply when True,
+        ``forest`` is a case-insensitive substring of the forest name and
+        ``bbox`` is ``(west, south, east, north)``, edges included (an
+        inverted box matches nothing).
+        """
+
+        bits = self._everything
+        for flag, wanted in (("is_open", is_open), ("water", has_water), ("restrooms", has_restrooms)):
+            if wanted is True:
+                bits = bits & self.flags[flag]
+
+        if forest:
+            needle = forest.strip().lower()
+            matching = [self.forests[name] for name, lower in self._forests_lower.items() if needle in lower]
+            if not matching:
+                return np.zeros(self.size, dtype=bool)
+            bits = bits & np.bitwise_or.reduce(matching)
+
+        mask = np.unpackbits(bits, count=self.size).astype(bool)
+
+        if bbox:
+            west, south, east, north = bbox
+            # An inverted box is empty, as in search._filter_sql.
+            if west > east or south > north:
+                return np.zeros(self.size, dtype=bool)
+            # Rows without coordinates are NaN and never match, like NULL.
+            mask &= (self.longitude >= west) & (self.longitude <= east)
+            mask &= (self.latitude >= south) & (self.latitude <= north)
+
+        return mask
+
+    def filter(self, **filters):
+        """Records matching ``filters`` (see ``select``), in id order."""
+        records = self.records
+        return [records[i] for i in np.flatnonzero(self.select(**filters))]
+
+    def browse(self, after=None, limit=50, **filters):
+        """Up to ``limit`` matching records in browse order, after key ``after``."""
+        mask = self.select(**filters)[self._browse_order]
+        start = 0
+        if after is not None:
+            try:
+                start = bisect.bisect_right(self._browse_keys, tuple(after))
+            except TypeError as e:
+                raise ValueError("invalid cursor") from e
+        positions = np.flatnonzero(mask[start:])[:limit] + start
+        records = self.records
+        return [records[i] for i in self._browse_order[positions]]
+
+    def facet_counts(self, **filters):
+        """How many rows match ``filters`` (see ``select``), per flag and forest.
+
+        Returns ``{"total", "is_open", "water", "restrooms": int, "forests":
+        {forest_name: count}}`` (forests without matches left out), counted
+        by ANDing the match bitmap with each flag and forest bitmap.
+        """
+        bits = np.packbits(self.select(**filters))
+        counts = {"total": _count(bits)}
+        for flag, flag_bits in self.flags.items():
+            counts[flag] = _count(bits & flag_bits)
+        forests = {}
+        if counts["total"]:
+            for forest_name, forest_bits in self.forests.items():
+                count = _count(bits & forest_bits)
+                if count:
+                    forests[forest_name] = count
+        counts["forests"] = forests
+        return counts
+
+    def map_points(self):
+        """The campsites that have coordinates, shaped for map_index."""
+        located = np.flatnonzero(~(np.isnan(self.latitude) | np.isnan(self.longitude)))
+        records = self.records
+        return [
+            {
+                "id": records[i].id,
+                "name": records[i].name,
+                "forest_name": records[i].forest_name,
+                "latitude": float(self.latitude[i]),
+                "longitude": float(self.longitude[i]),
+            }
+            for i in located
+        ]
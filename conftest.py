@@ -0,0 +1,3 @@
+# Lets pytest import the flat top-level modules (db, search, ...) and the
+# scripts package from the repo root, the same way the app and the
+# ``python -m scripts.X`` commands do.
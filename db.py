@@ -1,24 +1,275 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import pool
 
 DB_NAME = "camping"
 DB_USER = "arrowboy"
 
-def get_connection():
-    return psycopg2.connect(dbname=DB_NAME, user=DB_USER)
+# Pool sizing. Flask's dev server and gunicorn threads all share one pool per
+# process, so max size is roughly "how many requests can hit the DB at once".
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+# How long (seconds) a caller waits for a free connection before giving up.
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+
+# Cursor class every pooled connection hands out by default. None means the
+# stock psycopg2 cursor; metrics.init_app swaps in a timing cursor.
+CURSOR_FACTORY = None
+
+# The pool and the bits that guard it. These are rebuilt lazily per process
+# (see _get_pool) because a psycopg2 connection must never be shared across
+# a fork: both processes would end up talking over the same socket.
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_pool_slots = None
+
+# Simple counters so we can see whether requests are waiting on the pool.
+_stats_lock = threading.Lock()
+_stats = {
+    "checkouts": 0,
+    "timeouts": 0,
+    "resets": 0,
+    "wait_total_s": 0.0,
+    "wait_max_s": 0.0,
+}
+
+
+def _detach_inherited_pool(inherited):
+    """Make a pool inherited across a fork safe to drop in the child.
+
+    Just forgetting it isn't enough: when its connections are garbage
+    collected psycopg2 runs PQfinish, which sends a Terminate message over
+    the socket -- the very socket the parent is still using, so the parent's
+    sessions die. Pointing the child's copy of each socket at /dev/null
+    first sends that goodbye nowhere; the parent's descriptors are separate
+    and stay connected.
+    """
+    # AbstractConnectionPool keeps idle connections in _pool and checked-out
+    # ones in _used.
+    conns = list(inherited._pool) + list(inherited._used.values())
+    devnull = os.open(os.devnull, os.O_RDWR)
+    try:
+        for conn in conns:
+            if conn.closed:
+                continue
+            try:
+                os.dup2(devnull, conn.fileno())
+            except (OSError, psycopg2.Error):
+                pass
+    finally:
+        os.close(devnull)
+
+
+def _get_pool():
+    """Return this process's connection pool, creating it on first use."""
+
+    global _pool, _pool_pid, _pool_slots
+
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            if _pool is not None:
+                # Forked: the parent's pool can't be used (or closed) here.
+                _detach_inherited_pool(_pool)
+            _pool = pool.ThreadedConnectionPool(
+                DB_POOL_MIN,
+                DB_POOL_MAX,
+                dbname=DB_NAME,
+                user=DB_USER,
+                cursor_factory=CURSOR_FACTORY,
+            )
+            # ThreadedConnectionPool raises straight away when it is exhausted,
+            # so a semaphore with the same size gives us a real checkout wait.
+            _pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+            _pool_pid = pid
+    return _pool
+
+
+def _record_wait(waited, timed_out=False):
+    with _stats_lock:
+        if timed_out:
+            _stats["timeouts"] += 1
+            return
+        _stats["checkouts"] += 1
+        _stats["wait_total_s"] += waited
+        _stats["wait_max_s"] = max(_stats["wait_max_s"], waited)
+
+
+def _record_reset():
+    with _stats_lock:
+        _stats["resets"] += 1
+
+
+def pool_stats():
+    """Return a snapshot of pool usage (checkouts, wait times, resets)."""
+
+    with _stats_lock:
+        snapshot = dict(_stats)
+    checkouts = snapshot["checkouts"]
+    snapshot["wait_avg_s"] = snapshot["wait_total_s"] / checkouts if checkouts else 0.0
+    snapshot["min_size"] = DB_POOL_MIN
+    snapshot["max_size"] = DB_POOL_MAX
+    return snapshot
+
+
+@contextmanager
+def get_connection(timeout=None):
+    """Check a connection out of the pool for the duration of a ``with`` block.
+
+    Usage::
+
+        with get_connection() as conn:
+            cur = conn.cursor()
+            ...
+
+    The transaction is committed when the block exits cleanly and rolled back
+    if it raises, so the connection always goes back to the pool idle. If the
+    connection broke while we had it (server restart, dropped socket) it is
+    closed and discarded instead of being handed to the next caller.
+
+    Whether it broke is read from ``conn.closed``, not from the exception:
+    a cancelled statement (statement_timeout) or a deadlock is also an
+    OperationalError, but the connection is fine after a rollback.
+    """
 
-# useful for weather data and anything that needs the campsite site_url: so things like updating site status and when it was last updated 
+    conn_pool = _get_pool()
+    slots = _pool_slots
+    timeout = DB_POOL_TIMEOUT if timeout is None else timeout
+
+    started = time.perf_counter()
+    if not slots.acquire(timeout=timeout):
+        _record_wait(0.0, timed_out=True)
+        raise pool.PoolError(f"Timed out after {timeout}s waiting for a database connection")
+
+    try:
+        conn = conn_pool.getconn()
+        # A connection can die while it sits idle in the pool; swap it out.
+        if conn.closed:
+            _record_reset()
+            conn_pool.putconn(conn, close=True)
+            conn = conn_pool.getconn()
+    except Exception:
+        slots.release()
+        raise
+    _record_wait(time.perf_counter() - started)
+
+    broken = False
+    try:
+        yield conn
+        if not conn.closed:
+            conn.commit()
+    except Exception:
+        if not conn.closed:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                # Can't get it back to idle, so don't hand it out again.
+                broken = True
+        raise
+    finally:
+        try:
+            if broken or conn.closed:
+                _record_reset()
+                conn_pool.putconn(conn, close=True)
+            else:
+                conn_pool.putconn(conn)
+        finally:
+            slots.release()
+
+
+# The data version is a single counter row the sync/refresh scripts bump
+# whenever they change campsite data. In-process caches (map clusters, search
+# results, ...) remember which version they were built from and rebuild when
+# it moves. Reading it is cheap, but we still only re-check every few seconds.
+DATA_VERSION_CHECK_SECONDS = float(os.getenv("DATA_VERSION_CHECK_SECONDS", "5"))
+_data_version = {"value": None, "checked_at": 0.0}
+_data_version_lock = threading.Lock()
+
+
+def get_data_version(max_age=None):
+    """Return the current data version (0 if the table doesn't exist yet)."""
+
+    max_age = DATA_VERSION_CHECK_SECONDS if max_age is None else max_age
+    now = time.monotonic()
+    with _data_version_lock:
+        if _data_version["value"] is not None and now - _data_version["checked_at"] < max_age:
+            return _data_version["value"]
+
+    try:
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT version FROM data_version WHERE id = 1;")
+            row = cur.fetchone()
+            cur.close()
+        version = row[0] if row else 0
+    except psycopg2.errors.UndefinedTable:
+        # Older databases without the data_version table: treat the data as
+        # never changing rather than failing the request.
+        version = 0
+
+    with _data_version_lock:
+        _data_version["value"] = version
+        _data_version["checked_at"] = now
+    return version
+
+
+def bump_data_version(cur):
+    """Mark the campsite data as changed. Runs inside the caller's transaction."""
+
+    cur.execute("""
+        INSERT INTO data_version (id, version, updated_at)
+        VALUES (1, 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (id) DO UPDATE
+        SET version = data_version.version + 1,
+            updated_at = CURRENT_TIMESTAMP;
+    """)
+
+
+def refresh_search_view(cur):
+    """Rebuild the campsite_search view (schema.sql) without blocking searches.
+
+    Does nothing on databases that don't have the view yet.
+    """
+
+    cur.execute("SELECT to_regclass('campsite_search') IS NOT NULL;")
+    if cur.fetchone()[0]:
+        cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY campsite_search;")
+
+
+def close_pool():
+    """Close every pooled connection (used by scripts on shutdown and tests)."""
+
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None:
+            if _pool_pid == os.getpid():
+                _pool.closeall()
+            else:
+                _detach_inherited_pool(_pool)
+        _pool = None
+        _pool_pid = None
+
+
+# useful for weather data and anything that needs the campsite site_url: so things like updating site status and when it was last updated
 # returns dict with id, name, latitude, longitude, site_url
 def get_campsite_by_id(campsite_id):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT id, name, latitude, longitude, site_url
-        FROM campsites
-        WHERE id = %s;
-    """, (campsite_id,))
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT id, name, latitude, longitude, site_url
+            FROM campsites
+            WHERE id = %s;
+        """, (campsite_id,))
+        row = cur.fetchone()
+        cur.close()
 
     if row:
         return {
@@ -29,4 +280,4 @@ def get_campsite_by_id(campsite_id):
             "site_url": row[4],
         }
     else:
-        return None
\ No newline at end of file
+        return None
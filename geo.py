@@ -0,0 +1,65 @@
+"""Small geographic helpers shared by search and the map."""
+
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def parse_bbox(text):
+    """Parse ``"west,south,east,north"`` (Leaflet's toBBoxString order)."""
+    parts = [float(p) for p in text.split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox must be west,south,east,north")
+    west, south, east, north = parts
+    if south > north:
+        raise ValueError("bbox south must be <= north")
+    # A box crossing the antimeridian would have west > east. None of our
+    # campsites are anywhere near it, so refuse it rather than guess.
+    if west > east:
+        raise ValueError("bbox west must be <= east")
+    return west, south, east, north
+
+
+def intersect_bbox(a, b):
+    """Overlap of two (west, south, east, north) boxes, or None if they don't overlap."""
+    west, south = max(a[0], b[0]), max(a[1], b[1])
+    east, north = min(a[2], b[2]), min(a[3], b[3])
+    if west > east or south > north:
+        return None
+    return west, south, east, north
+
+
+def parse_point(text):
+    """Parse ``"lat,lon"`` into a pair of floats."""
+    parts = [float(p) for p in text.split(",")]
+    if len(parts) != 2:
+        raise ValueError("near must be lat,lon")
+    lat, lon = parts
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("near is out of range")
+    return lat, lon
+
+
+def bbox_around(lat, lon, radius_km):
+    """Smallest (west, south, east, north) box that contains the circle.
+
+    Used to let the database index throw away far-away sites before we do
+    the exact distance math in Python.
+    """
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    # Longitude degrees shrink towards the poles; clamp so we never divide by ~0.
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlon = min(math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)), 180.0)
+    return lon - dlon, max(lat - dlat, -90.0), lon + dlon, min(lat + dlat, 90.0)
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance from one point to arrays of points, in km."""
+    lat1 = np.radians(lat)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    dlat = lat2 - lat1
+    dlon = np.radians(np.asarray(lons, dtype=np.float64) - lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
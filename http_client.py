@@ -0,0 +1,268 @@
+"""Shared client for every outbound HTTP call (OpenWeather, RIDB, fs.usda.gov).
+
+``get()`` is a drop-in for ``requests.get`` that adds what the scattered
+``requests.get`` calls were missing:
+
+* one keep-alive ``Session`` per host, so repeated calls reuse pooled
+  connections instead of doing a fresh TCP + TLS handshake each time;
+* a default ``(connect, read)`` timeout, so a stuck upstream can't hang a
+  page or a sync run;
+* a small number of retries for connection errors, timeouts and 429/5xx
+  answers, spaced by exponential backoff with full jitter (and never sooner
+  than a ``Retry-After`` header asks);
+* a per-host circuit breaker: after ``HTTP_BREAKER_FAILURES`` failed calls in
+  a row the host is treated as down and calls fail straight away with
+  ``CircuitOpenError`` for ``HTTP_BREAKER_RESET_SECONDS``; then one trial
+  call is let through and its outcome closes or re-opens the breaker;
+* per-host counters (attempts, errors, retries, rejections, latency) for
+  ``/metrics``; every attempt, failed ones included, is also timed against
+  the current request (see timing.py).
+
+Only connection problems and 429/5xx count against the breaker: a 404 or a
+401 means the host is up and answering.
+"""
+
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import timing
+
+# (connect, read) timeout in seconds when the caller doesn't pass one.
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+# Extra attempts after the first one, and the backoff between them: attempt
+# n waits a random time up to min(HTTP_BACKOFF_MAX, HTTP_BACKOFF * 2**n).
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.25"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "5"))
+# Pooled keep-alive connections per host.
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+# Consecutive failures that open a host's breaker, and how long it stays open.
+HTTP_BREAKER_FAILURES = int(os.getenv("HTTP_BREAKER_FAILURES", "5"))
+HTTP_BREAKER_RESET_SECONDS = float(os.getenv("HTTP_BREAKER_RESET_SECONDS", "30"))
+
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+# Only these are safe to send twice.
+RETRY_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised without touching the network while a host's breaker is open.
+
+    It is a ``requests.ConnectionError``, so existing ``except
+    requests.RequestException`` handlers treat it like the host being down.
+    """
+
+
+class CircuitBreaker:
+    """Closed -> open after ``threshold`` failures in a row -> half-open after
+    ``reset_seconds``, where a single trial call decides which way it goes."""
+
+    def __init__(self, threshold=HTTP_BREAKER_FAILURES, reset_seconds=HTTP_BREAKER_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.trips = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def allow(self):
+        """True if a call may go out now (the half-open trial included)."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            # A failed trial re-opens straight away; otherwise wait for the
+            # threshold.
+            if self._trial_in_flight or (self._opened_at is None and self.failures >= self.threshold):
+                self._opened_at = time.monotonic()
+                self.trips += 1
+            self._trial_in_flight = False
+
+    def release(self):
+        """Give back the half-open trial without an outcome (caller bailed)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class _Host:
+    """Session, breaker and counters for one upstream host."""
+
+    def __init__(self, pool_size):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.breaker = CircuitBreaker()
+        self.stats = {
+            "requests": 0,
+            "errors": 0,
+            "retries": 0,
+            "rejected": 0,
+            "latency_seconds_total": 0.0,
+            "latency_seconds_max": 0.0,
+        }
+        self.lock = threading.Lock()
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.stats[name] += amount
+
+    def observe(self, seconds):
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["latency_seconds_total"] += seconds
+            if seconds > self.stats["latency_seconds_max"]:
+                self.stats["latency_seconds_max"] = seconds
+
+
+_hosts = {}
+_hosts_pid = None
+_hosts_lock = threading.Lock()
+
+
+def _host(netloc):
+    """The ``_Host`` for ``netloc``, created on first use in this process."""
+    global _hosts, _hosts_pid
+
+    # Pooled sockets must not be shared with a forked worker, so each
+    # process starts with its own sessions.
+    pid = os.getpid()
+    host = _hosts.get(netloc) if _hosts_pid == pid else None
+    if host is not None:
+        return host
+    with _hosts_lock:
+        if _hosts_pid != pid:
+            _hosts, _hosts_pid = {}, pid
+        host = _hosts.get(netloc)
+        if host is None:
+            host = _hosts[netloc] = _Host(HTTP_POOL_SIZE)
+        return host
+
+
+def _finished(host, started):
+    """Time one attempt for the host's counters and the current request."""
+    seconds = time.perf_counter() - started
+    host.observe(seconds)
+    timing.record("http", seconds)
+
+
+def _backoff(attempt, backoff, response=None):
+    """Seconds to wait before retry number ``attempt`` (0-based)."""
+    delay = random.uniform(0, min(HTTP_BACKOFF_MAX, backoff * 2 ** attempt))
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), HTTP_BACKOFF_MAX))
+    return delay
+
+
+def request(method, url, timeout=None, retries=None, backoff=None, **kwargs):
+    """Send ``method url`` through the host's pooled session.
+
+    ``timeout``, ``retries`` and ``backoff`` default to the module settings;
+    everything else goes to ``Session.request``. Returns the last response
+    (which may still be a 429/5xx once retries run out) or raises the last
+    connection error. Raises ``CircuitOpenError`` while the host is down.
+    """
+    netloc = urlparse(url).netloc
+    host = _host(netloc)
+    timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT) if timeout is None else timeout
+    retries = HTTP_RETRIES if retries is None else retries
+    if method.upper() not in RETRY_METHODS:
+        retries = 0
+    backoff = HTTP_BACKOFF if backoff is None else backoff
+
+    attempt = 0
+    while True:
+        if not host.breaker.allow():
+            host.count("rejected")
+            raise CircuitOpenError(f"{netloc} is failing; not calling it for now")
+
+        started = time.perf_counter()
+        try:
+            response = host.session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            _finished(host, started)
+            host.count("errors")
+            host.breaker.record_failure()
+            if attempt >= retries:
+                raise
+            response = None
+        except requests.RequestException:
+            # The host answered, but badly (a truncated or undecodable body,
+            # a redirect loop): count it against the host, don't retry.
+            _finished(host, started)
+            host.count("errors")
+            host.breaker.record_failure()
+            raise
+        except BaseException:
+            # Anything else (a caller's hook raising, an interrupt) says
+            # nothing about the host; just free the half-open trial slot. The
+            # time still went into this request.
+            timing.record("http", time.perf_counter() - started)
+            host.breaker.release()
+            raise
+        else:
+            _finished(host, started)
+            if response.status_code not in RETRY_STATUSES:
+                host.breaker.record_success()
+                return response
+            host.count("errors")
+            host.breaker.record_failure()
+            if attempt >= retries:
+                return response
+            # Hand the connection back to the pool before sleeping.
+            response.close()
+
+        host.count("retries")
+        time.sleep(_backoff(attempt, backoff, response))
+        attempt += 1
+
+
+def get(url, params=None, **kwargs):
+    """``requests.get`` with pooling, timeouts, retries and the breaker."""
+    return request("GET", url, params=params, **kwargs)
+
+
+def stats():
+    """{host: counters and breaker state} for this process."""
+    with _hosts_lock:
+        hosts = dict(_hosts) if _hosts_pid == os.getpid() else {}
+    snapshot = {}
+    for netloc, host in hosts.items():
+        with host.lock:
+            entry = dict(host.stats)
+        entry["breaker_open"] = int(host.breaker.state != "closed")
+        entry["breaker_trips"] = host.breaker.trips
+        snapshot[netloc] = entry
+    return snapshot
@@ -0,0 +1,152 @@
+"""Precomputed clusters for the homepage map.
+
+Sending every campsite to the browser and drawing one marker per point gets
+slow as the data grows. Instead, the map asks for what is visible (``bbox``)
+at its current ``zoom``:
+
+* at low zoom we return one cluster per (forest, grid cell) with a count and
+  the centroid of its campsites;
+* past ``CLUSTER_MAX_ZOOM`` we return the individual campsites in view.
+
+The clusters for every zoom level are built once from
+``search.get_campsites_for_map`` and rebuilt when the data version changes
+(see ``db.get_data_version``).
+"""
+
+import math
+import os
+import threading
+
+from db import get_data_version
+from search import get_campsites_for_map
+
+# Above this zoom level the map gets individual points instead of clusters.
+CLUSTER_MAX_ZOOM = int(os.getenv("MAP_CLUSTER_MAX_ZOOM", "10"))
+# Roughly how wide (in screen pixels) one cluster cell is at any zoom.
+CLUSTER_CELL_PX = 60
+# Points are bucketed on a coarse grid so bbox lookups only touch the cells
+# that overlap the view.
+POINT_BUCKET_DEG = 0.25
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def cell_size_deg(zoom):
+    """Width of one cluster cell in degrees at a given (web mercator) zoom."""
+    return CLUSTER_CELL_PX * 360.0 / (256 * 2 ** zoom)
+
+
+def _in_bbox(lat, lon, bbox):
+    if bbox is None:
+        return True
+    west, south, east, north = bbox
+    return south <= lat <= north and west <= lon <= east
+
+
+def _build_clusters(points, zoom):
+    size = cell_size_deg(zoom)
+    cells = {}
+    for p in points:
+        key = (p["forest_name"], math.floor(p["latitude"] / size), math.floor(p["longitude"] / size))
+        cell = cells.get(key)
+        if cell is None:
+            cell = cells[key] = {"forest_name": p["forest_name"], "count": 0, "lat_sum": 0.0, "lon_sum": 0.0, "first": p}
+        cell["count"] += 1
+        cell["lat_sum"] += p["latitude"]
+        cell["lon_sum"] += p["longitude"]
+
+    clusters = []
+    for cell in cells.values():
+        cluster = {
+            "forest_name": cell["forest_name"],
+            "count": cell["count"],
+            "latitude": cell["lat_sum"] / cell["count"],
+            "longitude": cell["lon_sum"] / cell["count"],
+        }
+        # A "cluster" of one is just a campsite; include enough to link to it.
+        if cell["count"] == 1:
+            cluster["id"] = cell["first"]["id"]
+            cluster["name"] = cell["first"]["name"]
+        clusters.append(cluster)
+    return clusters
+
+
+def build_index(points):
+    """Build clusters for every zoom level plus a bucketed point lookup."""
+    points = [p for p in points if p["latitude"] is not None and p["longitude"] is not None]
+
+    buckets = {}
+    for p in points:
+        key = (math.floor(p["latitude"] / POINT_BUCKET_DEG), math.floor(p["longitude"] / POINT_BUCKET_DEG))
+        buckets.setdefault(key, []).append(p)
+
+    return {
+        "points": points,
+        "buckets": buckets,
+        "clusters": {zoom: _build_clusters(points, zoom) for zoom in range(CLUSTER_MAX_ZOOM + 1)},
+    }
+
+
+def get_index():
+    """Return the current map index, rebuilding it if the data changed."""
+    global _index
+
+    version = get_data_version()
+    current = _index
+    if current is not None and current["version"] == version:
+        return current
+
+    with _index_lock:
+        if _index is None or _index["version"] != version:
+            index = build_index(get_campsites_for_map())
+            index["version"] = version
+            _index = index
+        return _index
+
+
+def invalidate():
+    """Force the next request to rebuild the index."""
+    global _index
+    _index = None
+
+
+def _points_in_bbox(index, bbox):
+    if bbox is None:
+        return list(index["points"])
+
+    west, south, east, north = bbox
+    lat_cells = range(math.floor(south / POINT_BUCKET_DEG), math.floor(north / POINT_BUCKET_DEG) + 1)
+    lon_cells = range(math.floor(west / POINT_BUCKET_DEG), math.floor(east / POINT_BUCKET_DEG) + 1)
+    # For a huge box it is cheaper to just scan every point once.
+    if len(lat_cells) * len(lon_cells) > len(index["buckets"]):
+        return [p for p in index["points"] if _in_bbox(p["latitude"], p["longitude"], bbox)]
+
+    results = []
+    for lat_cell in lat_cells:
+        for lon_cell in lon_cells:
+            for p in index["buckets"].get((lat_cell, lon_cell), ()):
+                if _in_bbox(p["latitude"], p["longitude"], bbox):
+                    results.append(p)
+    return results
+
+
+def query_map(bbox=None, zoom=None):
+    """Return the map payload for a view.
+
+    ``{"mode": "clusters", "items": [...]}`` at or below CLUSTER_MAX_ZOOM,
+    otherwise ``{"mode": "points", "items": [...]}``.
+    """
+    index = get_index()
+
+    if zoom is not None and zoom <= CLUSTER_MAX_ZOOM:
+        clusters = index["clusters"][max(int(zoom), 0)]
+        items = [c for c in clusters if _in_bbox(c["latitude"], c["longitude"], bbox)]
+        return {"mode": "clusters", "zoom": zoom, "items": items}
+
+    return {"mode": "points", "zoom": zoom, "items": _points_in_bbox(index, bbox)}
+
+
+def all_points():
+    """Every campsite point (the old, unclustered payload)."""
+    return list(get_index()["points"])
@@ -0,0 +1,213 @@
+"""Per-request timing and a Prometheus-style ``/metrics`` endpoint.
+
+For every request we record how long it took overall, and how much of that
+went to database queries, outbound HTTP calls (http_client), fuzzy scoring and
+Jinja rendering. Everything is exposed as histograms labelled by route.
+
+The timers themselves live in timing.py, so the code being measured doesn't
+depend on this module (or on Flask).
+
+Set ``METRICS_ENABLED=false`` to switch all of it off. When disabled no Flask
+hooks are registered, the database uses plain cursors and ``timed()`` hands
+back a shared no-op context manager, so the cost is a single flag check.
+"""
+
+import contextvars
+import threading
+import time
+
+from flask import Response, request, template_rendered, before_render_template
+from psycopg2.extensions import cursor as _base_cursor
+
+import db
+import http_client
+import search
+import weather
+from timing import ENABLED, record, request_stats
+
+# Histogram bucket upper bounds.
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+_render_started_at = contextvars.ContextVar("render_started_at", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense, split by labels."""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                base = ",".join(f'{k}="{v}"' for k, v in key)
+                prefix = base + "," if base else ""
+                for bound, count in zip(self.buckets, series["counts"]):
+                    lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {series["count"]}')
+                lines.append(f"{self.name}_sum{{{base}}} {series['sum']}")
+                lines.append(f"{self.name}_count{{{base}}} {series['count']}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    "campsearch_request_duration_seconds", "Time spent handling a request.", LATENCY_BUCKETS
+)
+# (kind -> (histogram of calls per request, histogram of seconds per request))
+PER_REQUEST = {
+    kind: (
+        Histogram(f"campsearch_request_{kind}_calls", f"{label} per request.", COUNT_BUCKETS),
+        Histogram(f"campsearch_request_{kind}_seconds", f"Seconds spent in {label.lower()} per request.", LATENCY_BUCKETS),
+    )
+    for kind, label in (
+        ("db", "Database queries"),
+        ("http", "Outbound HTTP calls"),
+        ("scoring", "Fuzzy scoring passes"),
+        ("render", "Template renders"),
+    )
+}
+
+
+class RequestStats:
+    """Call counts and durations for one request, safe to update from threads."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.calls = {kind: 0 for kind in PER_REQUEST}
+        self.seconds = {kind: 0.0 for kind in PER_REQUEST}
+        self._lock = threading.Lock()
+
+    def add(self, kind, seconds):
+        with self._lock:
+            self.calls[kind] += 1
+            self.seconds[kind] += seconds
+
+
+class TimedCursor(_base_cursor):
+    """psycopg2 cursor that reports each query's duration to the request."""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record("db", time.perf_counter() - started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            record("db", time.perf_counter() - started)
+
+
+def _before_request():
+    request_stats.set(RequestStats())
+
+
+def _after_request(response):
+    stats = request_stats.get()
+    if stats is None:
+        return response
+
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUEST_SECONDS.observe(
+        time.perf_counter() - stats.started,
+        route=route,
+        method=request.method,
+        status=str(response.status_code),
+    )
+    for kind, (calls_hist, seconds_hist) in PER_REQUEST.items():
+        calls_hist.observe(stats.calls[kind], route=route)
+        seconds_hist.observe(stats.seconds[kind], route=route)
+    return response
+
+
+def _teardown_request(exc):
+    request_stats.set(None)
+
+
+def _render_started(sender, template, context, **extra):
+    _render_started_at.set(time.perf_counter())
+
+
+def _render_finished(sender, template, context, **extra):
+    started = _render_started_at.get()
+    if started is not None:
+        record("render", time.perf_counter() - started)
+        _render_started_at.set(None)
+
+
+def _gauge_lines():
+    """Point-in-time numbers from the DB pool, the caches and the HTTP client."""
+    lines = []
+    sources = (
+        ("db_pool", db.pool_stats()),
+        ("weather_cache", weather.cache_stats()),
+        ("weather_refresher", weather.refresher_stats()),
+        ("search_cache", search.cache_stats()),
+        ("search_store", search.store_stats()),
+    )
+    for source, stats in sources:
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                name = f"campsearch_{source}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+
+    # Outbound HTTP counters and breaker state, one series per upstream host.
+    per_host = http_client.stats()
+    keys = sorted({key for stats in per_host.values() for key in stats})
+    for key in keys:
+        name = f"campsearch_http_client_{key}"
+        lines.append(f"# TYPE {name} gauge")
+        for host, stats in sorted(per_host.items()):
+            lines.append(f'{name}{{host="{host}"}} {stats[key]}')
+    return lines
+
+
+def render_metrics():
+    lines = REQUEST_SECONDS.render()
+    for calls_hist, seconds_hist in PER_REQUEST.values():
+        lines += calls_hist.render()
+        lines += seconds_hist.render()
+    lines += _gauge_lines()
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app):
+    """Register the hooks and the ``/metrics`` route (only when enabled)."""
+    if not ENABLED:
+        return
+
+    # Every pooled connection hands out timing cursors from now on.
+    db.CURSOR_FACTORY = TimedCursor
+    db.close_pool()
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    before_render_template.connect(_render_started, app)
+    template_rendered.connect(_render_finished, app)
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
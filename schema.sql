@@ -58,3 +58,131 @@ CREATE TABLE availability (
     availability_raw TEXT,  -- you can store calendar data or notes here
     last_checked TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+
+-- FUZZY SEARCH PREFILTER (optional, see TRGM_PREFILTER in search.py)
+-- Trigram index on the same whitespace-stripped, lowercased form that
+-- search.normalize() produces. The expression must match _NAME_NORM_SQL
+-- exactly or Postgres won't use the index. Forests are matched in Python
+-- (search._matching_forests), so they don't need a trigram index.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+ALTER TABLE campsites ADD COLUMN IF NOT EXISTS forest_name TEXT;
+
+CREATE INDEX IF NOT EXISTS campsites_name_norm_trgm
+    ON campsites USING gin (lower(regexp_replace(name, '\s+', '', 'g')) gin_trgm_ops);
+
+-- DATA VERSION (single row, bumped by the sync/refresh scripts)
+-- In-process caches in the web app rebuild when this number changes.
+CREATE TABLE IF NOT EXISTS data_version (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO data_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+
+-- LOCATION INDEX (radius / bbox search)
+-- GiST index on a built-in geometric point (x = longitude, y = latitude), so
+-- no PostGIS is needed. Must match _LOCATION_SQL in search.py.
+CREATE INDEX IF NOT EXISTS campsites_location_gist
+    ON campsites USING gist (point(longitude::float8, latitude::float8));
+
+-- SEARCH VIEW (one row per campsite, read by search.py)
+-- status_updates, weather_forecasts and amenities can hold several rows per
+-- campsite; search only wants the latest status, the latest forecast and
+-- the amenity flags. The pipelines refresh this with
+-- REFRESH MATERIALIZED VIEW CONCURRENTLY (see db.refresh_search_view), which
+-- needs the unique index on id.
+-- The water/restrooms amenity flags the view (and search's live-table
+-- fallback) read.
+ALTER TABLE amenities ADD COLUMN IF NOT EXISTS water BOOLEAN;
+ALTER TABLE amenities ADD COLUMN IF NOT EXISTS restrooms BOOLEAN;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS campsite_search AS
+SELECT
+    campsites.id,
+    campsites.name,
+    campsites.forest_name,
+    campsites.latitude,
+    campsites.longitude,
+    latest_status.is_open,
+    latest_forecast.forecast_json,
+    amenity_flags.water,
+    amenity_flags.restrooms
+FROM campsites
+LEFT JOIN LATERAL (
+    SELECT status_updates.is_open
+    FROM status_updates
+    WHERE status_updates.campsite_id = campsites.id
+    ORDER BY status_updates.last_checked DESC NULLS LAST
+    LIMIT 1
+) AS latest_status ON TRUE
+LEFT JOIN LATERAL (
+    SELECT weather_forecasts.forecast_json
+    FROM weather_forecasts
+    WHERE weather_forecasts.campsite_id = campsites.id
+    ORDER BY weather_forecasts.last_updated DESC NULLS LAST
+    LIMIT 1
+) AS latest_forecast ON TRUE
+LEFT JOIN (
+    SELECT campsite_id, bool_or(water) AS water, bool_or(restrooms) AS restrooms
+    FROM amenities
+    GROUP BY campsite_id
+) AS amenity_flags ON amenity_flags.campsite_id = campsites.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS campsite_search_id ON campsite_search (id);
+-- Checkbox filters only ever ask for TRUE, so partial indexes are enough.
+CREATE INDEX IF NOT EXISTS campsite_search_open ON campsite_search (id) WHERE is_open;
+CREATE INDEX IF NOT EXISTS campsite_search_water ON campsite_search (id) WHERE water;
+CREATE INDEX IF NOT EXISTS campsite_search_restrooms ON campsite_search (id) WHERE restrooms;
+-- Same expressions as _LOCATION_SQL / _NAME_NORM_SQL.
+CREATE INDEX IF NOT EXISTS campsite_search_location_gist
+    ON campsite_search USING gist (point(longitude::float8, latitude::float8));
+CREATE INDEX IF NOT EXISTS campsite_search_name_norm_trgm
+    ON campsite_search USING gin (lower(regexp_replace(name, '\s+', '', 'g')) gin_trgm_ops);
+-- The prefilter's "every site in a matching forest" (forest_name = ANY(...)).
+CREATE INDEX IF NOT EXISTS campsite_search_forest_name ON campsite_search (forest_name);
+-- Also serves the forest dropdown filter (LOWER(forest_name) LIKE '%...%').
+CREATE INDEX IF NOT EXISTS campsite_search_forest_lower_trgm
+    ON campsite_search USING gin (lower(forest_name) gin_trgm_ops);
+
+-- Alphabetical browse order for keyset pagination (search._BROWSE_KEY_SQL).
+CREATE INDEX IF NOT EXISTS campsite_search_browse
+    ON campsite_search ((COALESCE(forest_name, '') COLLATE "C"), (name COLLATE "C"), id);
+
+-- DAILY FORECASTS (one row per forecast grid cell and day)
+-- Campsites in the same cell (weather.forecast_cell) share rows.
+-- scripts/dynamic.py fills the next few days; weather.get_forecast_range
+-- reads a date range with one primary-key range scan and only calls the API
+-- for days that are missing or stale.
+CREATE TABLE IF NOT EXISTS daily_forecasts (
+    cell_lat DECIMAL(9,6) NOT NULL,
+    cell_lon DECIMAL(9,6) NOT NULL,
+    units TEXT NOT NULL,
+    forecast_date DATE NOT NULL,
+    precipitation_total DOUBLE PRECISION,
+    temp_min DOUBLE PRECISION,
+    temp_max DOUBLE PRECISION,
+    cloud_cover_afternoon DOUBLE PRECISION,
+    fetched_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (cell_lat, cell_lon, units, forecast_date)
+);
+
+-- ONE WEATHER FORECAST ROW PER CAMPSITE
+-- scripts/dynamic.py upserts weather_forecasts ON CONFLICT (campsite_id),
+-- which needs this unique index. Tables created before it may hold several
+-- rows per campsite, so keep only each campsite's latest row first.
+DELETE FROM weather_forecasts
+WHERE id IN (
+    SELECT id
+    FROM (
+        SELECT
+            id,
+            ROW_NUMBER() OVER (
+                PARTITION BY campsite_id
+                ORDER BY last_updated DESC NULLS LAST, id DESC
+            ) AS position
+        FROM weather_forecasts
+        WHERE campsite_id IS NOT NULL
+    ) AS ranked
+    WHERE position > 1
+);
+CREATE UNIQUE INDEX IF NOT EXISTS weather_forecasts_campsite_id ON weather_forecasts (campsite_id);
@@ -0,0 +1,85 @@
+"""Batched fuzzy scoring used by ``search.search_campsites``.
+
+Instead of calling the rapidfuzz scorers once per row from a Python loop, we
+hand rapidfuzz the whole column of (already normalized) names at once via
+``process.cdist``. rapidfuzz then runs the comparisons in C++ and can spread
+them across threads, which is where nearly all of the search time used to go.
+
+The scores produced here are exactly the ones the old per-row loop computed;
+only the way they are computed changed.
+"""
+
+import os
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+# Number of threads rapidfuzz may use for one batch (-1 = all cores).
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", "-1"))
+
+# Forest scores are scaled down before they are compared to the threshold.
+FOREST_PARTIAL_WEIGHT = 0.6
+
+
+def score_site_names(norm_query, norm_names):
+    """Return one site score per normalized campsite name.
+
+    A site score is the best of ``token_sort_ratio`` and a length-adjusted
+    ``partial_ratio`` (so very short queries don't dominate long names).
+    """
+
+    if not norm_names:
+        return np.zeros(0, dtype=np.float64)
+
+    # NOTE: names go in as the "queries" side so each scorer sees
+    # (name, query), the same argument order the old loop used.
+    token_scores = process.cdist(
+        norm_names,
+        [norm_query],
+        scorer=fuzz.token_sort_ratio,
+        dtype=np.float64,
+        workers=SCORING_WORKERS,
+    )[:, 0]
+    partial_scores = process.cdist(
+        norm_names,
+        [norm_query],
+        scorer=fuzz.partial_ratio,
+        dtype=np.float64,
+        workers=SCORING_WORKERS,
+    )[:, 0]
+
+    name_lengths = np.fromiter((len(n) for n in norm_names), dtype=np.float64, count=len(norm_names))
+    adjusted = partial_scores.copy()
+    has_name = name_lengths > 0
+    adjusted[has_name] = partial_scores[has_name] * (len(norm_query) / name_lengths[has_name])
+
+    return np.maximum(token_scores, adjusted)
+
+
+def score_forest_names(norm_query, norm_forests, fuzzthresh):
+    """Return one forest score per row, scoring each distinct forest once.
+
+    Most rows share a handful of forests, so we only run the scorer over the
+    unique values and then broadcast the scores back onto the rows.
+    """
+
+    if not norm_forests:
+        return np.zeros(0, dtype=np.float64)
+
+    unique_forests = list(dict.fromkeys(norm_forests))
+
+    # Anything whose weighted partial score can't reach the threshold is only
+    # ever compared against the threshold, so rapidfuzz can skip it early.
+    cutoff = min(max(fuzzthresh / FOREST_PARTIAL_WEIGHT - 1e-6, 0), 100)
+    partial = process.cdist(
+        [norm_query],
+        unique_forests,
+        scorer=fuzz.partial_ratio,
+        dtype=np.float64,
+        workers=SCORING_WORKERS,
+        score_cutoff=cutoff,
+    )[0] * FOREST_PARTIAL_WEIGHT
+    exact = np.array([100.0 if norm_query in f else 0.0 for f in unique_forests])
+    per_forest = dict(zip(unique_forests, np.maximum(partial, exact)))
+
+    return np.fromiter((per_forest[f] for f in norm_forests), dtype=np.float64, count=len(norm_forests))
@@ -1,32 +1,26 @@
-from db import get_connection
+from db import bump_data_version, get_connection, refresh_search_view
+from scripts.bulk_load import load_transaction
 
 
-conn = get_connection()
-cur = conn.cursor()
+with get_connection() as conn, load_transaction(conn) as load:
+    cur = load.cur
 
-# Add the column 
-cur.execute("ALTER TABLE campsites ADD COLUMN IF NOT EXISTS forest_name TEXT;")
+    # Add the column 
+    cur.execute("ALTER TABLE campsites ADD COLUMN IF NOT EXISTS forest_name TEXT;")
 
-# select all ids, and fs_usda_name
-cur.execute("SELECT id, fs_usda_url FROM campsites;")
-all_sites = cur.fetchall()
+    # select all ids, and fs_usda_name
+    cur.execute("SELECT id, fs_usda_url FROM campsites;")
+    all_sites = cur.fetchall()
 
-# extrcat the fs_usda_url from the fs_usda_name
-forest_names = []
-site_ids = []
-for site_id, url in all_sites:
-    forest_name = url.rstrip("/").split("/")[-1]
-    forest_names.append(forest_name)
-    site_ids.append(site_id)
+    # extrcat the fs_usda_url from the fs_usda_name
+    rows = []
+    for site_id, url in all_sites:
+        forest_name = url.rstrip("/").split("/")[-1]
+        rows.append((site_id, forest_name))
 
-# insert the forest name into the database
-cur.executemany("""
-    UPDATE campsites
-    SET forest_name = %s
-    WHERE id = %s;
-""", zip(forest_names, site_ids))
+    # insert the forest names into the database with one staged UPDATE
+    load.update("campsites", key="id", columns=["forest_name"], rows=rows)
 
-# Commit changes and clean up
-conn.commit()
-cur.close()
-conn.close()
\ No newline at end of file
+    # committed together with the update when the block exits
+    refresh_search_view(cur)
+    bump_data_version(cur)
@@ -0,0 +1,211 @@
+"""
+Benchmark and parity check for scripts.pull_static_info_for_park.parse_campsite_page.
+
+Runs every saved campsite page through
+  legacy  - the original extraction (html.parser, one whole-tree search per field)
+  new     - parse_campsite_page with each available parser backend
+checks that every backend produces exactly the legacy fields, and reports
+the parse time per page.
+
+A small hand-checked corpus is committed in tests/fixtures/campsite_pages
+(the default), including pages with unclosed <p> tags. For a full corpus,
+save real pages with the scraper first:
+    python -m scripts.pull_static_info_for_park --save-html data/html_fixtures
+then, from the repo root:
+    python -m scripts.bench_parse_campsite --fixtures data/html_fixtures
+
+Exits non-zero if the configured backend (HTML_PARSER) disagrees with the
+legacy output; mismatches from the other backends are only reported.
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from scripts.pull_static_info_for_park import CAMPSITE_FIELDS, HTML_PARSER, lxml, parse_campsite_page
+
+FIXTURES_DIR = "tests/fixtures/campsite_pages"
+
+
+# --- the extraction as it was ---------------------------------------------------
+
+def get_accordion_text_by_label(soup, label):
+    """Finds text content inside an accordion by its button label"""
+    button = soup.find("button", string=lambda s: s and label in s)
+    if button:
+        content_div = button.find_parent("h3").find_next_sibling("div")
+        return content_div.get_text(strip=True, separator="\n") if content_div else None
+    return None
+
+
+def legacy_parse_campsite_page(html):
+    """The extraction exactly as the scraper did it before parse_campsite_page."""
+    record = dict.fromkeys(CAMPSITE_FIELDS)
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Accordion-based fields
+    record["season_of_use"] = get_accordion_text_by_label(soup, "Seasons of Use")
+    record["fee_info"] = get_accordion_text_by_label(soup, "Fee Site and Info")
+    record["contact_info"] = get_accordion_text_by_label(soup, "Contact Information")
+    record["info_center"] = get_accordion_text_by_label(soup, "Information Center")
+
+    # Latitude, Longitude, Directions
+    lat, lon, directions = None, None, None
+    for block in soup.find_all("div", class_="margin-top-5"):
+        h2 = block.find("h2")
+        if h2 and "Getting There" in h2.get_text(strip=True):
+            for p in block.find_all("p"):
+                t = p.get_text(strip=True)
+                if "Latitude:" in t: lat = t.replace("Latitude:", "").strip()
+                elif "Longitude:" in t: lon = t.replace("Longitude:", "").strip()
+                elif "From" in t or "Take" in t: directions = t
+            break
+    record["latitude"] = lat
+    record["longitude"] = lon
+    record["directions"] = directions
+
+    # Facility Info
+    restrooms, water = None, None
+    for block in soup.find_all("div", class_="margin-top-5"):
+        h2 = block.find("h2")
+        if h2 and "Facility and Amenity Information" in h2.get_text(strip=True):
+            for p in block.find_all("p"):
+                t = p.get_text(strip=True)
+                if "Restroom" in t: restrooms = t
+                elif "water" in t.lower(): water = t
+            break
+    record["restrooms"] = restrooms
+    record["water"] = water
+    
+    
+    # recreation opportunities
+    body_of_water = False  # default
+
+    recop = soup.find("div", class_="opportunities margin-top-5")
+    if recop:
+        # Find all opportunities listed
+        opp_items = recop.find_all("a", class_="opportunity__item")
+        for item in opp_items:
+            text = item.get_text(strip=True).lower()
+            if "water" in text or "swimming" in text or "boating" in text or "lake" in text:
+                body_of_water = True
+                break 
+    
+    # for appending to df
+    record["body_of_water"] = body_of_water
+
+
+    # Overview & Amenities
+    overview_div = soup.find("div", class_="rec-intro")
+    overview_div = overview_div.find("div", class_="field field--name-field-rec-description") if overview_div else None
+    overview_text, amenities_text = None, None
+
+    if overview_div:
+        for p in overview_div.find_all("p"):
+            t = p.get_text(strip=True)
+            if "Overview" in t and not overview_text:
+                next_p = p.find_next_sibling("p")
+                if next_p: overview_text = next_p.get_text(strip=True)
+            if "Amenities:" in t and not amenities_text:
+                amenities_text = t.replace("Amenities:", "").strip()
+            if overview_text and amenities_text:
+                break
+
+    # General Info fallback for amenities
+    if not amenities_text:
+        amenities_text = ""
+        general_info = soup.find("div", class_="field--name-field-rec-general-info")
+        if general_info:
+            for p in general_info.find_all("p"):
+                if "Amenities" in p.text:
+                    after = p.get_text(strip=True).replace("Amenities:", "").strip()
+                    if after:
+                        amenities_text = after
+                    else:
+                        ul = p.find_next_sibling("ul")
+                        if ul:
+                            for li in ul.find_all("li"):
+                                amenities_text += "- " + li.get_text(strip=True) + "\n"
+        else:
+            amenities_text = None
+
+    record["overview"] = overview_text
+    record["amenities"] = amenities_text
+    return record
+
+
+def _safe(parse, html):
+    # scrape_campsite() turns any parse error into an all-None row, so that is
+    # the output to compare.
+    try:
+        return parse(html)
+    except Exception:
+        return dict.fromkeys(CAMPSITE_FIELDS)
+
+
+def time_parser(parse, pages, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for html in pages:
+            _safe(parse, html)
+        timings.append(time.perf_counter() - started)
+    # best of N: the least noisy estimate of the actual CPU cost
+    return min(timings) / len(pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="directory of saved campsite .html pages")
+    parser.add_argument("--repeat", type=int, default=3, help="timing passes over the corpus")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.fixtures, "*.html")))
+    if not paths:
+        sys.exit(f"No .html fixtures in {args.fixtures}; run the scraper with --save-html first.")
+    pages = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+    print(f"{len(pages)} pages from {args.fixtures}")
+
+    backends = ["html.parser"] + (["lxml"] if lxml else [])
+    candidates = {"legacy": legacy_parse_campsite_page}
+    for backend in backends:
+        candidates[f"new ({backend})"] = lambda html, backend=backend: parse_campsite_page(html, parser=backend)
+
+    # Parity first: timing a parser that gets the wrong answer is pointless.
+    expected = [_safe(legacy_parse_campsite_page, html) for html in pages]
+    mismatched = False
+    for name, parse in candidates.items():
+        if name == "legacy":
+            continue
+        diffs = [
+            (path, field)
+            for path, html, want in zip(paths, pages, expected)
+            for field, value in _safe(parse, html).items()
+            if value != want[field]
+        ]
+        if diffs:
+            mismatched = mismatched or name == f"new ({HTML_PARSER})"
+            print(f"{name}: {len(diffs)} field mismatches, e.g.")
+            for path, field in diffs[:10]:
+                print(f"    {os.path.basename(path)}: {field}")
+        else:
+            print(f"{name}: identical to legacy on all {len(pages)} pages")
+
+    baseline = None
+    for name, parse in candidates.items():
+        per_page = time_parser(parse, pages, args.repeat)
+        baseline = baseline or per_page
+        print(f"{name:<20} {per_page * 1000:8.2f} ms/page  {baseline / per_page:5.2f}x")
+
+    sys.exit(1 if mismatched else 0)
+
+
+if __name__ == "__main__":
+    main()
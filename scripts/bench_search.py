@@ -0,0 +1,305 @@
+"""
+Benchmark the search and map hot paths against synthetic data.
+
+Generates campsites with scripts/synthetic_data.py at one or more scales and
+times:
+  text      - search_campsites with only a text query
+  filter    - search_campsites with only checkbox/forest filters
+  mixed     - text query + filters + a radius search
+  browse    - first page of a filter-only search (search_campsites_page)
+  store_build - reloading the in-memory campsite store (campsite_store.py)
+  map_build - rebuilding the map cluster index from scratch
+  map_query - answering clustered/point map views for a bbox
+
+Two places to put the data:
+  --target memory    (default) the in-memory campsite store is loaded
+                     straight from the generated rows, so this measures the
+                     Python side only and needs no database.
+  --target postgres  loads the rows into a throwaway database (created next
+                     to the real one and dropped afterwards) and measures the
+                     real path, store load included. With SEARCH_IN_MEMORY=false
+                     every search goes to Postgres instead.
+
+Run from the repo root:
+    python -m scripts.bench_search --scale 1k,10k,100k --target memory
+    python -m scripts.bench_search --scale 10k --target postgres
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import time
+import tracemalloc
+
+import psycopg2
+
+import db
+import map_index
+import search
+from scripts.synthetic_data import SCALES, generate_campsites, to_search_row
+
+# Minimal tables with exactly the columns the search/map code reads.
+BENCH_DDL = """
+CREATE TABLE campsites (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    forest_name TEXT,
+    managing_unit TEXT,
+    latitude DECIMAL(9,6),
+    longitude DECIMAL(9,6),
+    site_url TEXT
+);
+CREATE TABLE amenities (campsite_id INTEGER, water BOOLEAN, restrooms BOOLEAN);
+CREATE TABLE status_updates (campsite_id INTEGER, is_open BOOLEAN, last_checked TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE weather_forecasts (campsite_id INTEGER UNIQUE, forecast_json JSONB, last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE data_version (id INTEGER PRIMARY KEY DEFAULT 1, version BIGINT NOT NULL DEFAULT 0, updated_at TIMESTAMP);
+INSERT INTO data_version (id, version) VALUES (1, 0);
+CREATE INDEX ON amenities (campsite_id);
+CREATE INDEX ON status_updates (campsite_id);
+CREATE INDEX campsites_location_gist ON campsites USING gist (point(longitude::float8, latitude::float8));
+"""
+
+
+def search_view_ddl(schema_path="schema.sql"):
+    """The campsite_search view + indexes from schema.sql (minus pg_trgm ones)."""
+    with open(schema_path) as f:
+        statements = f.read().split(";\n")
+    return ";\n".join(
+        s for s in statements if "campsite_search" in s and "gin_trgm_ops" not in s
+    ) + ";"
+
+
+# --- in-memory stand-in -------------------------------------------------------
+
+def install_memory_backend(sites):
+    """Load search.py's in-memory store from the generated rows, not Postgres."""
+
+    rows = [to_search_row(s) for s in sites]
+
+    def fetch_candidates(norm_query, candidates, fuzzthresh=None, **filters):
+        return search._fetch_filtered_campsites(**filters)
+
+    search.SEARCH_IN_MEMORY = True
+    search._load_store_rows = lambda: rows
+    search._fetch_trgm_candidates = fetch_candidates
+    search.get_all_forests = lambda: sorted({r[2] for r in rows})
+    map_index.get_data_version = lambda: 0
+    search.get_data_version = lambda: 0
+
+
+# --- throwaway postgres -------------------------------------------------------
+
+def load_postgres(sites, dbname):
+    """Create ``dbname``, COPY the sites into it and point db.py at it."""
+
+    admin = psycopg2.connect(dbname="postgres", user=db.DB_USER)
+    admin.autocommit = True
+    admin.cursor().execute(f'DROP DATABASE IF EXISTS "{dbname}"')
+    admin.cursor().execute(f'CREATE DATABASE "{dbname}"')
+    admin.close()
+
+    conn = psycopg2.connect(dbname=dbname, user=db.DB_USER)
+    cur = conn.cursor()
+    cur.execute(BENCH_DDL)
+
+    buffers = {name: io.StringIO() for name in ("campsites", "amenities", "status_updates", "weather_forecasts")}
+    for s in sites:
+        buffers["campsites"].write(
+            f"{s['id']}\t{s['name']}\t{s['forest_name']}\t{s['latitude']}\t{s['longitude']}\n"
+        )
+        buffers["amenities"].write(f"{s['id']}\t{s['water']}\t{s['restrooms']}\n")
+        buffers["status_updates"].write(f"{s['id']}\t{s['is_open']}\n")
+        if s["forecast"]:
+            buffers["weather_forecasts"].write(f"{s['id']}\t{json.dumps(s['forecast'])}\n")
+
+    columns = {
+        "campsites": "(id, name, forest_name, latitude, longitude)",
+        "amenities": "(campsite_id, water, restrooms)",
+        "status_updates": "(campsite_id, is_open)",
+        "weather_forecasts": "(campsite_id, forecast_json)",
+    }
+    for table, buf in buffers.items():
+        buf.seek(0)
+        cur.copy_expert(f"COPY {table} {columns[table]} FROM STDIN", buf)
+    # Built after the COPY so it's populated, just like production.
+    cur.execute(search_view_ddl())
+    cur.execute("ANALYZE;")
+    conn.commit()
+    cur.close()
+    conn.close()
+
+    db.close_pool()
+    db.DB_NAME = dbname
+    map_index.invalidate()
+
+
+def drop_postgres(dbname, original_dbname):
+    db.close_pool()
+    db.DB_NAME = original_dbname
+    admin = psycopg2.connect(dbname="postgres", user=db.DB_USER)
+    admin.autocommit = True
+    admin.cursor().execute(f'DROP DATABASE IF EXISTS "{dbname}"')
+    admin.close()
+
+
+# --- scenarios ----------------------------------------------------------------
+
+def build_scenarios(sites, count, seed=0):
+    """Return {scenario name: [zero-arg callables]} sampled from the data."""
+
+    rng = random.Random(seed)
+    sample = rng.sample(sites, min(count, len(sites)))
+    forests = sorted({s["forest_name"] for s in sites})
+
+    def text_query(site):
+        kind = rng.choice(["exact", "prefix", "typo", "forest"])
+        name = site["name"]
+        if kind == "prefix":
+            return name[: max(3, len(name) // 2)]
+        if kind == "typo" and len(name) > 3:
+            i = rng.randrange(len(name))
+            return name[:i] + name[i + 1:]
+        if kind == "forest":
+            return site["forest_name"].split(" National")[0]
+        return name
+
+    def random_filters():
+        filters = {
+            "is_open": rng.choice([True, None]),
+            "has_water": rng.choice([True, None]),
+            "has_restrooms": rng.choice([True, None]),
+        }
+        if rng.random() < 0.5:
+            filters["forest"] = rng.choice(forests).split(" ")[0].lower()
+        return filters
+
+    scenarios = {
+        "text": [],
+        "filter": [],
+        "mixed": [],
+        "browse": [],
+        "store_build": [],
+        "map_build": [],
+        "map_query": [],
+    }
+    for site in sample:
+        q = text_query(site)
+        scenarios["text"].append(lambda q=q: search.search_campsites(query=q))
+
+        f = random_filters()
+        scenarios["filter"].append(lambda f=f: search.search_campsites(**f))
+
+        f = random_filters()
+        near = (site["latitude"], site["longitude"])
+        scenarios["mixed"].append(
+            lambda q=q, f=f, near=near: search.search_campsites(query=q, near=near, radius_km=50, **f)
+        )
+
+        f = random_filters()
+        scenarios["browse"].append(lambda f=f: search.search_campsites_page(page_size=50, **f))
+
+    def rebuild_store():
+        search.invalidate_store()
+        return search.get_store()
+
+    scenarios["store_build"] = [rebuild_store] * max(1, count // 10)
+
+    def rebuild_map():
+        map_index.invalidate()
+        return map_index.get_index()
+
+    scenarios["map_build"] = [rebuild_map] * max(1, count // 10)
+    for site in sample[:max(1, count // 5)]:
+        lat, lon = site["latitude"], site["longitude"]
+        for zoom, span in ((6, 4.0), (9, 0.8), (12, 0.1)):
+            bbox = (lon - span, lat - span / 2, lon + span, lat + span / 2)
+            scenarios["map_query"].append(lambda bbox=bbox, zoom=zoom: map_index.query_map(bbox=bbox, zoom=zoom))
+    return scenarios
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def run_scenario(calls):
+    # Warm-up call so one-time costs (index build, caches) don't skew p50.
+    calls[0]()
+
+    timings = []
+    for call in calls:
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+
+    # Memory is measured in a separate pass: tracemalloc slows everything down.
+    tracemalloc.start()
+    for call in calls[: min(len(calls), 10)]:
+        call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "n": len(timings),
+        "p50_ms": percentile(timings, 0.50) * 1000,
+        "p95_ms": percentile(timings, 0.95) * 1000,
+        "peak_mb": peak / 1024 / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="1k,10k", help=f"comma-separated, from {', '.join(SCALES)}")
+    parser.add_argument("--target", choices=["memory", "postgres"], default="memory")
+    parser.add_argument("--queries", type=int, default=50, help="calls per scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_out", help="also write the results to this file")
+    parser.add_argument(
+        "--search-cache",
+        action="store_true",
+        help="leave the search result cache on (off by default so every call does the real work)",
+    )
+    args = parser.parse_args()
+
+    if not args.search_cache:
+        search.SEARCH_CACHE_SIZE = 0
+
+    results = []
+    for scale in args.scale.lower().split(","):
+        count = SCALES[scale.strip()]
+        print(f"\n== {scale} ({count} campsites, {args.target}) ==")
+        sites = list(generate_campsites(count, seed=args.seed))
+
+        bench_db = f"camping_bench_{os.getpid()}"
+        original_db = db.DB_NAME
+        if args.target == "postgres":
+            load_postgres(sites, bench_db)
+        else:
+            install_memory_backend(sites)
+        # Every bench database starts at data version 0, so drop whatever the
+        # previous scale left behind.
+        search.invalidate_store()
+        map_index.invalidate()
+
+        try:
+            for name, calls in build_scenarios(sites, args.queries, seed=args.seed).items():
+                stats = run_scenario(calls)
+                stats.update({"scale": scale, "scenario": name, "target": args.target})
+                results.append(stats)
+                print(
+                    f"{name:<10} n={stats['n']:<4} p50={stats['p50_ms']:9.2f} ms  "
+                    f"p95={stats['p95_ms']:9.2f} ms  peak={stats['peak_mb']:8.1f} MB"
+                )
+        finally:
+            if args.target == "postgres":
+                drop_postgres(bench_db, original_db)
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Compare the pg_trgm candidate prefilter against the full-scan search path.
+
+Runs the same set of queries through search_campsites twice (prefilter off,
+then on) and reports how often the results match and how long each path took.
+Queries are built from the campsite and forest names already in the database:
+exact names, prefixes, names with a typo, and forest names.
+
+Run from the repo root so the top-level modules import:
+    python -m scripts.bench_trgm_prefilter --queries 200 --candidates 500
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+import search
+from db import get_connection
+
+
+def build_queries(count, seed=0):
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT name, forest_name FROM campsites WHERE name IS NOT NULL;")
+        rows = cur.fetchall()
+        cur.close()
+
+    rng = random.Random(seed)
+    forests = sorted({f for _, f in rows if f})
+    queries = []
+    for _ in range(count):
+        name, _ = rng.choice(rows)
+        kind = rng.choice(["exact", "prefix", "typo", "forest"])
+        if kind == "exact":
+            queries.append(name)
+        elif kind == "prefix":
+            queries.append(name[: max(3, len(name) // 2)])
+        elif kind == "typo" and len(name) > 3:
+            i = rng.randrange(len(name))
+            queries.append(name[:i] + name[i + 1:])
+        elif forests:
+            queries.append(rng.choice(forests))
+        else:
+            queries.append(name)
+    return queries
+
+
+def result_key(results):
+    """Order-insensitive within equal scores, since tie order isn't defined."""
+    return sorted((-(r.get("score") or 0), r["id"]) for r in results)
+
+
+def time_search(query, prefilter):
+    started = time.perf_counter()
+    results = search.search_campsites(query=query, prefilter=prefilter)
+    return results, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--candidates", type=int, default=search.TRGM_CANDIDATES)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    search.TRGM_CANDIDATES = args.candidates
+    queries = build_queries(args.queries, seed=args.seed)
+
+    full_times, trgm_times = [], []
+    exact_matches = 0
+    top10_overlap = []
+
+    for query in queries:
+        full, full_s = time_search(query, prefilter=False)
+        trgm, trgm_s = time_search(query, prefilter=True)
+        full_times.append(full_s)
+        trgm_times.append(trgm_s)
+
+        if result_key(full) == result_key(trgm):
+            exact_matches += 1
+        else:
+            print(f"Mismatch for {query!r}: full={len(full)} prefilter={len(trgm)}")
+
+        full_top = {r["id"] for r in full[:10]}
+        if full_top:
+            trgm_top = {r["id"] for r in trgm[:10]}
+            top10_overlap.append(len(full_top & trgm_top) / len(full_top))
+
+    def ms(values, pct):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * pct))] * 1000
+
+    print()
+    print(f"queries:            {len(queries)} (candidates={args.candidates})")
+    print(f"identical results:  {exact_matches}/{len(queries)}")
+    if top10_overlap:
+        print(f"top-10 overlap:     {statistics.mean(top10_overlap):.1%}")
+    print(f"full scan   p50/p95: {ms(full_times, .5):.1f} / {ms(full_times, .95):.1f} ms")
+    print(f"prefilter   p50/p95: {ms(trgm_times, .5):.1f} / {ms(trgm_times, .95):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Set-based loading for the sync scripts.
+
+Writing one UPDATE/INSERT per row (and committing after each) costs a round
+trip per row and leaves half-applied data behind when a run dies part way.
+Instead the rows are COPY'd into a TEMP staging table and applied with a
+single ``UPDATE ... FROM`` or ``INSERT ... SELECT`` per table, all inside one
+transaction:
+
+    with get_connection() as conn, load_transaction(conn) as load:
+        load.update("campsites", key="id", columns=["forest_name"], rows=rows)
+        load.insert("images", ["campsite_id", "image_url", "description"], rows,
+                    skip_existing=["campsite_id", "image_url"])
+
+A failed run rolls the whole thing back. Each step's row counts and timings
+are printed at the end.
+"""
+
+import io
+import time
+from contextlib import contextmanager
+
+
+def _copy_value(value):
+    # COPY text format: \N is NULL; backslash, tab and newlines are escaped.
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class BulkLoad:
+    """Staging + set-based apply steps that share one transaction."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cur = conn.cursor()
+        self.steps = []
+        self._staged = 0
+
+    def stage(self, table, columns, rows):
+        """COPY ``rows`` into a new TEMP table shaped like ``table``'s columns."""
+        self._staged += 1
+        staging = f"_stage_{table}_{self._staged}"
+        column_list = ", ".join(columns)
+        # Same column types as the target, but none of its constraints, and
+        # gone again at commit/rollback.
+        self.cur.execute(
+            f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+            f"SELECT {column_list} FROM {table} WITH NO DATA"
+        )
+
+        buf = io.StringIO()
+        count = 0
+        for row in rows:
+            buf.write("\t".join(_copy_value(v) for v in row))
+            buf.write("\n")
+            count += 1
+        buf.seek(0)
+        self.cur.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN", buf)
+        return staging, count
+
+    def _step(self, op, table, columns, rows, build_sql):
+        started = time.perf_counter()
+        staging, staged = self.stage(table, columns, rows)
+        copied = time.perf_counter()
+        self.cur.execute(build_sql(staging))
+        applied = self.cur.rowcount
+        done = time.perf_counter()
+
+        step = {
+            "op": op,
+            "table": table,
+            "staged": staged,
+            "applied": applied,
+            "copy_seconds": copied - started,
+            "apply_seconds": done - copied,
+        }
+        self.steps.append(step)
+        return step
+
+    def update(self, table, key, columns, rows):
+        """``UPDATE table SET columns FROM staging`` matched on ``key``.
+
+        ``rows`` are ``(key, *columns)`` tuples; keys should be unique.
+        """
+        assignments = ", ".join(f"{c} = s.{c}" for c in columns)
+        return self._step(
+            "update",
+            table,
+            [key, *columns],
+            rows,
+            lambda staging: f"UPDATE {table} AS t SET {assignments} FROM {staging} AS s WHERE t.{key} = s.{key}",
+        )
+
+    def insert(self, table, columns, rows, on_conflict=None, skip_existing=None):
+        """``INSERT INTO table SELECT ... FROM staging``.
+
+        ``on_conflict`` is appended as ``ON CONFLICT <on_conflict>`` (for
+        tables with a unique constraint). ``skip_existing`` names columns that
+        identify a row for tables without one: staged rows already present in
+        the table, or repeated within the batch, are left out.
+        """
+        column_list = ", ".join(columns)
+
+        def build_sql(staging):
+            select = f"SELECT {column_list} FROM {staging} AS s"
+            if skip_existing:
+                match = " AND ".join(f"t.{c} IS NOT DISTINCT FROM s.{c}" for c in skip_existing)
+                distinct = ", ".join(f"s.{c}" for c in skip_existing)
+                select = (
+                    f"SELECT DISTINCT ON ({distinct}) {column_list} FROM {staging} AS s "
+                    f"WHERE NOT EXISTS (SELECT 1 FROM {table} AS t WHERE {match})"
+                )
+            sql = f"INSERT INTO {table} ({column_list}) {select}"
+            if on_conflict:
+                sql += f" ON CONFLICT {on_conflict}"
+            return sql
+
+        return self._step("insert", table, columns, rows, build_sql)
+
+    def report(self):
+        for step in self.steps:
+            print(
+                f"{step['op']:<6} {step['table']:<20} staged={step['staged']:<7} applied={step['applied']:<7} "
+                f"copy={step['copy_seconds'] * 1000:8.1f} ms  apply={step['apply_seconds'] * 1000:8.1f} ms"
+            )
+
+
+@contextmanager
+def load_transaction(conn):
+    """Yield a BulkLoad; commit when the block finishes, roll back if it raises."""
+    started = time.perf_counter()
+    load = BulkLoad(conn)
+    try:
+        yield load
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        print("Bulk load failed; rolled back, nothing was written.")
+        raise
+    finally:
+        load.cur.close()
+    load.report()
+    print(f"Bulk load committed in {time.perf_counter() - started:.2f}s")
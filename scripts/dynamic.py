@@ -1,47 +1,248 @@
-from db import get_connection
-from weather import get_forecast
-from datetime import datetime
+from db import bump_data_version, get_connection, refresh_search_view
+from weather import daily_forecast_row, forecast_cell, get_forecast, upsert_daily_forecasts
+from ratelimit import TokenBucket
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from psycopg2.extras import execute_values
+import argparse
 import traceback
 import json
+import os
 import time
-import random
 
 """
 - Update the open/closed status of campsites
 
-- Refresh the weather forecast in your weather_forecasts table
+- Refresh the weather forecast in your weather_forecasts table, and the next
+  DAYS days of per-cell forecasts in daily_forecasts
 
 - Optionally update availability or last updated timestamps (later)
+
+Run from the repo root:
+    python -m scripts.dynamic --only-stale-older-than 6
+
+Sites are processed in id order, BATCH_SIZE at a time. Each batch is fetched
+concurrently (but never faster than the token bucket allows), written with one
+multi-row upsert and committed. After every commit the last finished id is
+written to the checkpoint file, so an interrupted run picks up where it left
+off the next time it starts.
+
+Nearby campgrounds share one forecast: every site is snapped onto the
+daily_forecasts grid (weather.forecast_cell, WEATHER_FORECAST_GRID_DEG) and
+each cell/date is fetched once per run (at the cell's coordinates), then
+copied to every campsite in that cell. Planning and storing on the same grid
+means each stored row comes from exactly one fetch. The run ends with the
+dedupe ratio, i.e. how many times fewer API calls that took.
 """
 
-def update_all_weather_and_status():
-    conn = get_connection()
-    cur = conn.cursor()
+# Stay under the OpenWeather quota: average calls/second and allowed burst.
+API_RATE_PER_SEC = float(os.getenv("WEATHER_API_RATE", "10"))
+API_BURST = int(os.getenv("WEATHER_API_BURST", "20"))
+
+# How many days ahead (today included) go into daily_forecasts.
+DAYS = int(os.getenv("WEATHER_REFRESH_DAYS", "7"))
+UNITS = "imperial"
+
+BATCH_SIZE = 100
+WORKERS = 8
+CHECKPOINT_PATH = ".cache/dynamic_checkpoint.json"
+
+
+def load_checkpoint(path):
+    """Return the last campsite id a previous (interrupted) run committed."""
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return json.load(f).get("last_id", 0)
+
+
+def save_checkpoint(path, last_id):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"last_id": last_id, "saved_at": time.time()}, f)
+    # rename is atomic, so a crash never leaves a half-written checkpoint
+    os.replace(tmp_path, path)
+
+
+def clear_checkpoint(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def select_campsites(cur, after_id=0, stale_hours=None):
+    """Campsites with coordinates, in id order, optionally only stale ones.
+
+    Staleness is judged on each campsite's latest weather_forecasts row, so a
+    campsite is listed once even if the table still holds older rows.
+    """
+    sql = """
+        SELECT campsites.id, campsites.latitude, campsites.longitude
+        FROM campsites
+        LEFT JOIN LATERAL (
+            SELECT weather_forecasts.last_updated
+            FROM weather_forecasts
+            WHERE weather_forecasts.campsite_id = campsites.id
+            ORDER BY weather_forecasts.last_updated DESC NULLS LAST
+            LIMIT 1
+        ) AS latest_forecast ON TRUE
+        WHERE campsites.latitude IS NOT NULL
+          AND campsites.longitude IS NOT NULL
+          AND campsites.id > %s
+    """
+    params = [after_id]
+
+    if stale_hours is not None:
+        sql += """
+          AND (latest_forecast.last_updated IS NULL
+               OR latest_forecast.last_updated < NOW() - %s * INTERVAL '1 hour')
+        """
+        params.append(stale_hours)
+
+    sql += " ORDER BY campsites.id;"
+    cur.execute(sql, params)
+    return cur.fetchall()
+
+
+def grid_cell(lat, lon, day):
+    """The (cell_lat, cell_lon, date) a campsite's forecast is fetched and stored for."""
+    cell_lat, cell_lon = forecast_cell(lat, lon)
+    return cell_lat, cell_lon, day
+
+
+def plan_fetches(batch, day):
+    """Group a batch of ``(id, lat, lon)`` sites by grid cell: {cell: [site ids]}."""
+    plan = {}
+    for site_id, lat, lon in batch:
+        plan.setdefault(grid_cell(lat, lon, day), []).append(site_id)
+    return plan
+
+
+def fetch_batch(executor, bucket, batch, days, forecasts=None, stats=None):
+    """Fetch forecasts for one batch concurrently.
+
+    Returns ``(rows, daily_rows, failures)``: today's (``days[0]``) forecast
+    JSON per site for weather_forecasts, every fetched day as daily_forecasts
+    rows, and how many sites have no forecast for today.
+
+    Only (cell, date) pairs not already in ``forecasts`` (the run's
+    cell -> summary map, updated here) are fetched, one upstream call each,
+    and every site gets its cell's forecast. ``stats`` counts sites and
+    upstream calls.
+    """
+    forecasts = {} if forecasts is None else forecasts
+    plan = {}
+    for day in days:
+        plan.update(plan_fetches(batch, day))
+    missing = [cell for cell in plan if cell not in forecasts]
 
-    # Get all campsites
-    cur.execute("SELECT id, latitude, longitude FROM campsites;")
-    campsites = cur.fetchall()
+    def fetch(cell):
+        lat, lon, cell_day = cell
+        bucket.acquire()
+        # Straight to OpenWeather: reading through the 3 h forecast cache
+        # would stamp a possibly hours-old answer with a fresh last_updated /
+        # fetched_at (and spend a token on a call that never happened).
+        return get_forecast(lat, lon, cell_day, UNITS, use_cache=False)
 
-    for i, (site_id, lat, lon) in enumerate(campsites):
-        time.sleep(random.uniform(1, 2))
+    futures = [executor.submit(fetch, cell) for cell in missing]
+
+    for cell, future in zip(missing, futures):
         try:
-            # Update weather 
-            forecast = get_forecast(lat, lon, datetime.now())
-
-            # Upsert weather forecast
-            cur.execute("""
-            INSERT INTO weather_forecasts (campsite_id, forecast_json, last_updated)
-            VALUES (%s, %s, CURRENT_TIMESTAMP)
-            ON CONFLICT (campsite_id) DO UPDATE
-            SET forecast_json = EXCLUDED.forecast_json,
+            forecasts[cell] = future.result()
+        except Exception:
+            # Not remembered, so a later batch with this cell tries again.
+            print(f"Error fetching cell {cell[:2]} for {cell[2]} (sites {plan[cell]})")
+            traceback.print_exc()
+
+    if stats is not None:
+        stats["sites"] += len(batch)
+        stats["fetches"] += len(missing)
+
+    rows = []
+    daily_rows = []
+    failures = 0
+    for site_id, lat, lon in batch:
+        today = forecasts.get(grid_cell(lat, lon, days[0]))
+        if today is None:
+            failures += 1
+        else:
+            rows.append((site_id, json.dumps(today)))
+
+        for day in days:
+            cell = grid_cell(lat, lon, day)
+            summary = forecasts.get(cell)
+            if summary is not None:
+                daily_rows.append(daily_forecast_row(cell[:2], day, UNITS, summary))
+    return rows, daily_rows, failures
+
+
+def dedupe_report(stats, days=1):
+    lookups = stats["sites"] * days
+    fetches = stats["fetches"]
+    ratio = lookups / fetches if fetches else 0.0
+    return f"{stats['sites']} sites x {days} days served by {fetches} forecast calls ({ratio:.1f}x dedupe)"
+
+
+def upsert_forecasts(cur, rows):
+    # One statement per batch instead of one per site.
+    execute_values(
+        cur,
+        """
+        INSERT INTO weather_forecasts (campsite_id, forecast_json, last_updated)
+        VALUES %s
+        ON CONFLICT (campsite_id) DO UPDATE
+        SET forecast_json = EXCLUDED.forecast_json,
             last_updated = CURRENT_TIMESTAMP;
-            """, (site_id, json.dumps(forecast)))
-            print(f"Updated weather for site {site_id}: {forecast}")
+        """,
+        rows,
+        template="(%s, %s, CURRENT_TIMESTAMP)",
+    )
+
+
+def update_all_weather_and_status(
+    stale_hours=None,
+    batch_size=BATCH_SIZE,
+    workers=WORKERS,
+    rate=API_RATE_PER_SEC,
+    burst=API_BURST,
+    checkpoint_path=CHECKPOINT_PATH,
+    days=DAYS,
+):
+    bucket = TokenBucket(rate, burst)
+    start_after = load_checkpoint(checkpoint_path)
+    if start_after:
+        print(f"Resuming after campsite {start_after} (checkpoint {checkpoint_path})")
 
+    today = date.today()
+    dates = [today + timedelta(days=i) for i in range(max(days, 1))]
+    updated = 0
+    failed = 0
+    # One forecast per grid cell for the whole run, shared across batches.
+    forecasts = {}
+    stats = {"sites": 0, "fetches": 0}
+    started = time.perf_counter()
+
+    with get_connection() as conn, ThreadPoolExecutor(max_workers=workers) as executor:
+        cur = conn.cursor()
+
+        campsites = select_campsites(cur, after_id=start_after, stale_hours=stale_hours)
+        conn.commit()
+        print(f"{len(campsites)} campsites to refresh")
+
+        for offset in range(0, len(campsites), batch_size):
+            batch = campsites[offset:offset + batch_size]
+
+            rows, daily_rows, failures = fetch_batch(
+                executor, bucket, batch, dates, forecasts=forecasts, stats=stats
+            )
+            if rows:
+                upsert_forecasts(cur, rows)
+            if daily_rows:
+                upsert_daily_forecasts(cur, daily_rows)
 
             # Update open/closed status
 
-            is_open = True  # Replace with scraper/API call
+            # is_open = True  # Replace with scraper/API call
 
             # cur.execute("""
             #     INSERT INTO status_updates (campsite_id, is_open, last_checked)
@@ -51,19 +252,67 @@ def update_all_weather_and_status():
             #         last_checked = CURRENT_TIMESTAMP;
             # """, (site_id, is_open))
 
-            print(f"Updated site {site_id}")
+            # Commit every batch so progress survives an interruption, then
+            # move the checkpoint past it.
+            conn.commit()
+            save_checkpoint(checkpoint_path, batch[-1][0])
 
-        except Exception:
-            print(f"Error updating site {site_id}")
-            traceback.print_exc()
-            
-        # break loop after 4 updates to test and not overload the database
-        if i == 4:
-            break
+            # Publish the new forecasts to the search view. CONCURRENTLY
+            # keeps searches reading the old rows while it rebuilds.
+            if rows:
+                refresh_search_view(cur)
+                conn.commit()
+
+            updated += len(rows)
+            failed += failures
+            elapsed = time.perf_counter() - started
+            print(
+                f"Batch done: {offset + len(batch)}/{len(campsites)} sites, "
+                f"{updated} updated, {failed} failed, {stats['fetches']} forecast calls, "
+                f"{elapsed:.1f}s elapsed"
+            )
+
+        # Let the web app know its cached search/map data is out of date.
+        if updated:
+            bump_data_version(cur)
+            conn.commit()
+        cur.close()
+
+    # A full pass finished, so the next run starts from the beginning again.
+    clear_checkpoint(checkpoint_path)
+    print(f"Refreshed {updated} campsites ({failed} failed) in {time.perf_counter() - started:.1f}s")
+    print(dedupe_report(stats, len(dates)))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Refresh campsite weather (and later status).")
+    parser.add_argument(
+        "--only-stale-older-than",
+        type=float,
+        metavar="HOURS",
+        dest="stale_hours",
+        help="only refresh sites whose forecast is missing or older than this many hours",
+    )
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--rate", type=float, default=API_RATE_PER_SEC, help="max API calls per second")
+    parser.add_argument("--burst", type=int, default=API_BURST)
+    parser.add_argument("--days", type=int, default=DAYS, help="days ahead to store in daily_forecasts")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    parser.add_argument("--restart", action="store_true", help="ignore any saved checkpoint")
+    return parser.parse_args()
 
-    conn.commit()
-    cur.close()
-    conn.close()
 
 if __name__ == "__main__":
-    update_all_weather_and_status()
+    args = parse_args()
+    if args.restart:
+        clear_checkpoint(args.checkpoint)
+    update_all_weather_and_status(
+        stale_hours=args.stale_hours,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        rate=args.rate,
+        burst=args.burst,
+        checkpoint_path=args.checkpoint,
+        days=args.days,
+    )
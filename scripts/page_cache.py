@@ -0,0 +1,165 @@
+"""
+On-disk HTTP cache for the fs.usda.gov crawl.
+
+Every page we fetch is stored in a small SQLite file together with its ETag /
+Last-Modified validators and a sha256 of the body. The next crawl sends those
+validators back (conditional GET): an unchanged page costs a 304 with no body,
+and even servers that ignore the validators let us spot an unchanged page by
+its hash. For campsite pages we also keep the parsed record, so an unchanged
+page is never parsed again.
+
+Used by scripts/pull_static_info_for_park.py --incremental.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+PAGE_CACHE_PATH = os.getenv("SCRAPER_CACHE_PATH", ".cache/scrape_pages.sqlite3")
+
+
+class PageFetchError(Exception):
+    """A page came back with something other than 200/304; nothing was cached."""
+
+    def __init__(self, url, status_code):
+        super().__init__(f"{url} returned HTTP {status_code}")
+        self.url = url
+        self.status_code = status_code
+
+
+class PageCache:
+    """URL -> (validators, sha256, body, parsed record), shared across threads."""
+
+    def __init__(self, path=PAGE_CACHE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    sha256 TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    record TEXT,
+                    fetched_at REAL NOT NULL
+                )
+                """
+            )
+        self._lock = threading.Lock()
+        # not_modified: 304s, same_hash: 200 but identical body,
+        # changed: body differs from the cached copy, new: never seen before
+        self.stats = {"not_modified": 0, "same_hash": 0, "changed": 0, "new": 0}
+
+    def _connect(self):
+        # One short-lived connection per call keeps this safe to use from the
+        # scraper's thread pools.
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _count(self, outcome):
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def lookup(self, url):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT etag, last_modified, sha256, body, record FROM pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, sha256, body, record = row
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "sha256": sha256,
+            "text": zlib.decompress(body).decode("utf-8"),
+            "record": json.loads(record) if record else None,
+        }
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url, response, sha256):
+        """Save a fresh 200 response; any previously parsed record is dropped."""
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO pages (url, etag, last_modified, sha256, body, record, fetched_at)
+                VALUES (?, ?, ?, ?, ?, NULL, ?)
+                """,
+                (
+                    url,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    sha256,
+                    zlib.compress(response.text.encode("utf-8")),
+                    time.time(),
+                ),
+            )
+
+    def refresh_validators(self, url, response):
+        """Same body as before, but the server may have sent new validators."""
+        with self._connect() as conn:
+            conn.execute(
+                """
+                UPDATE pages
+                SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), fetched_at = ?
+                WHERE url = ?
+                """,
+                (response.headers.get("ETag"), response.headers.get("Last-Modified"), time.time(), url),
+            )
+
+    def save_record(self, url, record, sha256):
+        """Attach the parsed ``record`` to the stored body it was parsed from.
+
+        Only written while the stored body still has ``sha256``, so a record
+        can never end up next to a different page than the one it came from.
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE pages SET record = ? WHERE url = ? AND sha256 = ?",
+                (json.dumps(record), url, sha256),
+            )
+
+    def fetch(self, url, get):
+        """Fetch ``url`` with ``get(url, headers=...)``, using the cache.
+
+        Returns ``(text, entry, sha256)``. ``entry`` is the cached row when
+        the page is unchanged (so callers can reuse ``entry["record"]``) and
+        None otherwise; ``sha256`` identifies the stored body, for
+        ``save_record``. Any other status than 200/304 raises
+        ``PageFetchError`` and leaves the cached copy alone, so an error page
+        is never parsed into a record.
+        """
+        entry = self.lookup(url)
+        response = get(url, headers=self.conditional_headers(entry))
+
+        if response.status_code == 304 and entry is not None:
+            self._count("not_modified")
+            self.refresh_validators(url, response)
+            return entry["text"], entry, entry["sha256"]
+
+        if response.status_code != 200:
+            raise PageFetchError(url, response.status_code)
+
+        sha256 = hashlib.sha256(response.content).hexdigest()
+        if entry is not None and entry["sha256"] == sha256:
+            self._count("same_hash")
+            self.refresh_validators(url, response)
+            return entry["text"], entry, sha256
+
+        self._count("changed" if entry is not None else "new")
+        self.store(url, response, sha256)
+        return response.text, None, sha256
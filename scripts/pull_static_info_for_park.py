@@ -1,19 +1,324 @@
+"""
+Scrape static campsite info (seasons, fees, coordinates, amenities, ...) for
+every national forest in all_urls from fs.usda.gov.
+
+Run from the repo root:
+    python -m scripts.pull_static_info_for_park                 # full crawl -> data/<forest>.csv
+    python -m scripts.pull_static_info_for_park --incremental   # nightly refresh
+
+--incremental sends conditional GETs through the page cache
+(scripts/page_cache.py), only parses campsite pages whose content changed,
+and writes data/parquet/forest=<forest>/campsites.parquet plus
+data/parquet/_manifest.json listing what was added/changed/removed and which
+pages or forests failed (those keep their previous data).
+Writing Parquet needs pyarrow.
+"""
+
 import pandas as pd
+import argparse
+import json
 import os
+import re
 import time
 import random
-import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 from bs4 import BeautifulSoup
 
-def get_accordion_text_by_label(soup, label):
-    """Finds text content inside an accordion by its button label"""
-    button = soup.find("button", string=lambda s: s and label in s)
-    if button:
-        content_div = button.find_parent("h3").find_next_sibling("div")
-        return content_div.get_text(strip=True, separator="\n") if content_div else None
-    return None
+import http_client
+from scripts.page_cache import PAGE_CACHE_PATH, PageCache
+
+try:
+    import lxml  # noqa: F401  (only needed as a BeautifulSoup backend)
+except ImportError:
+    lxml = None
+
+# --- crawl settings ---
+# Everything we fetch lives on fs.usda.gov, so these per-host limits are what
+# keep a parallel crawl polite: at most HOST_CONCURRENCY requests in flight to
+# one host, and request starts spaced at least HOST_MIN_INTERVAL (+ jitter)
+# seconds apart.
+HOST_CONCURRENCY = 4
+HOST_MIN_INTERVAL = 0.25
+HOST_JITTER = 0.25
+# (connect, read) timeout in seconds so one stuck page can't hang the crawl
+REQUEST_TIMEOUT = (10, 30)
+# Transient failures (connection errors, 429/5xx) are retried this many
+# times with jittered exponential backoff starting around REQUEST_BACKOFF
+# seconds. If fs.usda.gov keeps failing, http_client's circuit breaker makes
+# the remaining pages fail fast instead of each waiting out its retries.
+REQUEST_RETRIES = 4
+REQUEST_BACKOFF = 1
+# Forests crawled at the same time, and campsite pages per forest at once.
+FOREST_WORKERS = 4
+PAGE_WORKERS = 4
+# BeautifulSoup backend for the campsite pages. html.parser is what the
+# extraction was written against: lxml is several times faster but repairs
+# unclosed <p> tags differently, which changes latitude/longitude/overview/
+# amenities on sloppy pages. Opt in with SCRAPER_HTML_PARSER=lxml only after
+# scripts/bench_parse_campsite.py reports identical fields on a fresh corpus.
+HTML_PARSER = os.getenv("SCRAPER_HTML_PARSER") or "html.parser"
+
+
+class HostThrottle:
+    """Per-host concurrency limit plus a minimum gap between request starts."""
+
+    def __init__(self, concurrency=HOST_CONCURRENCY, min_interval=HOST_MIN_INTERVAL, jitter=HOST_JITTER):
+        self.concurrency = concurrency
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._next_start = {}
+
+    def _slot(self, host):
+        with self._lock:
+            if host not in self._slots:
+                self._slots[host] = threading.Semaphore(self.concurrency)
+                self._next_start[host] = 0.0
+            return self._slots[host]
+
+    def wait_turn(self, host):
+        # Reserve the next start time for this host, then sleep until it.
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start[host])
+            self._next_start[host] = start + self.min_interval + random.uniform(0, self.jitter)
+        delay = start - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+_throttle = HostThrottle()
+
+
+def polite_get(url, headers=None):
+    """GET through the shared HTTP client, respecting the per-host limits."""
+    host = urlparse(url).netloc
+    slot = _throttle._slot(host)
+    with slot:
+        _throttle.wait_turn(host)
+        return http_client.get(
+            url, headers=headers, timeout=REQUEST_TIMEOUT, retries=REQUEST_RETRIES, backoff=REQUEST_BACKOFF
+        )
+
+
+def fetch_text(url, cache=None):
+    """Page body for ``url``, the PageCache entry when it hasn't changed and
+    the sha256 of the cached body (both None without a cache).
+
+    With a cache, error pages raise ``PageFetchError`` instead of being
+    returned, so they are never parsed over a good stored record.
+    """
+    if cache is None:
+        return polite_get(url).text, None, None
+    return cache.fetch(url, polite_get)
+
+
+# Fields collected from each campsite page, in CSV column order
+CAMPSITE_FIELDS = [
+    "season_of_use",
+    "fee_info",
+    "contact_info",
+    "info_center",
+    "latitude",
+    "longitude",
+    "directions",
+    "restrooms",
+    "water",
+    "overview",
+    "amenities",
+    "body_of_water",
+]
+
+# Accordion sections, keyed by the field they fill: field -> button label
+ACCORDION_LABELS = {
+    "season_of_use": "Seasons of Use",
+    "fee_info": "Fee Site and Info",
+    "contact_info": "Contact Information",
+    "info_center": "Information Center",
+}
+
+
+def _accordion_text(button):
+    """Text of the accordion panel that belongs to ``button`` (or None)."""
+    if button is None:
+        return None
+    content_div = button.find_parent("h3").find_next_sibling("div")
+    return content_div.get_text(strip=True, separator="\n") if content_div else None
+
+
+def parse_campsite_page(html, parser=None):
+    """Pull CAMPSITE_FIELDS out of one campsite detail page.
+
+    Pure function: takes the page HTML, returns a dict, touches nothing else.
+    Instead of searching the whole tree once per field we walk every tag a
+    single time and remember the handful of elements the fields come from
+    (accordion buttons, the "margin-top-5" sections, the recreation
+    opportunities list, the intro and general info blocks). Everything after
+    that only looks inside those small subtrees.
+
+    Raises on pages that don't look like a campsite page (e.g. an accordion
+    button outside an <h3>); scrape_campsite() turns that into an all-None row.
+    """
+    soup = BeautifulSoup(html, parser or HTML_PARSER)
+
+    buttons = {}
+    sections = []
+    opportunities = rec_intro = general_info = None
+
+    for tag in soup.find_all(True):
+        if tag.name == "button":
+            if len(buttons) < len(ACCORDION_LABELS):
+                label_text = tag.string
+                if label_text:
+                    for field, label in ACCORDION_LABELS.items():
+                        if field not in buttons and label in label_text:
+                            buttons[field] = tag
+        elif tag.name == "div":
+            classes = tag.get("class")
+            if not classes:
+                continue
+            if "margin-top-5" in classes:
+                sections.append(tag)
+                if opportunities is None and " ".join(classes) == "opportunities margin-top-5":
+                    opportunities = tag
+            if rec_intro is None and "rec-intro" in classes:
+                rec_intro = tag
+            if general_info is None and "field--name-field-rec-general-info" in classes:
+                general_info = tag
+
+    record = dict.fromkeys(CAMPSITE_FIELDS)
+
+    # Accordion-based fields
+    for field in ACCORDION_LABELS:
+        record[field] = _accordion_text(buttons.get(field))
+
+    # The first section headed "Getting There" / "Facility and Amenity
+    # Information" (by its first <h2>) holds the next few fields.
+    getting_there = facilities = None
+    for block in sections:
+        h2 = block.find("h2")
+        heading = h2.get_text(strip=True) if h2 else ""
+        if getting_there is None and "Getting There" in heading:
+            getting_there = block
+        if facilities is None and "Facility and Amenity Information" in heading:
+            facilities = block
+        if getting_there is not None and facilities is not None:
+            break
+
+    # Latitude, Longitude, Directions
+    lat, lon, directions = None, None, None
+    if getting_there is not None:
+        for p in getting_there.find_all("p"):
+            t = p.get_text(strip=True)
+            if "Latitude:" in t: lat = t.replace("Latitude:", "").strip()
+            elif "Longitude:" in t: lon = t.replace("Longitude:", "").strip()
+            elif "From" in t or "Take" in t: directions = t
+    record["latitude"] = lat
+    record["longitude"] = lon
+    record["directions"] = directions
+
+    # Facility Info
+    restrooms, water = None, None
+    if facilities is not None:
+        for p in facilities.find_all("p"):
+            t = p.get_text(strip=True)
+            if "Restroom" in t: restrooms = t
+            elif "water" in t.lower(): water = t
+    record["restrooms"] = restrooms
+    record["water"] = water
+
+    # recreation opportunities
+    body_of_water = False  # default
+    if opportunities is not None:
+        for item in opportunities.find_all("a", class_="opportunity__item"):
+            text = item.get_text(strip=True).lower()
+            if "water" in text or "swimming" in text or "boating" in text or "lake" in text:
+                body_of_water = True
+                break
+    record["body_of_water"] = body_of_water
+
+    # Overview & Amenities
+    overview_div = rec_intro.find("div", class_="field field--name-field-rec-description") if rec_intro else None
+    overview_text, amenities_text = None, None
+
+    if overview_div:
+        for p in overview_div.find_all("p"):
+            t = p.get_text(strip=True)
+            if "Overview" in t and not overview_text:
+                next_p = p.find_next_sibling("p")
+                if next_p: overview_text = next_p.get_text(strip=True)
+            if "Amenities:" in t and not amenities_text:
+                amenities_text = t.replace("Amenities:", "").strip()
+            if overview_text and amenities_text:
+                break
+
+    # General Info fallback for amenities
+    if not amenities_text:
+        amenities_text = ""
+        if general_info:
+            for p in general_info.find_all("p"):
+                if "Amenities" in p.text:
+                    after = p.get_text(strip=True).replace("Amenities:", "").strip()
+                    if after:
+                        amenities_text = after
+                    else:
+                        ul = p.find_next_sibling("ul")
+                        if ul:
+                            for li in ul.find_all("li"):
+                                amenities_text += "- " + li.get_text(strip=True) + "\n"
+        else:
+            amenities_text = None
+
+    record["overview"] = overview_text
+    record["amenities"] = amenities_text
+    return record
+
+
+def html_fixture_name(url):
+    """File name a campsite page is saved under with --save-html."""
+    parsed = urlparse(url)
+    return re.sub(r"[^A-Za-z0-9]+", "_", f"{parsed.path}_{parsed.query}").strip("_") + ".html"
 
-def scrape_forest_static_data(forest_path):
+
+def scrape_campsite(camp_url, save_html_dir=None, cache=None, failures=None):
+    """Fetch one campsite page and parse it with parse_campsite_page().
+
+    Any error leaves every field as None for that campsite (same as before),
+    so one bad page never sinks the rest of the forest; with a ``failures``
+    dict the error is also recorded there under ``camp_url``, so callers can
+    tell a failed page from an empty one. With ``save_html_dir``
+    the raw page is also written there, which is how the fixture corpus for
+    scripts/bench_parse_campsite.py gets built. With a PageCache, a page that
+    hasn't changed since the last crawl reuses its stored record unparsed.
+    """
+    try:
+        html, unchanged, sha256 = fetch_text(camp_url, cache)
+        if save_html_dir:
+            with open(os.path.join(save_html_dir, html_fixture_name(camp_url)), "w", encoding="utf-8") as f:
+                f.write(html)
+        if unchanged is not None and unchanged["record"] is not None:
+            return unchanged["record"]
+        record = parse_campsite_page(html)
+        if cache is not None:
+            cache.save_record(camp_url, record, sha256)
+        return record
+    except Exception as e:
+        print(f"Error scraping {camp_url}: {e}")
+        if failures is not None:
+            failures[camp_url] = f"{type(e).__name__}: {e}"
+        return dict.fromkeys(CAMPSITE_FIELDS)
+
+
+def scrape_forest_static_data(forest_path, save_html_dir=None, cache=None, failures=None):
+    """Crawl one forest's listing and campsite pages into a DataFrame.
+
+    Campsite pages that fail come back as all-None rows and, with a
+    ``failures`` dict, are listed there (see scrape_campsite). A listing page
+    that fails raises.
+    """
     page = 0
     site_name = []
     site_url = []
@@ -28,8 +333,8 @@ def scrape_forest_static_data(forest_path):
     while True:  
         full_url = f"{forest_url}{rest_of_it}?items_per_page=50&page=,{page}"
         print(f"Scraping list page {page}: {full_url}")
-        r = requests.get(full_url)
-        soup = BeautifulSoup(r.text, 'html.parser')
+        html, _, _ = fetch_text(full_url, cache)
+        soup = BeautifulSoup(html, 'html.parser')
 
         container = soup.find("div", class_="rows__container")
         if not container:
@@ -50,13 +355,12 @@ def scrape_forest_static_data(forest_path):
         pager_next = soup.find("a", class_="usa-pagination__next-page")
         if pager_next:
             page += 1
-            time.sleep(random.uniform(1, 2))  # polite delay
         else:
             break
         
     # Grab the park name
-    pr = requests.get(forest_url)
-    soup = BeautifulSoup(pr.text, "html.parser")
+    html, _, _ = fetch_text(forest_url, cache)
+    soup = BeautifulSoup(html, "html.parser")
     breadcrumb = soup.find("nav", class_="usa-breadcrumb")
     breadcrumb_items = breadcrumb.find_all("li", class_="usa-breadcrumb__list-item")
     forest_name = breadcrumb_items[-1].get_text(strip=True) if breadcrumb_items else "Unknown"
@@ -71,127 +375,19 @@ def scrape_forest_static_data(forest_path):
         "park_url": park_url
     })
 
-    # Fields to collect
-    fields = {
-        "season_of_use": [],
-        "fee_info": [],
-        "contact_info": [],
-        "info_center": [],
-        "latitude": [],
-        "longitude": [],
-        "directions": [],
-        "restrooms": [],
-        "water": [],
-        "overview": [],
-        "amenities": [],
-        "body_of_water": []
-    }
-
-    for i, camp_url in enumerate(df["site_url"]):
+    # Fetch every campsite page in this forest a few at a time; map() keeps
+    # the results in the same order as the rows in df.
+    def scrape(item):
+        i, camp_url = item
         print(f"[{forest_path}] Scraping ({i + 1}/{len(df)}): {camp_url}")
-        time.sleep(random.uniform(1, 2))
-
-        try:
-            r = requests.get(camp_url)
-            soup = BeautifulSoup(r.text, "html.parser")
-
-            # Accordion-based fields
-            fields["season_of_use"].append(get_accordion_text_by_label(soup, "Seasons of Use"))
-            fields["fee_info"].append(get_accordion_text_by_label(soup, "Fee Site and Info"))
-            fields["contact_info"].append(get_accordion_text_by_label(soup, "Contact Information"))
-            fields["info_center"].append(get_accordion_text_by_label(soup, "Information Center"))
-
-            # Latitude, Longitude, Directions
-            lat, lon, directions = None, None, None
-            for block in soup.find_all("div", class_="margin-top-5"):
-                h2 = block.find("h2")
-                if h2 and "Getting There" in h2.get_text(strip=True):
-                    for p in block.find_all("p"):
-                        t = p.get_text(strip=True)
-                        if "Latitude:" in t: lat = t.replace("Latitude:", "").strip()
-                        elif "Longitude:" in t: lon = t.replace("Longitude:", "").strip()
-                        elif "From" in t or "Take" in t: directions = t
-                    break
-            fields["latitude"].append(lat)
-            fields["longitude"].append(lon)
-            fields["directions"].append(directions)
-
-            # Facility Info
-            restrooms, water = None, None
-            for block in soup.find_all("div", class_="margin-top-5"):
-                h2 = block.find("h2")
-                if h2 and "Facility and Amenity Information" in h2.get_text(strip=True):
-                    for p in block.find_all("p"):
-                        t = p.get_text(strip=True)
-                        if "Restroom" in t: restrooms = t
-                        elif "water" in t.lower(): water = t
-                    break
-            fields["restrooms"].append(restrooms)
-            fields["water"].append(water)
-            
-            
-            # recreation opportunities
-            body_of_water = False  # default
-
-            recop = soup.find("div", class_="opportunities margin-top-5")
-            if recop:
-                # Find all opportunities listed
-                opp_items = recop.find_all("a", class_="opportunity__item")
-                for item in opp_items:
-                    text = item.get_text(strip=True).lower()
-                    if "water" in text or "swimming" in text or "boating" in text or "lake" in text:
-                        body_of_water = True
-                        break 
-            
-            # for appending to df
-            fields["body_of_water"].append(body_of_water)
-
-
-            # Overview & Amenities
-            overview_div = soup.find("div", class_="rec-intro")
-            overview_div = overview_div.find("div", class_="field field--name-field-rec-description") if overview_div else None
-            overview_text, amenities_text = None, None
-
-            if overview_div:
-                for p in overview_div.find_all("p"):
-                    t = p.get_text(strip=True)
-                    if "Overview" in t and not overview_text:
-                        next_p = p.find_next_sibling("p")
-                        if next_p: overview_text = next_p.get_text(strip=True)
-                    if "Amenities:" in t and not amenities_text:
-                        amenities_text = t.replace("Amenities:", "").strip()
-                    if overview_text and amenities_text:
-                        break
-
-            # General Info fallback for amenities
-            if not amenities_text:
-                amenities_text = ""
-                general_info = soup.find("div", class_="field--name-field-rec-general-info")
-                if general_info:
-                    for p in general_info.find_all("p"):
-                        if "Amenities" in p.text:
-                            after = p.get_text(strip=True).replace("Amenities:", "").strip()
-                            if after:
-                                amenities_text = after
-                            else:
-                                ul = p.find_next_sibling("ul")
-                                if ul:
-                                    for li in ul.find_all("li"):
-                                        amenities_text += "- " + li.get_text(strip=True) + "\n"
-                else:
-                    amenities_text = None
-
-            fields["overview"].append(overview_text)
-            fields["amenities"].append(amenities_text)
-
-        except Exception as e:
-            print(f"Error scraping {camp_url}: {e}")
-            for key in fields.keys():
-                fields[key].append(None)
+        return scrape_campsite(camp_url, save_html_dir=save_html_dir, cache=cache, failures=failures)
+
+    with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as pool:
+        records = list(pool.map(scrape, enumerate(df["site_url"])))
 
     # Add fields to DataFrame
-    for col, values in fields.items():
-        df[col] = values
+    for col in CAMPSITE_FIELDS:
+        df[col] = [record[col] for record in records]
 
     return df
 
@@ -226,17 +422,197 @@ r06_urls = [
     "r06/rogue-siskiyou"
 ]
 
-# full list of URLs
-all_urls = r05_urls + r04_urls + r06_urls
+# full list of URLs (dict.fromkeys drops repeats like the second klamath
+# while keeping the order)
+all_urls = list(dict.fromkeys(r05_urls + r04_urls + r06_urls))
 
-half = len(all_urls) // 2
-for i, url in enumerate(all_urls):
-    print(url)
-    print("the current iteration is", i)
-    name = all_urls[i].split("/")[-1]
-    print(name)
-    df = scrape_forest_static_data(url)
-    # check if the file successfully created
+
+def scrape_and_save(url, save_html_dir=None):
+    name = url.split("/")[-1]
+    try:
+        df = scrape_forest_static_data(url, save_html_dir=save_html_dir)
+    except Exception as e:
+        # One forest failing (e.g. its listing page) shouldn't stop the others.
+        print(f"Error scraping forest {url}: {e}")
+        return
     df.to_csv(f"data/{name}.csv")
+    # check if the file successfully created
     if not os.path.exists(f"data/{name}.csv"):
-        print(f"Error creating {name}.csv")
\ No newline at end of file
+        print(f"Error creating {name}.csv")
+    else:
+        print(f"Saved {len(df)} campsites to data/{name}.csv")
+
+
+# --- incremental mode -------------------------------------------------------
+# One Parquet file per forest (hive-style forest=<name>/ directories), only
+# rewritten when a row in it changed, plus a manifest of what changed.
+PARQUET_DIR = "data/parquet"
+MANIFEST_NAME = "_manifest.json"
+# A campsite counts as changed when any of these differ from the last crawl.
+ROW_COLUMNS = ["site_name", "park_name", "park_url"] + CAMPSITE_FIELDS
+
+
+def partition_path(out_dir, forest_path):
+    return os.path.join(out_dir, f"forest={forest_path.split('/')[-1]}", "campsites.parquet")
+
+
+def _comparable(value):
+    # Parquet hands missing values back as None or NaN depending on the column.
+    return None if pd.isna(value) else value
+
+
+def diff_forest(previous, current):
+    """Compare two crawls of one forest, keyed on site_url."""
+
+    def rows(df):
+        if df is None:
+            return {}
+        return {
+            row["site_url"]: tuple(_comparable(row[col]) for col in ROW_COLUMNS)
+            for row in df.to_dict("records")
+        }
+
+    old, new = rows(previous), rows(current)
+    added = sorted(new.keys() - old.keys())
+    removed = sorted(old.keys() - new.keys())
+    changed = sorted(url for url in new.keys() & old.keys() if new[url] != old[url])
+    return {
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+        "unchanged": len(new) - len(added) - len(changed),
+    }
+
+
+def keep_previous_rows(df, failures, previous, cache=None):
+    """Replace the rows of failed campsite pages with what we had before.
+
+    A page that failed this time keeps its row from the ``previous``
+    partition, or else the record the page cache parsed from its last good
+    copy. A failed campsite we have nothing for is left out until a crawl
+    gets it, rather than written as an all-None row.
+    """
+    if not failures:
+        return df
+
+    previous_rows = {}
+    if previous is not None:
+        previous_rows = {row["site_url"]: row for row in previous.to_dict("records")}
+
+    rows = []
+    for row in df.to_dict("records"):
+        url = row["site_url"]
+        if url in failures:
+            if url in previous_rows:
+                row = dict(previous_rows[url])
+            else:
+                entry = cache.lookup(url) if cache is not None else None
+                if entry is None or entry["record"] is None:
+                    continue
+                row.update({col: entry["record"].get(col) for col in CAMPSITE_FIELDS})
+        rows.append(row)
+    return pd.DataFrame(rows, columns=df.columns)
+
+
+def _forest_error(error):
+    """Manifest entry for a forest whose crawl failed outright."""
+    return {
+        "added": [],
+        "removed": [],
+        "changed": [],
+        "unchanged": 0,
+        "failed": {},
+        "error": f"{type(error).__name__}: {error}",
+        "written": False,
+    }
+
+
+def scrape_incremental(url, out_dir, cache, save_html_dir=None):
+    """Crawl one forest through the page cache and update its partition.
+
+    Campsite pages that fail keep their previous data (see
+    keep_previous_rows) and are listed under ``failed``. If the forest
+    itself can't be crawled (e.g. a listing page fails), its partition is
+    left alone and the error is returned under ``error``, so one bad forest
+    doesn't stop the run.
+    """
+    failures = {}
+    try:
+        df = scrape_forest_static_data(url, save_html_dir=save_html_dir, cache=cache, failures=failures)
+    except Exception as e:
+        print(f"[{url}] crawl failed, keeping the previous partition: {e}")
+        return _forest_error(e)
+
+    path = partition_path(out_dir, url)
+    previous = pd.read_parquet(path) if os.path.exists(path) else None
+    df = keep_previous_rows(df, failures, previous, cache)
+
+    changes = diff_forest(previous, df)
+    changes["failed"] = failures
+    changes["written"] = previous is None or bool(changes["added"] or changes["removed"] or changes["changed"])
+    if changes["written"]:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    print(
+        f"[{url}] {len(changes['added'])} added, {len(changes['changed'])} changed, "
+        f"{len(changes['removed'])} removed, {changes['unchanged']} unchanged, {len(failures)} failed"
+    )
+    return changes
+
+
+def write_manifest(out_dir, forests, cache):
+    manifest = {
+        "crawled_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "totals": {
+            key: sum(len(c[key]) for c in forests.values()) for key in ("added", "changed", "removed", "failed")
+        },
+        "page_cache": dict(cache.stats),
+        "forests": forests,
+    }
+    manifest["totals"]["unchanged"] = sum(c["unchanged"] for c in forests.values())
+    manifest["totals"]["failed_forests"] = sum("error" in c for c in forests.values())
+
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape static campsite info from fs.usda.gov.")
+    parser.add_argument(
+        "--save-html",
+        metavar="DIR",
+        help="also keep every campsite page's raw HTML here (fixtures for bench_parse_campsite)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="conditional GETs through the page cache, re-parse only changed pages, write Parquet + manifest",
+    )
+    parser.add_argument("--out", default=PARQUET_DIR, help="Parquet output directory for --incremental")
+    parser.add_argument("--cache", default=PAGE_CACHE_PATH, help="page cache file for --incremental")
+    args = parser.parse_args()
+
+    os.makedirs("data", exist_ok=True)
+    if args.save_html:
+        os.makedirs(args.save_html, exist_ok=True)
+
+    if args.incremental:
+        cache = PageCache(args.cache)
+        with ThreadPoolExecutor(max_workers=FOREST_WORKERS) as pool:
+            scrape = lambda url: scrape_incremental(url, args.out, cache, save_html_dir=args.save_html)
+            forests = dict(zip(all_urls, pool.map(scrape, all_urls)))
+        manifest = write_manifest(args.out, forests, cache)
+        print(f"Totals: {manifest['totals']}, page cache: {manifest['page_cache']}")
+    else:
+        # Forests run side by side; every request still goes through the
+        # per-host throttle, so this doesn't hit fs.usda.gov any harder.
+        with ThreadPoolExecutor(max_workers=FOREST_WORKERS) as pool:
+            scrape = lambda url: scrape_and_save(url, save_html_dir=args.save_html)
+            for url, _ in zip(all_urls, pool.map(scrape, all_urls)):
+                print(f"Finished {url}")
@@ -1,10 +1,19 @@
+import argparse
+import json
 import os
 import time
 import re
-import requests
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from rapidfuzz import fuzz
+from rapidfuzz import fuzz, process
+import http_client
+from db import bump_data_version, refresh_search_view
+from scripts.bulk_load import load_transaction
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 API_KEY = os.getenv("RIDB_API_KEY")
 BASE_URL = "https://ridb.recreation.gov/api/v1"
@@ -53,7 +62,7 @@ def search_facility(name, forest_name=None):
         "activity": 9
     }
 
-    r = requests.get(url, headers=HEADERS, params=params)
+    r = http_client.get(url, headers=HEADERS, params=params)
     time.sleep(RATE_LIMIT_DELAY)
 
     if r.status_code != 200:
@@ -111,7 +120,7 @@ def get_campsite_count(facility_id):
     url = f"{BASE_URL}/facilities/{facility_id}/campsites"
     params = {"limit": 1, "offset": 0}
 
-    r = requests.get(url, headers=HEADERS, params=params)
+    r = http_client.get(url, headers=HEADERS, params=params)
     time.sleep(RATE_LIMIT_DELAY)
 
     if r.status_code != 200:
@@ -120,12 +129,153 @@ def get_campsite_count(facility_id):
     return r.json()["METADATA"]["RESULTS"]["TOTAL_COUNT"]
 
 
-def main():
-    if not API_KEY:
-        raise ValueError("Set RIDB_API_KEY environment variable")
+# --- bulk mode ----------------------------------------------------------------
+# Instead of one search call per campsite, page through every CA camping
+# facility once (RIDB returns at most 50 per page, so ~15 calls for ~700
+# facilities), keep a small local index and match all campsites against it.
+
+PAGE_SIZE = 50
+
+
+def slim_facility(facility):
+    """Keep only what matching and the database writes need."""
+    return {
+        "FacilityID": facility.get("FacilityID"),
+        "FacilityName": facility.get("FacilityName", ""),
+        "FacilityPhone": facility.get("FacilityPhone"),
+        "FacilityDescription": facility.get("FacilityDescription"),
+        "Reservable": facility.get("Reservable"),
+        "FacilityTypeDescription": facility.get("FacilityTypeDescription"),
+        "RECAREA": [{"RecAreaName": r.get("RecAreaName", "")} for r in facility.get("RECAREA", [])],
+        "MEDIA": [
+            {"MediaType": m.get("MediaType"), "URL": m.get("URL"), "Title": m.get("Title")}
+            for m in facility.get("MEDIA", [])
+        ],
+        # full=true responses can carry the campsite list; when it's there we
+        # don't need a separate count call.
+        "campsite_count": len(facility.get("CAMPSITE") or []) or None,
+    }
 
-    conn = psycopg2.connect(**DB_CONFIG)
-    cur = conn.cursor(cursor_factory=RealDictCursor)
+
+def iter_recdata(fileobj):
+    """Yield each facility in a RIDB response body one at a time.
+
+    With ijson the body is parsed as a stream, so a page (or a big dump file)
+    is never held in memory as a whole; without it we fall back to json.
+    """
+    if ijson is not None:
+        yield from ijson.items(fileobj, "RECDATA.item")
+    else:
+        yield from json.load(fileobj).get("RECDATA", [])
+
+
+def iter_api_facilities(stats):
+    """Page through /facilities for every CA camping facility."""
+    url = f"{BASE_URL}/facilities"
+    offset = 0
+    while True:
+        params = {
+            "limit": PAGE_SIZE,
+            "offset": offset,
+            "full": "true",
+            "state": "CA",
+            "activity": 9,
+        }
+        r = http_client.get(url, headers=HEADERS, params=params, stream=True)
+        stats["api_calls"] += 1
+        time.sleep(RATE_LIMIT_DELAY)
+        if r.status_code != 200:
+            raise RuntimeError(f"Facility page at offset {offset} failed with {r.status_code}")
+
+        r.raw.decode_content = True
+        count = 0
+        for facility in iter_recdata(r.raw):
+            count += 1
+            yield facility
+        print(f"Fetched facilities {offset}-{offset + count}")
+
+        if count < PAGE_SIZE:
+            break
+        offset += PAGE_SIZE
+
+
+def iter_dump_facilities(paths):
+    """Facilities from saved /facilities responses (e.g. factest.json)."""
+    for path in paths:
+        with open(path, "rb") as f:
+            yield from iter_recdata(f)
+
+
+class FacilityIndex:
+    """Reservable campgrounds, their normalized names and rec area names."""
+
+    def __init__(self, facilities):
+        self.facilities = []
+        for facility in facilities:
+            # same filters search_facility applies to each search result
+            if not facility.get("Reservable"):
+                continue
+            if facility.get("FacilityTypeDescription") != "Campground":
+                continue
+            self.facilities.append(slim_facility(facility))
+
+        self.names = [normalize_name(f["FacilityName"]) for f in self.facilities]
+        self.recareas = [
+            [r["RecAreaName"].lower() for r in f["RECAREA"]] for f in self.facilities
+        ]
+        self._by_forest = {}
+
+    def __len__(self):
+        return len(self.facilities)
+
+    def candidates(self, forest_name):
+        """Indexes of facilities whose rec area mentions ``forest_name``."""
+        if not forest_name:
+            return list(range(len(self.facilities)))
+        key = forest_name.lower()
+        if key not in self._by_forest:
+            self._by_forest[key] = [
+                i for i, names in enumerate(self.recareas) if any(key in n for n in names)
+            ]
+        return self._by_forest[key]
+
+
+def match_all(campsites, index):
+    """Best facility for every campsite, {campsite id: (facility, score)}.
+
+    Campsites are grouped by forest so each group is scored against its
+    candidate facilities in one cdist call.
+    """
+    groups = {}
+    for campsite in campsites:
+        groups.setdefault(campsite["forest_name"], []).append(campsite)
+
+    matches = {}
+    for forest_name, group in groups.items():
+        candidates = index.candidates(forest_name)
+        if not candidates:
+            continue
+        scores = process.cdist(
+            [normalize_name(c["name"]) for c in group],
+            [index.names[i] for i in candidates],
+            scorer=fuzz.token_sort_ratio,
+            workers=-1,
+        )
+        best = scores.argmax(axis=1)
+        for row, campsite in enumerate(group):
+            score = scores[row, best[row]]
+            if score >= FUZZ_THRESHOLD:
+                matches[campsite["id"]] = (index.facilities[candidates[best[row]]], float(score))
+    return matches
+
+
+def sync_bulk(cur, dumps=None, fetch_counts=True):
+    stats = {"api_calls": 0}
+    started = time.perf_counter()
+
+    facilities = iter_dump_facilities(dumps) if dumps else iter_api_facilities(stats)
+    index = FacilityIndex(facilities)
+    print(f"Indexed {len(index)} reservable campgrounds in {time.perf_counter() - started:.1f}s")
 
     cur.execute("""
         SELECT id, name, forest_name
@@ -133,6 +283,93 @@ def main():
     """)
     campsites = cur.fetchall()
 
+    matches = match_all(campsites, index)
+    print(f"Matched {len(matches)} of {len(campsites)} campsites")
+
+    # Site counts are only needed for matched facilities, once each.
+    counts = {}
+    results = []
+    for campsite_id, (facility, score) in matches.items():
+        facility_id = facility["FacilityID"]
+        if facility_id not in counts:
+            counts[facility_id] = facility["campsite_count"]
+            if counts[facility_id] is None and fetch_counts:
+                counts[facility_id] = get_campsite_count(facility_id)
+                stats["api_calls"] += 1
+        count_known = fetch_counts or counts[facility_id] is not None
+        results.append((campsite_id, facility, counts[facility_id], count_known))
+
+    print(
+        f"Bulk sync: {stats['api_calls']} API calls, {len(matches)} campsites matched "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+    return results
+
+
+# --- writes ------------------------------------------------------------------
+
+def campsite_values(facility, num_sites, count_known=True):
+    """Columns a matched facility sets on its campsite row.
+
+    ``count_known=False`` (offline runs without a site count) leaves the
+    campsite's existing num_sites / reservation_url alone.
+    """
+    facility_id = facility["FacilityID"]
+    values = {
+        "recreation_facility_id": facility_id,
+        "contact_phone": facility.get("FacilityPhone"),
+        "overview": clean_html(facility.get("FacilityDescription")),
+    }
+
+    if count_known:
+        if num_sites and num_sites > 0:
+            values["reservation_url"] = f"https://www.recreation.gov/camping/campgrounds/{facility_id}"
+            values["num_sites"] = num_sites
+            print(f"Valid campground with {num_sites} sites")
+        else:
+            values["reservation_url"] = None
+            values["num_sites"] = 0
+            print("Facility exists but no campsite data — reservation_url set to NULL")
+    return values
+
+
+def save_matches(conn, matches):
+    """Write every (campsite_id, facility, num_sites, count_known) in one transaction."""
+    # Rows that set the same columns share one staged UPDATE.
+    updates = {}
+    images = []
+    for campsite_id, facility, num_sites, count_known in matches:
+        values = campsite_values(facility, num_sites, count_known)
+        updates.setdefault(tuple(values), []).append((campsite_id, *values.values()))
+
+        for media in facility.get("MEDIA", []):
+            if media.get("MediaType") != "Image" or not media.get("URL"):
+                continue
+            images.append((campsite_id, media.get("URL"), media.get("Title")))
+
+    with load_transaction(conn) as load:
+        for columns, rows in updates.items():
+            load.update("campsites", key="id", columns=list(columns), rows=rows)
+        # images has no unique constraint, so skip the ones we already have
+        # rather than relying on ON CONFLICT.
+        load.insert(
+            "images",
+            ["campsite_id", "image_url", "description"],
+            images,
+            skip_existing=["campsite_id", "image_url"],
+        )
+        refresh_search_view(load.cur)
+        bump_data_version(load.cur)
+
+
+def sync_per_campsite(cur):
+    cur.execute("""
+        SELECT id, name, forest_name
+        FROM campsites
+    """)
+    campsites = cur.fetchall()
+
+    results = []
     for campsite in campsites:
         campsite_id = campsite["id"]
         name = campsite["name"]
@@ -145,58 +382,56 @@ def main():
             print("No valid match found.")
             continue
 
-        facility_id = facility["FacilityID"]
-
-        num_sites = get_campsite_count(facility_id)
-
-        if num_sites and num_sites > 0:
-            reservation_url = f"https://www.recreation.gov/camping/campgrounds/{facility_id}"
-            print(f"Valid campground with {num_sites} sites")
-        else:
-            reservation_url = None
-            num_sites = 0
-            print("Facility exists but no campsite data — reservation_url set to NULL")
-
-        facility_phone = facility.get("FacilityPhone")
-        facility_description = clean_html(facility.get("FacilityDescription"))
-
-        cur.execute("""
-            UPDATE campsites
-            SET recreation_facility_id = %s,
-                reservation_url = %s,
-                num_sites = %s,
-                contact_phone = %s,
-                overview = %s
-            WHERE id = %s
-        """, (
-            facility_id,
-            reservation_url,
-            num_sites,
-            facility_phone,
-            facility_description,
-            campsite_id
-        ))
+        num_sites = get_campsite_count(facility["FacilityID"])
+        results.append((campsite_id, facility, num_sites, True))
+        print(f"Matched campsite {campsite_id}")
+
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Match campsites to RIDB facilities and copy their details.")
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="page through every CA facility once and match locally instead of one search per campsite",
+    )
+    parser.add_argument(
+        "--dump",
+        action="append",
+        metavar="PATH",
+        help="offline bulk mode: read facilities from saved /facilities responses (repeatable)",
+    )
+    parser.add_argument(
+        "--skip-counts",
+        action="store_true",
+        help="bulk mode: don't call /campsites for facilities whose site count isn't in the listing",
+    )
+    return parser.parse_args()
 
-        for media in facility.get("MEDIA", []):
-            if media.get("MediaType") != "Image":
-                continue
 
-            cur.execute("""
-                INSERT INTO images (campsite_id, image_url, description)
-                VALUES (%s, %s, %s)
-                ON CONFLICT DO NOTHING
-            """, (
-                campsite_id,
-                media.get("URL"),
-                media.get("Title")
-            ))
+def main():
+    args = parse_args()
+    offline = bool(args.dump)
+    if not API_KEY and not offline:
+        raise ValueError("Set RIDB_API_KEY environment variable")
 
-        conn.commit()
-        print(f"Updated campsite {campsite_id}")
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor(cursor_factory=RealDictCursor)
 
+    if args.bulk or offline:
+        matches = sync_bulk(cur, dumps=args.dump, fetch_counts=not (offline or args.skip_counts))
+    else:
+        matches = sync_per_campsite(cur)
     cur.close()
-    conn.close()
+
+    # All the API work is done; write everything at once so a failure
+    # part way leaves the database as it was.
+    try:
+        save_matches(conn, matches)
+    finally:
+        conn.close()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
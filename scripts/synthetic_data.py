@@ -0,0 +1,119 @@
+"""
+Generate realistic-looking fake campsite data for benchmarks.
+
+Rows look like what the scrapers and sync scripts put in the database: a
+campground name built from common name parts, one of the California national
+forests, coordinates inside that forest's rough bounding box, amenity flags,
+an open/closed status and a day_summary-shaped forecast.
+
+Used by scripts/bench_search.py; it can also be run on its own to write a CSV:
+    python -m scripts.synthetic_data --rows 10000 --out data/synthetic.csv
+"""
+
+import argparse
+import csv
+import json
+import random
+from datetime import date
+
+# Rough (south, west, north, east) boxes so sites cluster like the real data.
+FORESTS = {
+    "Angeles National Forest": (34.2, -118.9, 34.6, -117.6),
+    "Cleveland National Forest": (32.6, -117.5, 33.8, -116.4),
+    "Eldorado National Forest": (38.5, -120.7, 39.0, -119.9),
+    "Inyo National Forest": (36.2, -119.2, 38.2, -117.9),
+    "Klamath National Forest": (41.0, -123.7, 42.0, -122.2),
+    "Lake Tahoe Basin Management Unit": (38.7, -120.2, 39.3, -119.9),
+    "Lassen National Forest": (40.1, -121.9, 41.0, -120.6),
+    "Los Padres National Forest": (34.4, -121.6, 36.3, -118.6),
+    "Mendocino National Forest": (39.2, -123.1, 40.1, -122.4),
+    "Modoc National Forest": (41.0, -121.5, 42.0, -120.0),
+    "Plumas National Forest": (39.5, -121.4, 40.3, -120.1),
+    "San Bernardino National Forest": (33.5, -117.4, 34.4, -116.6),
+    "Sequoia National Forest": (35.4, -118.9, 36.7, -118.1),
+    "Shasta-Trinity National Forest": (40.2, -123.3, 41.5, -121.5),
+    "Sierra National Forest": (36.8, -119.7, 37.7, -118.9),
+    "Six Rivers National Forest": (40.3, -124.0, 42.0, -123.4),
+    "Stanislaus National Forest": (37.8, -120.4, 38.6, -119.6),
+    "Tahoe National Forest": (39.1, -121.1, 39.8, -120.1),
+}
+
+NAME_PARTS = [
+    "Pine", "Cedar", "Oak", "Aspen", "Fir", "Bear", "Eagle", "Deer", "Elk",
+    "Lake", "Creek", "River", "Meadow", "Spring", "Falls", "Rock", "Granite",
+    "Crest", "Flat", "Valley", "Canyon", "Ridge", "Point", "Cove", "Hollow",
+    "Silver", "Crystal", "Shadow", "Sunset", "Willow", "Manzanita", "Lodgepole",
+]
+NAME_SUFFIXES = ["", " Campground", " Camp", " Group Camp", " Horse Camp", " Group Campground"]
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+
+def fake_forecast(rng, day):
+    low = rng.uniform(20, 60)
+    return {
+        "date": day.isoformat(),
+        "precipitation_total": round(rng.choice([0, 0, 0, rng.uniform(0, 1.5)]), 2),
+        "temp_min": round(low, 1),
+        "temp_max": round(low + rng.uniform(10, 35), 1),
+        "cloud_cover_afternoon": rng.randint(0, 100),
+    }
+
+
+def generate_campsites(count, seed=0):
+    """Yield ``count`` campsite dicts with ids 1..count."""
+    rng = random.Random(seed)
+    forests = list(FORESTS.items())
+    today = date.today()
+
+    for site_id in range(1, count + 1):
+        forest_name, (south, west, north, east) = rng.choice(forests)
+        name = " ".join(rng.sample(NAME_PARTS, rng.randint(1, 3))) + rng.choice(NAME_SUFFIXES)
+        yield {
+            "id": site_id,
+            "name": name,
+            "forest_name": forest_name,
+            "latitude": round(rng.uniform(south, north), 6),
+            "longitude": round(rng.uniform(west, east), 6),
+            "is_open": rng.random() < 0.7,
+            "water": rng.random() < 0.5,
+            "restrooms": rng.random() < 0.65,
+            # Not every site has a forecast yet in the real data either.
+            "forecast": fake_forecast(rng, today) if rng.random() < 0.8 else None,
+        }
+
+
+def to_search_row(site):
+    """Shape a generated site like a row from search._fetch_filtered_campsites."""
+    return (
+        site["id"],
+        site["name"],
+        site["forest_name"],
+        site["latitude"],
+        site["longitude"],
+        site["is_open"],
+        site["forecast"],
+        site["water"],
+        site["restrooms"],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic campsites to CSV.")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="data/synthetic_campsites.csv")
+    args = parser.parse_args()
+
+    fields = ["id", "name", "forest_name", "latitude", "longitude", "is_open", "water", "restrooms", "forecast"]
+    with open(args.out, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for site in generate_campsites(args.rows, seed=args.seed):
+            site["forecast"] = json.dumps(site["forecast"]) if site["forecast"] else ""
+            writer.writerow(site)
+    print(f"Wrote {args.rows} campsites to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
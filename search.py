@@ -1,6 +1,46 @@
+from functools import lru_cache
 from rapidfuzz import fuzz
-from db import get_connection
+from cache import MISSING, TTLCache
+from campsite_store import CampsiteStore
+from db import get_connection, get_data_version
+from geo import bbox_around, haversine_km, intersect_bbox
+from scoring import score_forest_names, score_site_names
+from timing import timed
+import base64
+import bisect
+import json
+import numpy as np
+import os
+import psycopg2
 import re
+import threading
+
+# Optional database-side candidate stage for text searches (needs pg_trgm
+# and the trigram indexes from schema.sql). Off by default so a database
+# without the extension keeps working.
+TRGM_PREFILTER = os.getenv("SEARCH_TRGM_PREFILTER", "false").lower() == "true"
+# How many name candidates Postgres hands to the Python re-ranker.
+TRGM_CANDIDATES = int(os.getenv("SEARCH_TRGM_CANDIDATES", "500"))
+# Loose similarity floor for the shortlist; real ranking happens in Python.
+# Lower it if the parity benchmark shows good matches being cut.
+TRGM_MIN_SIMILARITY = float(os.getenv("SEARCH_TRGM_MIN_SIMILARITY", "0.1"))
+# Queries shorter than this have too few trigrams to shortlist reliably.
+TRGM_MIN_QUERY_LENGTH = 3
+
+# Radius used when a search passes ``near`` without ``radius_km``.
+DEFAULT_RADIUS_KM = 50
+
+# Result cache for search_campsites. The homepage calls /api/search and then
+# /results with the same parameters, so most searches run twice. Entries are
+# keyed on the data version too, so a sync/refresh makes them unreachable.
+# SEARCH_CACHE_SIZE=0 turns the cache off.
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "512"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+_result_cache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+
+# The homepage's forest dropdown, keyed on the data version like the results
+# above, so rendering the page doesn't run SELECT DISTINCT every time.
+_forest_list_cache = TTLCache(maxsize=1, ttl=SEARCH_CACHE_TTL)
 
 
 def normalize(text):
@@ -15,59 +55,305 @@ def normalize(text):
     return re.sub(r"\s+", "", text.strip().lower())
 
 
-def _fetch_filtered_campsites(is_open=None, has_water=None, has_restrooms=None, forest=None):
-    """Return a list of campsite rows after applying DB-level filters.
+# Campsite and forest names barely change between searches, so remember the
+# normalized form instead of re-running the regex for every row every time.
+_normalize_cached = lru_cache(maxsize=65536)(normalize)
 
-    This lets us apply filters *first* in SQL and then run fuzzy search only
-    on the already-filtered subset, which is what the frontend expects.
-    """
 
-    conn = get_connection()
-    cur = conn.cursor()
-
-    sql = """
-        SELECT
-            campsites.id,
-            campsites.name,
-            campsites.forest_name,
-            campsites.latitude,
-            campsites.longitude,
-            status_updates.is_open,
-            weather_forecasts.forecast_json,
-            amenities.water,
-            amenities.restrooms
-        FROM campsites
-        LEFT JOIN status_updates ON campsites.id = status_updates.campsite_id
-        LEFT JOIN weather_forecasts ON campsites.id = weather_forecasts.campsite_id
-        LEFT JOIN amenities ON campsites.id = amenities.campsite_id
-        WHERE 1 = 1
-    """
+def _row_to_result(row, score=None):
+    """Turn a row from ``_fetch_filtered_campsites`` into a result dict."""
 
+    (
+        site_id,
+        name,
+        forest_name,
+        latitude,
+        longitude,
+        is_open_val,
+        forecast_json,
+        water,
+        restrooms,
+    ) = row
+
+    result = {
+        "id": site_id,
+        "name": name,
+        "forest_name": forest_name,
+        "latitude": latitude,
+        "longitude": longitude,
+    }
+    if score is not None:
+        result["score"] = score
+    result.update(
+        {
+            "is_open": is_open_val,
+            "forecast": forecast_json,
+            "has_water": bool(water) if water is not None else False,
+            "has_restrooms": bool(restrooms) if restrooms is not None else False,
+        }
+    )
+    return result
+
+
+# Search queries read from ``campsite_search``: the materialized view in
+# schema.sql with exactly one row per campsite (latest status, latest
+# forecast, amenity flags), refreshed by the pipelines. Set
+# SEARCH_FROM_VIEW=false, or just not have the view yet, to read the live
+# tables through the old joins instead.
+SEARCH_FROM_VIEW = os.getenv("SEARCH_FROM_VIEW", "true").lower() == "true"
+_view_missing = False
+
+# Stand-in for the view built from the live tables, with the same columns.
+_LIVE_SEARCH_SOURCE = """(
+    SELECT
+        campsites.id,
+        campsites.name,
+        campsites.forest_name,
+        campsites.latitude,
+        campsites.longitude,
+        status_updates.is_open,
+        weather_forecasts.forecast_json,
+        amenities.water,
+        amenities.restrooms
+    FROM campsites
+    LEFT JOIN status_updates ON campsites.id = status_updates.campsite_id
+    LEFT JOIN weather_forecasts ON campsites.id = weather_forecasts.campsite_id
+    LEFT JOIN amenities ON campsites.id = amenities.campsite_id
+) AS campsite_search"""
+
+# Where the search rows come from; swapped for the view or the live joins by
+# _fetch_search_rows.
+_SOURCE = "<<search source>>"
+
+# Filter-only fetches (the common case) are answered from an in-process copy
+# of the search rows instead of the database; see campsite_store.py for the
+# layout and memory budget. It is reloaded when the data version changes.
+# SEARCH_IN_MEMORY=false sends every search to Postgres again.
+SEARCH_IN_MEMORY = os.getenv("SEARCH_IN_MEMORY", "true").lower() == "true"
+_store = None
+_store_lock = threading.Lock()
+
+# Shared SELECT for every search query. Column order matters: rows are
+# unpacked positionally by _row_to_result and the scoring code.
+_SEARCH_SELECT = f"""
+    SELECT
+        campsite_search.id,
+        campsite_search.name,
+        campsite_search.forest_name,
+        campsite_search.latitude,
+        campsite_search.longitude,
+        campsite_search.is_open,
+        campsite_search.forecast_json,
+        campsite_search.water,
+        campsite_search.restrooms
+    FROM {_SOURCE}
+    WHERE 1 = 1
+"""
+
+# SQL versions of normalize(). These must match the expressions the trigram
+# indexes in schema.sql are built on, otherwise Postgres can't use them.
+_NAME_NORM_SQL = r"lower(regexp_replace(campsite_search.name, '\s+', '', 'g'))"
+# Campsite location as a built-in geometric point (x = longitude, y = latitude).
+_LOCATION_SQL = "point(campsite_search.longitude::float8, campsite_search.latitude::float8)"
+
+
+def _filter_sql(is_open=None, has_water=None, has_restrooms=None, forest=None, bbox=None):
+    """Return ``(sql, params)`` for the WHERE-clause filters that are set."""
+
+    sql = ""
     params = []
 
     # Only add filters when the corresponding checkbox was selected.
     if is_open is True:
-        sql += " AND status_updates.is_open = TRUE"
+        sql += " AND campsite_search.is_open = TRUE"
 
     if has_water is True:
-        sql += " AND amenities.water = TRUE"
+        sql += " AND campsite_search.water = TRUE"
 
     if has_restrooms is True:
-        sql += " AND amenities.restrooms = TRUE"
+        sql += " AND campsite_search.restrooms = TRUE"
 
     if forest:
         # Case-insensitive substring match so short values like "stanislaus"
         # still match "Stanislaus National Forest".
-        sql += " AND LOWER(campsites.forest_name) LIKE %s"
+        sql += " AND LOWER(campsite_search.forest_name) LIKE %s"
         params.append(f"%{forest.strip().lower()}%")
 
-    cur.execute(sql, params)
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    if bbox:
+        west, south, east, north = bbox
+        if west > east or south > north:
+            # box() would silently swap the corners into some other area.
+            sql += " AND FALSE"
+        else:
+            # Written against the same point() expression as the GiST index
+            # in schema.sql so Postgres can answer it from the index.
+            sql += f" AND {_LOCATION_SQL} <@ box(point(%s, %s), point(%s, %s))"
+            params.extend([west, south, east, north])
+
+    return sql, params
+
+
+def _fetch_filtered_campsites(is_open=None, has_water=None, has_restrooms=None, forest=None, bbox=None):
+    """Return a list of campsite rows after applying DB-level filters.
+
+    This lets us apply filters *first* in SQL and then run fuzzy search only
+    on the already-filtered subset, which is what the frontend expects.
+    """
+
+    if SEARCH_IN_MEMORY:
+        return get_store().filter(
+            is_open=is_open, has_water=has_water, has_restrooms=has_restrooms, forest=forest, bbox=bbox
+        )
+
+    filter_sql, params = _filter_sql(is_open, has_water, has_restrooms, forest, bbox)
+    # id order keeps ranking ties (and "first exact hit") deterministic,
+    # which keyset pagination relies on.
+    return _fetch_search_rows(_SEARCH_SELECT + filter_sql + " ORDER BY campsite_search.id", params)
+
+
+def get_store():
+    """Return the in-memory campsite store, (re)loading it if the data changed."""
+    global _store
+
+    version = get_data_version()
+    store = _store
+    if store is not None and store.version == version:
+        return store
+
+    with _store_lock:
+        if _store is None or _store.version != version:
+            _store = CampsiteStore(_load_store_rows(), version=version)
+        return _store
+
+
+def invalidate_store():
+    global _store
+    _store = None
+
+
+def store_stats():
+    """Size of the loaded in-memory store (zeros until the first search)."""
+    store = _store
+    if store is None:
+        return {"rows": 0, "array_bytes": 0, "version": 0}
+    return {"rows": len(store), "array_bytes": store.nbytes(), "version": store.version or 0}
+
+
+def _load_store_rows():
+    return _fetch_search_rows(_SEARCH_SELECT + " ORDER BY campsite_search.id", [])
+
+
+def _fetch_search_rows(sql, params):
+    """Run a search query written against ``_SOURCE``.
+
+    Reads the ``campsite_search`` view when it's enabled; if the database
+    doesn't have it yet we remember that and use the live joins from then on.
+    """
+    global _view_missing
+
+    use_view = SEARCH_FROM_VIEW and not _view_missing
+    try:
+        return _execute_search(sql.replace(_SOURCE, "campsite_search" if use_view else _LIVE_SEARCH_SOURCE), params)
+    except psycopg2.errors.UndefinedTable:
+        if not use_view:
+            raise
+        _view_missing = True
+        return _execute_search(sql.replace(_SOURCE, _LIVE_SEARCH_SOURCE), params)
+
+
+def _execute_search(sql, params):
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        cur.close()
     return rows
 
 
+def _matching_forests(norm_query, fuzzthresh):
+    """Forest names whose forest score reaches ``fuzzthresh``.
+
+    These are the only forests ``_rank_rows`` can answer a forest search
+    with. There are only a couple of dozen distinct forests (and the list is
+    cached), so scoring them here with the ranking's own scorer is cheaper
+    and far tighter than a loose trigram match on every row.
+    """
+    forests = get_all_forests()
+    scores = score_forest_names(norm_query, [_normalize_cached(f) for f in forests], fuzzthresh)
+    return [name for name, score in zip(forests, scores) if score >= fuzzthresh]
+
+
+def _fetch_trgm_candidates(
+    norm_query, candidates, fuzzthresh=40, is_open=None, has_water=None, has_restrooms=None, forest=None, bbox=None
+):
+    """Return a trigram-shortlisted subset of the filtered campsite rows.
+
+    Postgres (pg_trgm) picks the ``candidates`` names most similar to the
+    query, plus every site in a forest that matches it (see
+    ``_matching_forests``), because a forest search hands back every site in
+    that forest. ``search_campsites`` then re-ranks just these rows with the
+    usual rapidfuzz scoring, so the work done in Python scales with
+    ``candidates`` instead of the table size.
+    """
+
+    filter_sql, filter_params = _filter_sql(is_open, has_water, has_restrooms, forest, bbox)
+
+    # The name thresholds are deliberately loose: this is only a shortlist,
+    # the real ranking still happens in Python.
+    sql = """
+        SET LOCAL pg_trgm.similarity_threshold = %s;
+        SET LOCAL pg_trgm.word_similarity_threshold = %s;
+    """ + _SEARCH_SELECT + filter_sql + f"""
+        AND (
+            campsite_search.id IN (
+                SELECT campsite_search.id
+                FROM {_SOURCE}
+                WHERE ({_NAME_NORM_SQL} %% %s OR %s <%% {_NAME_NORM_SQL})
+                {filter_sql}
+                ORDER BY GREATEST(
+                    similarity({_NAME_NORM_SQL}, %s),
+                    word_similarity(%s, {_NAME_NORM_SQL})
+                ) DESC, campsite_search.id
+                LIMIT %s
+            )
+            OR campsite_search.forest_name = ANY(%s)
+        )
+        ORDER BY campsite_search.id
+    """
+    params = (
+        [TRGM_MIN_SIMILARITY, TRGM_MIN_SIMILARITY]
+        + filter_params
+        + [norm_query, norm_query]
+        + filter_params
+        + [norm_query, norm_query, candidates, _matching_forests(norm_query, fuzzthresh)]
+    )
+    return _fetch_search_rows(sql, params)
+
+
+def _within_radius(rows, near, radius_km):
+    """Drop rows farther than ``radius_km`` from ``near``.
+
+    The SQL bounding box already removed most far-away sites via the spatial
+    index; this does the exact great-circle check on what's left. Returns the
+    kept rows and a ``{campsite id: distance in km}`` map.
+    """
+
+    located = [row for row in rows if row[3] is not None and row[4] is not None]
+    if not located:
+        return [], {}
+
+    lat, lon = near
+    distances = haversine_km(lat, lon, [float(r[3]) for r in located], [float(r[4]) for r in located])
+
+    kept = []
+    distance_by_id = {}
+    for row, distance in zip(located, distances):
+        if distance <= radius_km:
+            kept.append(row)
+            distance_by_id[row[0]] = round(float(distance), 2)
+    return kept, distance_by_id
+
+
 def search_campsites(
     query=None,
     *,
@@ -75,8 +361,13 @@ def search_campsites(
     has_water=None,
     has_restrooms=None,
     forest=None,
+    near=None,
+    radius_km=None,
+    bbox=None,
     fuzzthresh=40,
     limit=200,
+    prefilter=None,
+    facets=False,
 ):
     """Search campsites with optional filters and fuzzy matching.
 
@@ -85,180 +376,504 @@ def search_campsites(
 
     If ``query`` is empty/None, this returns all filtered campsites without
     fuzzy scoring, sorted by name.
+
+    Location filters: ``bbox`` is ``(west, south, east, north)`` and ``near``
+    is a ``(lat, lon)`` pair searched within ``radius_km`` (default
+    ``DEFAULT_RADIUS_KM``). With ``near`` every result gets a ``distance_km``,
+    and searches without a text query come back nearest first.
+
+    ``prefilter`` turns the pg_trgm candidate stage on or off for this call
+    (defaults to ``TRGM_PREFILTER``). It only kicks in for text queries long
+    enough to have useful trigrams.
+
+    With ``facets=True`` the return value is ``(results, facets)``, where
+    ``facets`` counts every match (not just the first ``limit``) per forest
+    and per open/water/restrooms flag; see ``_facet_counts``. They are counted
+    from the matching rows themselves, so they cost no extra query and no
+    result dicts beyond the first ``limit``.
+
+    Results are cached (see ``SEARCH_CACHE_SIZE``) as rows; every call builds
+    its own result dicts, so callers may modify them.
     """
 
-    rows = _fetch_filtered_campsites(
-        is_open=is_open,
-        has_water=has_water,
-        has_restrooms=has_restrooms,
-        forest=forest,
+    if prefilter is None:
+        prefilter = TRGM_PREFILTER
+
+    if near is not None and radius_km is None:
+        radius_km = DEFAULT_RADIUS_KM
+
+    matches, counts = _cached_search(
+        query, is_open, has_water, has_restrooms, forest, near, radius_km, bbox, fuzzthresh, limit, prefilter
     )
+    # Dicts are only built for what is returned, never for the whole match
+    # list behind the facets.
+    results = [_match_to_result(match) for match in matches]
+    if facets:
+        return results, _copy_facets(counts)
+    return results
+
+
+def _cached_search(query, is_open, has_water, has_restrooms, forest, near, radius_km, bbox, fuzzthresh, limit, prefilter):
+    """``_search_campsites`` through the result cache (arguments already defaulted)."""
+
+    if SEARCH_CACHE_SIZE <= 0:
+        return _search_campsites(
+            query, is_open, has_water, has_restrooms, forest, near, radius_km, bbox, fuzzthresh, limit, prefilter
+        )
+
+    # Facets are always computed, so one cache entry serves both kinds of call.
+    key = _search_cache_key(
+        query, is_open, has_water, has_restrooms, forest, near, radius_km, bbox, fuzzthresh, limit, prefilter
+    )
+    cached = _result_cache.get(key)
+    if cached is MISSING:
+        cached = _search_campsites(
+            query, is_open, has_water, has_restrooms, forest, near, radius_km, bbox, fuzzthresh, limit, prefilter
+        )
+        _result_cache.set(key, cached)
+    return cached
+
+
+def _copy_facets(counts):
+    return dict(counts, forests=[dict(f) for f in counts["forests"]])
+
+
+def _search_cache_key(query, is_open, has_water, has_restrooms, forest, near, radius_km, bbox, fuzzthresh, limit, prefilter):
+    """Normalize the arguments so equivalent searches share one cache entry."""
+    return (
+        get_data_version(),
+        # The search only ever looks at the normalized query. "" (a blank but
+        # non-empty query) still ranks, so keep it distinct from None.
+        normalize(query) if query else None,
+        # Filters only apply when they are exactly True.
+        is_open is True,
+        has_water is True,
+        has_restrooms is True,
+        forest.strip().lower() if forest else None,
+        tuple(float(v) for v in near) if near is not None else None,
+        float(radius_km) if radius_km is not None else None,
+        tuple(float(v) for v in bbox) if bbox else None,
+        fuzzthresh,
+        limit,
+        bool(prefilter),
+    )
+
+
+def cache_stats():
+    """Hit/miss counters for the search result cache."""
+    return _result_cache.stats()
+
+
+def _facet_counts(rows):
+    """Count matching rows per forest and per amenity/open flag.
+
+    Each count is how many results the matching filter would leave, e.g.
+    ``has_water`` is what ticking "Water" would return. Forests are listed
+    most matches first. Works on the raw search rows, so counting every match
+    doesn't need a result dict per row.
+    """
+
+    forests = {}
+    is_open = has_water = has_restrooms = 0
+    for row in rows:
+        forest_name = row[2]
+        if forest_name:
+            forests[forest_name] = forests.get(forest_name, 0) + 1
+        if row[5]:
+            is_open += 1
+        if row[7]:
+            has_water += 1
+        if row[8]:
+            has_restrooms += 1
+
+    return _facet_summary(len(rows), forests, is_open, has_water, has_restrooms)
+
+
+def _facet_summary(total, forests, is_open, has_water, has_restrooms):
+    """The facets dict, from a total, ``{forest: count}`` and flag counts."""
+    return {
+        "total": total,
+        # A list rather than a dict so the order survives jsonify.
+        "forests": [
+            {"forest_name": name, "count": count}
+            for name, count in sorted(forests.items(), key=lambda item: (-item[1], item[0]))
+        ],
+        "is_open": is_open,
+        "has_water": has_water,
+        "has_restrooms": has_restrooms,
+    }
+
+
+def _search_campsites(query, is_open, has_water, has_restrooms, forest, near, radius_km, bbox, fuzzthresh, limit, prefilter):
+    """The uncached search behind search_campsites (arguments already defaulted).
+
+    Returns ``(matches, facets)``. ``matches`` holds the first ``limit``
+    matches in result order as ``(sort key, row, score, distance_km)``
+    tuples (see ``_match_to_result``); the facets cover every match, before
+    ``limit`` is applied.
+    """
+
+    # A radius search becomes a bounding box for the database; if the caller
+    # also passed a bbox, the database gets the overlap of the two. No
+    # overlap means nothing can match.
+    sql_bbox = bbox
+    if near is not None:
+        sql_bbox = bbox_around(near[0], near[1], radius_km)
+        if bbox:
+            sql_bbox = intersect_bbox(sql_bbox, bbox)
+            if sql_bbox is None:
+                return [], _facet_counts([])
+
+    filters = {
+        "is_open": is_open,
+        "has_water": has_water,
+        "has_restrooms": has_restrooms,
+        "forest": forest,
+        "bbox": sql_bbox,
+    }
+
+    if query and prefilter and len(normalize(query)) >= TRGM_MIN_QUERY_LENGTH:
+        rows = _fetch_trgm_candidates(normalize(query), TRGM_CANDIDATES, fuzzthresh, **filters)
+    else:
+        rows = _fetch_filtered_campsites(**filters)
+
+    distance_by_id = None
+    if near is not None:
+        rows, distance_by_id = _within_radius(rows, near, radius_km)
 
     if not rows:
-        return []
+        return [], _facet_counts([])
 
     if not query:
-        # No text search: just map the rows into dictionaries and sort by name.
-        results = []
-        for (
-            site_id,
-            name,
-            forest_name,
-            latitude,
-            longitude,
-            is_open_val,
-            forecast_json,
-            water,
-            restrooms,
-        ) in rows:
-            results.append(
-                {
-                    "id": site_id,
-                    "name": name,
-                    "forest_name": forest_name,
-                    "latitude": latitude,
-                    "longitude": longitude,
-                    "is_open": is_open_val,
-                    "forecast": forecast_json,
-                    "has_water": bool(water) if water is not None else False,
-                    "has_restrooms": bool(restrooms) if restrooms is not None else False,
-                }
-            )
+        # No text search: sort the rows by name (or by distance when
+        # searching around a point). The keys are the same as
+        # _name_sort_key / _distance_sort_key give for the result dicts.
+        if distance_by_id is not None:
+            matches = [
+                ((distance_by_id[row[0]], row[2] or "", row[1], row[0]), row, None, distance_by_id[row[0]])
+                for row in rows
+            ]
+        else:
+            matches = [((row[2] or "", row[1], row[0]), row, None, None) for row in rows]
+        matches.sort(key=_match_key)
+        return matches[:limit], _facet_counts(rows)
+
+    ranked = _rank_by_query(rows, query, fuzzthresh)
+    matches = [
+        ((-score, row[0]), row, score, distance_by_id[row[0]] if distance_by_id is not None else None)
+        for row, score in ranked
+    ]
+    return matches[:limit], _facet_counts([row for row, _ in ranked])
+
+
+def _match_key(match):
+    return match[0]
+
+
+def _match_to_result(match):
+    """Build the result dict for one ``(sort key, row, score, distance_km)`` match."""
+    _, row, score, distance_km = match
+    result = _row_to_result(row, score=score)
+    if distance_km is not None:
+        result["distance_km"] = distance_km
+    return result
+
 
-        results.sort(key=lambda x: (x["forest_name"] or "", x["name"]))
-        return results[:limit]
+def _rank_by_query(rows, query, fuzzthresh):
+    """Fuzzy-rank filtered rows against a text query (every match, best first)."""
+
+    with timed("scoring"):
+        return _rank_rows(rows, query, fuzzthresh)
+
+
+def _rank_rows(rows, query, fuzzthresh):
+    """``(row, score)`` for every row matching ``query``, best first."""
 
     # --- Fuzzy search path (query provided) ---
     norm_query = normalize(query)
 
-    name_results = []
-    forest_scores = {}
-    best_site_score = 0
-    best_forest_score = 0
-
-    for (
-        site_id,
-        name,
-        forest_name,
-        latitude,
-        longitude,
-        is_open_val,
-        forecast_json,
-        water,
-        restrooms,
-    ) in rows:
-        name_flat = normalize(name)
-        forest_flat = normalize(forest_name)
-
-        # Name scores
-        token_score = fuzz.token_sort_ratio(name_flat, norm_query)
-        partial_score = fuzz.partial_ratio(name_flat, norm_query)
-        # Adjust partial score based on query length so very short queries
-        # don't dominate long names.
-        if len(name_flat) > 0:
-            partial_adjusted_score = partial_score * (len(norm_query) / len(name_flat))
-        else:
-            partial_adjusted_score = partial_score
-
-        site_score = max(token_score, partial_adjusted_score)
-        best_site_score = max(best_site_score, site_score)
-
-        # Forest name scores
-        partial_forest_score = fuzz.partial_ratio(norm_query, forest_flat) * 0.6
-        exact_forest_substring = int(norm_query in forest_flat) * 100
-        forest_score = max(partial_forest_score, exact_forest_substring)
-        best_forest_score = max(best_forest_score, forest_score)
-
-        # Store top site matches
-        if site_score == 100 and forest_score != 100:
-            return [
-                {
-                    "id": site_id,
-                    "name": name,
-                    "forest_name": forest_name,
-                    "latitude": latitude,
-                    "longitude": longitude,
-                    "score": site_score,
-                    "is_open": is_open_val,
-                    "forecast": forecast_json,
-                    "has_water": bool(water) if water is not None else False,
-                    "has_restrooms": bool(restrooms) if restrooms is not None else False,
-                }
-            ]
+    # Score every row in one batch instead of row by row (see scoring.py).
+    names_flat = [_normalize_cached(row[1]) for row in rows]
+    forests_flat = [_normalize_cached(row[2]) for row in rows]
+    site_scores = score_site_names(norm_query, names_flat)
+    forest_scores = score_forest_names(norm_query, forests_flat, fuzzthresh)
 
-        # Store site matches
-        if site_score >= fuzzthresh:
-            name_results.append(
-                {
-                    "id": site_id,
-                    "name": name,
-                    "forest_name": forest_name,
-                    "latitude": latitude,
-                    "longitude": longitude,
-                    "score": site_score,
-                    "is_open": is_open_val,
-                    "forecast": forecast_json,
-                    "has_water": bool(water) if water is not None else False,
-                    "has_restrooms": bool(restrooms) if restrooms is not None else False,
-                }
-            )
+    # An exact site-name hit (that isn't also an exact forest hit) wins
+    # outright. Rows are checked in order, so the first such row is returned.
+    exact_hits = np.flatnonzero((site_scores == 100) & (forest_scores != 100))
+    if exact_hits.size:
+        i = exact_hits[0]
+        return [(rows[i], float(site_scores[i]))]
 
-        # Collect potential forest matches
-        if forest_score >= fuzzthresh:
-            forest_scores.setdefault(forest_name, []).append(
-                (
-                    site_id,
-                    name,
-                    latitude,
-                    longitude,
-                    site_score,
-                    is_open_val,
-                    forecast_json,
-                    water,
-                    restrooms,
-                )
-            )
+    best_site_score = max(float(site_scores.max()), 0)
+    best_forest_score = max(float(forest_scores.max()), 0)
 
     # Decide if this is primarily a forest search.
     if best_forest_score >= fuzzthresh and best_forest_score > best_site_score:
+        # Collect potential forest matches, keeping first-seen forest order.
+        forest_matches = {}
+        for i in np.flatnonzero(forest_scores >= fuzzthresh):
+            forest_matches.setdefault(rows[i][2], []).append(i)
+
         best_forest_match = max(
-            forest_scores.items(),
+            forest_matches.items(),
             key=lambda item: fuzz.partial_ratio(norm_query, normalize(item[0])),
             default=None,
         )
 
         if best_forest_match:
-            forest_name, site_list = best_forest_match
-            sorted_sites = sorted(site_list, key=lambda x: x[4], reverse=True)
-            return [
-                {
-                    "id": sid,
-                    "name": sname,
-                    "forest_name": forest_name,
-                    "latitude": lat,
-                    "longitude": lon,
-                    "score": score,
-                    "is_open": is_open_val,
-                    "forecast": forecast_json,
-                    "has_water": bool(water) if water is not None else False,
-                    "has_restrooms": bool(restrooms) if restrooms is not None else False,
-                }
-                for (
-                    sid,
-                    sname,
-                    lat,
-                    lon,
-                    score,
-                    is_open_val,
-                    forecast_json,
-                    water,
-                    restrooms,
-                ) in sorted_sites
-            ][:limit]
-
-    # Otherwise, return top site matches.
-    name_results.sort(key=lambda x: x.get("score", 0), reverse=True)
-    return name_results[:limit]
+            _, indexes = best_forest_match
+            sorted_indexes = sorted(indexes, key=lambda i: site_scores[i], reverse=True)
+            return [(rows[i], float(site_scores[i])) for i in sorted_indexes]
+
+    # Otherwise, return top site matches. The sort is stable, so equal
+    # scores stay in row (id) order.
+    indexes = np.flatnonzero(site_scores >= fuzzthresh)
+    indexes = indexes[np.argsort(-site_scores[indexes], kind="stable")]
+    return [(rows[i], float(site_scores[i])) for i in indexes]
+
+
+# --- pagination ----------------------------------------------------------------
+# Each ordering has a sort key that ends in the campsite id, so it is unique
+# and a page can resume strictly after the last result it returned (keyset
+# pagination) instead of counting an offset.
+
+def _name_sort_key(result):
+    return (result["forest_name"] or "", result["name"], result["id"])
+
+
+def _distance_sort_key(result):
+    return (result["distance_km"], result["forest_name"] or "", result["name"], result["id"])
+
+
+def _rank_sort_key(result):
+    # Ranked lists are score-descending; ties stay in id order.
+    return (-result.get("score", 0), result["id"])
+
+
+# The types of the values in each mode's sort key (numbers may be int or
+# float in JSON).
+_NUMBER = (int, float)
+_CURSOR_KEY_TYPES = {
+    "name": (str, str, int),
+    "distance": (_NUMBER, str, str, int),
+    "rank": (_NUMBER, int),
+}
+
+
+class InvalidCursor(ValueError):
+    """A pagination cursor that is malformed or belongs to another search."""
+
+
+def encode_cursor(mode, key):
+    payload = json.dumps({"m": mode, "k": list(key)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, mode):
+    """Return the sort key stored in ``cursor``; InvalidCursor if it's not ours.
+
+    Every value is type-checked, so the key always compares cleanly against
+    the search's own sort keys.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key = tuple(payload["k"])
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise InvalidCursor("invalid cursor") from e
+    types = _CURSOR_KEY_TYPES[mode]
+    if payload.get("m") != mode or len(key) != len(types):
+        raise InvalidCursor("cursor belongs to a different kind of search")
+    # bool is an int subclass, but never part of a sort key.
+    if any(isinstance(v, bool) or not isinstance(v, t) for v, t in zip(key, types)):
+        raise InvalidCursor("invalid cursor")
+    return key
+
+
+# The alphabetical browse order in SQL. COLLATE "C" compares code points the
+# way Python sorts strings, and matches the campsite_search_browse index.
+_BROWSE_KEY_SQL = (
+    "COALESCE(campsite_search.forest_name, '') COLLATE \"C\", "
+    "campsite_search.name COLLATE \"C\", "
+    "campsite_search.id"
+)
+
+
+def _fetch_browse_page(after=None, limit=50, is_open=None, has_water=None, has_restrooms=None, forest=None, bbox=None):
+    """Filtered rows in (forest, name, id) order, starting after ``after``.
+
+    ORDER BY + LIMIT run in Postgres against the browse index, so a page
+    costs the same however many campsites match the filters. The in-memory
+    store keeps the same order precomputed.
+    """
+
+    if SEARCH_IN_MEMORY:
+        return get_store().browse(
+            after=after,
+            limit=limit,
+            is_open=is_open,
+            has_water=has_water,
+            has_restrooms=has_restrooms,
+            forest=forest,
+            bbox=bbox,
+        )
+
+    filter_sql, params = _filter_sql(is_open, has_water, has_restrooms, forest, bbox)
+    sql = _SEARCH_SELECT + filter_sql
+    if after is not None:
+        sql += f" AND ({_BROWSE_KEY_SQL}) > (%s, %s, %s)"
+        params = params + list(after)
+    sql += f" ORDER BY {_BROWSE_KEY_SQL} LIMIT %s"
+    return _fetch_search_rows(sql, params + [limit])
+
+
+def search_campsites_page(
+    query=None,
+    *,
+    is_open=None,
+    has_water=None,
+    has_restrooms=None,
+    forest=None,
+    near=None,
+    radius_km=None,
+    bbox=None,
+    fuzzthresh=40,
+    page_size=50,
+    cursor=None,
+    prefilter=None,
+    facets=False,
+):
+    """One page of ``search_campsites`` results plus a cursor for the next.
+
+    Returns ``{"results": [...], "next_cursor": str or None}``. Pass the
+    cursor back (with the same search arguments) to get the following page.
+    With ``facets=True`` the dict also has ``"facets"`` (see
+    ``search_campsites``), counted over the whole search, not just the page.
+
+    * Filter-only browsing pages through the database in (forest, name)
+      order, so a page is cheap even when most sites match. Its facets are
+      counted separately (see ``_browse_facets``), without loading the rows.
+    * Text and ``near`` searches page through the full ranked / distance
+      ordered match list, which is cached between pages; only the page
+      itself is turned into result dicts.
+    """
+
+    filters = {
+        "is_open": is_open,
+        "has_water": has_water,
+        "has_restrooms": has_restrooms,
+        "forest": forest,
+        "bbox": bbox,
+    }
+
+    if not query and near is None:
+        after = decode_cursor(cursor, "name") if cursor else None
+        rows = _fetch_browse_page(after=after, limit=page_size + 1, **filters)
+        page = _page([_row_to_result(row) for row in rows], page_size, "name", _name_sort_key)
+        if facets:
+            page["facets"] = _browse_facets(**filters)
+        return page
+
+    if prefilter is None:
+        prefilter = TRGM_PREFILTER
+    if near is not None and radius_km is None:
+        radius_km = DEFAULT_RADIUS_KM
+
+    if query:
+        mode, sort_key = "rank", _rank_sort_key
+    else:
+        mode, sort_key = "distance", _distance_sort_key
+    after = decode_cursor(cursor, mode) if cursor else None
+
+    matches, counts = _cached_search(
+        query, is_open, has_water, has_restrooms, forest, near, radius_km, bbox, fuzzthresh, None, prefilter
+    )
+    start = 0
+    if after is not None:
+        # The matches are sorted by their keys, so find the first one past it.
+        keys = [_match_key(match) for match in matches]
+        try:
+            start = bisect.bisect_right(keys, after)
+        except TypeError as e:
+            raise InvalidCursor("invalid cursor") from e
+    results = [_match_to_result(match) for match in matches[start:start + page_size + 1]]
+    page = _page(results, page_size, mode, sort_key)
+    if facets:
+        page["facets"] = _copy_facets(counts)
+    return page
+
+
+def _browse_facets(is_open=None, has_water=None, has_restrooms=None, forest=None, bbox=None):
+    """Facet counts for a filter-only search, without fetching its rows.
+
+    The in-memory store counts them from its bitmaps; Postgres runs one
+    GROUP BY. Cached alongside the search results.
+    """
+
+    if SEARCH_CACHE_SIZE <= 0:
+        return _count_browse_facets(is_open, has_water, has_restrooms, forest, bbox)
+
+    key = ("facets",) + _search_cache_key(
+        None, is_open, has_water, has_restrooms, forest, None, None, bbox, None, None, False
+    )
+    counts = _result_cache.get(key)
+    if counts is MISSING:
+        counts = _count_browse_facets(is_open, has_water, has_restrooms, forest, bbox)
+        _result_cache.set(key, counts)
+    return _copy_facets(counts)
+
+
+def _count_browse_facets(is_open, has_water, has_restrooms, forest, bbox):
+    if SEARCH_IN_MEMORY:
+        counts = get_store().facet_counts(
+            is_open=is_open, has_water=has_water, has_restrooms=has_restrooms, forest=forest, bbox=bbox
+        )
+        # Same rule as _facet_counts: sites without a forest aren't listed.
+        forests = {name: count for name, count in counts["forests"].items() if name}
+        return _facet_summary(counts["total"], forests, counts["is_open"], counts["water"], counts["restrooms"])
+
+    filter_sql, params = _filter_sql(is_open, has_water, has_restrooms, forest, bbox)
+    sql = f"""
+        SELECT
+            campsite_search.forest_name,
+            count(*),
+            count(*) FILTER (WHERE campsite_search.is_open),
+            count(*) FILTER (WHERE campsite_search.water),
+            count(*) FILTER (WHERE campsite_search.restrooms)
+        FROM {_SOURCE}
+        WHERE 1 = 1
+    """ + filter_sql + " GROUP BY campsite_search.forest_name"
+
+    total = is_open_count = water_count = restrooms_count = 0
+    forests = {}
+    for forest_name, count, open_count, water, restrooms in _fetch_search_rows(sql, params):
+        total += count
+        is_open_count += open_count
+        water_count += water
+        restrooms_count += restrooms
+        # Same rule as _facet_counts: sites without a forest aren't listed.
+        if forest_name:
+            forests[forest_name] = count
+    return _facet_summary(total, forests, is_open_count, water_count, restrooms_count)
+
+
+def _page(results, page_size, mode, sort_key):
+    """Trim a page_size + 1 fetch down to one page and build the next cursor."""
+    if len(results) > page_size:
+        results = results[:page_size]
+        return {"results": results, "next_cursor": encode_cursor(mode, sort_key(results[-1]))}
+    return {"results": results, "next_cursor": None}
+
+
+def iter_search_results(query=None, page_size=200, cursor=None, **kwargs):
+    """Yield every result of a search (after ``cursor``), one page at a time."""
+    while True:
+        page = search_campsites_page(query, page_size=page_size, cursor=cursor, **kwargs)
+        yield from page["results"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return
 
 
 def get_campsite_by_name(query, fuzzthresh=40, limit=10):
@@ -276,26 +891,50 @@ def get_all_forests():
     """Return a sorted list of distinct forest names from the database.
 
     This is used to populate the "National Forest" dropdown dynamically so it
-    automatically includes every forest present in the data.
+    automatically includes every forest present in the data. The list is
+    cached until the data version changes; callers get their own copy.
     """
 
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT DISTINCT forest_name
-        FROM campsites
-        WHERE forest_name IS NOT NULL
-        ORDER BY forest_name
-        """
-    )
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    version = get_data_version()
+    forests = _forest_list_cache.get(version)
+    if forests is MISSING:
+        forests = _fetch_all_forests()
+        _forest_list_cache.set(version, forests)
+    return list(forests)
+
+
+def _fetch_all_forests():
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT DISTINCT forest_name
+            FROM campsites
+            WHERE forest_name IS NOT NULL
+            ORDER BY forest_name
+            """
+        )
+        rows = cur.fetchall()
+        cur.close()
 
     return [r[0] for r in rows]
 
 
+def get_campsite_names():
+    """Return ``(id, name, forest_name)`` for every campsite (for suggest.py)."""
+
+    if SEARCH_IN_MEMORY:
+        return [(r.id, r.name, r.forest_name) for r in get_store().records if r.name is not None]
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id, name, forest_name FROM campsites WHERE name IS NOT NULL")
+        rows = cur.fetchall()
+        cur.close()
+
+    return rows
+
+
 def get_campsites_for_map():
     """Return a lightweight set of campsite data for the map view.
 
@@ -303,50 +942,52 @@ def get_campsites_for_map():
     Forest, matching what's shown in the California reference map.
     """
 
-    conn = get_connection()
-    cur = conn.cursor()
-
-    # Some deployments may not have a dedicated forest_name column
-    # (older schema used managing_unit instead). Try the newer schema
-    # first and gracefully fall back to managing_unit only if needed so
-    # the map endpoint never hard-crashes.
-    try:
-        cur.execute(
-            """
-            SELECT
-                id,
-                name,
-                forest_name,
-                latitude,
-                longitude
-            FROM campsites
-            WHERE latitude IS NOT NULL
-              AND longitude IS NOT NULL
-            """
-        )
-        rows = cur.fetchall()
-        rows_mode = "forest_name"
-    except Exception:
-        # Roll back the failed statement and fall back to managing_unit.
-        conn.rollback()
-        cur.execute(
-            """
-            SELECT
-                id,
-                name,
-                managing_unit,
-                latitude,
-                longitude
-            FROM campsites
-            WHERE latitude IS NOT NULL
-              AND longitude IS NOT NULL
-            """
-        )
-        rows = cur.fetchall()
-        rows_mode = "managing_unit"
+    if SEARCH_IN_MEMORY:
+        return get_store().map_points()
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+
+        # Some deployments may not have a dedicated forest_name column
+        # (older schema used managing_unit instead). Try the newer schema
+        # first and gracefully fall back to managing_unit only if needed so
+        # the map endpoint never hard-crashes.
+        try:
+            cur.execute(
+                """
+                SELECT
+                    id,
+                    name,
+                    forest_name,
+                    latitude,
+                    longitude
+                FROM campsites
+                WHERE latitude IS NOT NULL
+                  AND longitude IS NOT NULL
+                """
+            )
+            rows = cur.fetchall()
+            rows_mode = "forest_name"
+        except Exception:
+            # Roll back the failed statement and fall back to managing_unit.
+            conn.rollback()
+            cur.execute(
+                """
+                SELECT
+                    id,
+                    name,
+                    managing_unit,
+                    latitude,
+                    longitude
+                FROM campsites
+                WHERE latitude IS NOT NULL
+                  AND longitude IS NOT NULL
+                """
+            )
+            rows = cur.fetchall()
+            rows_mode = "managing_unit"
 
-    cur.close()
-    conn.close()
+        cur.close()
 
     results = []
     for site_id, name, region_label, latitude, longitude in rows:
@@ -85,93 +85,144 @@ function initMap() {
     attribution: "© OpenStreetMap contributors",
   }).addTo(map);
 
-  fetch("/api/map/campsites")
-    .then(async (resp) => {
-      if (!resp.ok) {
-        const text = await resp.text().catch(() => "");
-        console.error("/api/map/campsites returned an error status", resp.status, text);
-        return [];
+  const forestColors = {};
+  const colorPalette = ["#166534", "#92400e", "#0369a1", "#15803d", "#7c2d12", "#047857"];
+  let paletteIndex = 0;
+
+  function colorForForest(forestName) {
+    const forest = forestName || "Other";
+    if (!forestColors[forest]) {
+      forestColors[forest] = colorPalette[paletteIndex % colorPalette.length];
+      paletteIndex += 1;
+    }
+    return forestColors[forest];
+  }
+
+  function campsiteUrl(siteId) {
+    const params = new URLSearchParams();
+    const startEl = document.getElementById("start_date");
+    const endEl = document.getElementById("end_date");
+
+    if (startEl && startEl.value) {
+      params.set("start", startEl.value);
+    }
+    if (endEl && endEl.value) {
+      params.set("end", endEl.value);
+    }
+
+    const qs = params.toString();
+    return qs ? `/campsite/${siteId}?${qs}` : `/campsite/${siteId}`;
+  }
+
+  function siteMarker(site) {
+    const color = colorForForest(site.forest_name);
+    const marker = L.circleMarker([site.latitude, site.longitude], {
+      radius: 5,
+      color,
+      weight: 1.2,
+      fillColor: color,
+      fillOpacity: 0.9,
+    });
+
+    // Hover tooltip: small "mini card" with name + link
+    marker.bindTooltip(
+      `<div class="map-tooltip-card">
+         <div class="map-tooltip-title">${site.name}</div>
+         <a class="map-tooltip-link" href="/campsite/${site.id}">Open campsite</a>
+       </div>`,
+      {
+        direction: "top",
+        offset: [0, -4],
+        permanent: false,
+        sticky: true,
+        className: "map-tooltip",
       }
-      return resp.json();
-    })
-    .then((points) => {
-      if (!Array.isArray(points) || !points.length) {
-        console.warn("Map data loaded but no campsite points were returned.");
-        return;
+    );
+
+    marker.on("click", () => {
+      window.location.href = campsiteUrl(site.id);
+    });
+
+    return marker;
+  }
+
+  function clusterMarker(cluster) {
+    const color = colorForForest(cluster.forest_name);
+    // Grow with the number of campsites, but slowly so big clusters don't
+    // swallow the map.
+    const marker = L.circleMarker([cluster.latitude, cluster.longitude], {
+      radius: Math.min(6 + Math.sqrt(cluster.count) * 2, 24),
+      color,
+      weight: 1.2,
+      fillColor: color,
+      fillOpacity: 0.6,
+    });
+
+    marker.bindTooltip(
+      `<div class="map-tooltip-card">
+         <div class="map-tooltip-title">${cluster.count} campsites</div>
+         <div>${cluster.forest_name || "Other"}</div>
+       </div>`,
+      {
+        direction: "top",
+        offset: [0, -4],
+        permanent: false,
+        sticky: true,
+        className: "map-tooltip",
       }
+    );
 
-      console.log("Loaded campsite points for map:", points.length);
+    // Clicking a cluster zooms in on it until it splits into campsites.
+    marker.on("click", () => {
+      map.setView([cluster.latitude, cluster.longitude], map.getZoom() + 2);
+    });
 
-      const forestColors = {};
-      const colorPalette = ["#166534", "#92400e", "#0369a1", "#15803d", "#7c2d12", "#047857"];
-      let paletteIndex = 0;
+    return marker;
+  }
 
-      const bounds = [];
+  const markerLayer = L.layerGroup().addTo(map);
+  let requestId = 0;
 
-      points.forEach((site) => {
-        const lat = site.latitude;
-        const lon = site.longitude;
-        if (lat == null || lon == null) return;
+  // Only ask for what is on screen; the server sends clusters when zoomed
+  // out and individual campsites when zoomed in.
+  function loadVisibleCampsites() {
+    const thisRequest = ++requestId;
+    const params = new URLSearchParams({
+      bbox: map.getBounds().toBBoxString(),
+      zoom: String(Math.floor(map.getZoom())),
+    });
 
-        const forest = site.forest_name || "Other";
-        if (!forestColors[forest]) {
-          forestColors[forest] = colorPalette[paletteIndex % colorPalette.length];
-          paletteIndex += 1;
+    fetch(`/api/map/campsites?${params.toString()}`)
+      .then(async (resp) => {
+        if (!resp.ok) {
+          const text = await resp.text().catch(() => "");
+          console.error("/api/map/campsites returned an error status", resp.status, text);
+          return null;
+        }
+        return resp.json();
+      })
+      .then((payload) => {
+        // A newer pan/zoom already started loading; drop this response.
+        if (!payload || thisRequest !== requestId) {
+          return;
         }
-        const color = forestColors[forest];
-
-        const marker = L.circleMarker([lat, lon], {
-          radius: 5,
-          color,
-          weight: 1.2,
-          fillColor: color,
-          fillOpacity: 0.9,
-        });
 
-        // Hover tooltip: small "mini card" with name + link
-        marker.bindTooltip(
-          `<div class="map-tooltip-card">
-             <div class="map-tooltip-title">${site.name}</div>
-             <a class="map-tooltip-link" href="/campsite/${site.id}">Open campsite</a>
-           </div>`,
-          {
-            direction: "top",
-            offset: [0, -4],
-            permanent: false,
-            sticky: true,
-            className: "map-tooltip",
-          }
-        );
-
-        marker.on("click", () => {
-          const params = new URLSearchParams();
-          const startEl = document.getElementById("start_date");
-          const endEl = document.getElementById("end_date");
-
-          if (startEl && startEl.value) {
-            params.set("start", startEl.value);
-          }
-          if (endEl && endEl.value) {
-            params.set("end", endEl.value);
-          }
-
-          const qs = params.toString();
-          window.location.href = qs
-            ? `/campsite/${site.id}?${qs}`
-            : `/campsite/${site.id}`;
-        });
+        markerLayer.clearLayers();
+        const items = Array.isArray(payload.items) ? payload.items : [];
 
-        marker.addTo(map);
-        bounds.push([lat, lon]);
+        items.forEach((item) => {
+          if (item.latitude == null || item.longitude == null) return;
+          const isCluster = payload.mode === "clusters" && item.count > 1;
+          markerLayer.addLayer(isCluster ? clusterMarker(item) : siteMarker(item));
+        });
+      })
+      .catch((err) => {
+        console.error("Failed to load map data", err);
       });
+  }
 
-      if (bounds.length) {
-        map.fitBounds(bounds, { padding: [30, 30] });
-      }
-    })
-    .catch((err) => {
-      console.error("Failed to load map data", err);
-    });
+  map.on("moveend", loadVisibleCampsites);
+  loadVisibleCampsites();
 }
 
 // Init on DOM ready ------------------------------------------------------
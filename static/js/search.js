@@ -67,6 +67,61 @@ async function handleSearchSubmit(event) {
   }
 }
 
+// Typeahead: ask /api/suggest once typing pauses and fill the input's
+// <datalist>. A newer keystroke aborts the request still in flight.
+const SUGGEST_DELAY_MS = 120;
+let suggestTimer = null;
+let suggestController = null;
+
+function fillSuggestions(list, suggestions) {
+  list.innerHTML = "";
+  suggestions.forEach(function (s) {
+    const option = document.createElement("option");
+    option.value = s.label;
+    if (s.type === "campsite" && s.forest_name) {
+      option.label = `${s.label} (${s.forest_name})`;
+    } else if (s.type === "forest") {
+      option.label = `${s.label} (forest)`;
+    }
+    list.appendChild(option);
+  });
+}
+
+function handleSuggestInput(event) {
+  const list = document.getElementById("searchSuggestions");
+  const q = event.target.value.trim();
+
+  clearTimeout(suggestTimer);
+  if (!list) {
+    return;
+  }
+  if (!q) {
+    list.innerHTML = "";
+    return;
+  }
+
+  suggestTimer = setTimeout(async function () {
+    if (suggestController) {
+      suggestController.abort();
+    }
+    suggestController = new AbortController();
+
+    try {
+      const res = await fetch(`/api/suggest?q=${encodeURIComponent(q)}`, {
+        signal: suggestController.signal,
+      });
+      if (!res.ok) {
+        return;
+      }
+      fillSuggestions(list, await res.json());
+    } catch (err) {
+      if (err.name !== "AbortError") {
+        console.error("Suggest failed:", err);
+      }
+    }
+  }, SUGGEST_DELAY_MS);
+}
+
 document.addEventListener("DOMContentLoaded", function () {
   const form = document.getElementById("searchForm");
   if (form) {
@@ -76,6 +131,10 @@ document.addEventListener("DOMContentLoaded", function () {
   const searchInput = document.getElementById("searchInput");
   const filters = document.getElementById("filters");
 
+  if (searchInput) {
+    searchInput.addEventListener("input", handleSuggestInput);
+  }
+
   if (searchInput && filters) {
     searchInput.addEventListener("focus", function () {
       filters.style.display = "block";
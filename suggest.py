@@ -0,0 +1,197 @@
+"""Typeahead suggestions for the search box (``/api/suggest``).
+
+Everything is answered from memory so it can run on every keystroke:
+
+* Each campsite and forest name is normalized the way ``search.normalize``
+  does it and put into one sorted list. Names are also indexed from every
+  word start, so "creek" finds "Pine Creek".
+* Suggestions are ranked shortest key first and deduplicated by label, so
+  three campsites called "Pine" show up once.
+* The best ``MAX_LIMIT`` suggestions for every prefix up to
+  ``TOP_PREFIX_LENGTH`` characters are worked out when the index is built,
+  so the first keystrokes (the widest ranges) are a dict lookup. A longer
+  query's exact-prefix matches are one ``bisect`` range in the key list,
+  whose best entries are picked with a partial sort of their precomputed
+  ranks.
+* If that doesn't fill the page (usually a typo), the distinct key starts
+  that share the query's first ``BUCKET_PREFIX`` characters are scored with
+  rapidfuzz against the query, so only that small bucket is ever scored.
+
+The index is built from ``search.get_campsite_names`` and rebuilt when the
+data version changes, like the map index.
+"""
+
+import bisect
+import re
+import threading
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from db import get_data_version
+from search import get_campsite_names, normalize
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+# Typo tolerance only looks at entries sharing this many leading characters.
+BUCKET_PREFIX = 2
+# Minimum rapidfuzz ratio for a typo match.
+FUZZY_CUTOFF = 70
+# Prefixes up to this long get their suggestions precomputed. Each level
+# adds one list of at most MAX_LIMIT suggestions per distinct prefix.
+TOP_PREFIX_LENGTH = 4
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _word_starts(name):
+    """Normalized ``name`` from each word onwards: "Pine Creek" -> pinecreek, creek."""
+    return [normalize(name[m.start():]) for m in re.finditer(r"\S+", name)]
+
+
+def build_index(rows):
+    """Build the sorted key list from ``(id, name, forest_name)`` rows."""
+    entries = []
+    forests = set()
+    for site_id, name, forest_name in rows:
+        suggestion = {"type": "campsite", "id": site_id, "label": name, "forest_name": forest_name}
+        for key in _word_starts(name or ""):
+            entries.append((key, len(entries), suggestion))
+        if forest_name and forest_name not in forests:
+            forests.add(forest_name)
+            suggestion = {"type": "forest", "label": forest_name}
+            for key in _word_starts(forest_name):
+                entries.append((key, len(entries), suggestion))
+
+    # The middle element keeps sorting off the (unorderable) dicts.
+    entries.sort(key=lambda e: (e[0], e[1]))
+    keys = [e[0] for e in entries]
+    suggestions = [e[2] for e in entries]
+
+    # Suggestion order: shortest (closest) key first, then alphabetical,
+    # then insertion order. by_rank[r] is the entry at rank r, rank[i] the
+    # rank of entry i.
+    # The keys are already sorted, so a stable sort on length is enough.
+    lengths = np.fromiter(map(len, keys), dtype=np.int64, count=len(keys))
+    by_rank = np.argsort(lengths, kind="stable")
+    rank = np.empty(len(keys), dtype=np.int64)
+    rank[by_rank] = np.arange(len(keys))
+
+    # Walk the entries best first and hand each to every short prefix of its
+    # key that still has room and hasn't seen its label yet.
+    top = {}
+    labels = {}
+    for i in by_rank.tolist():
+        key = keys[i]
+        label = suggestions[i]["label"]
+        for length in range(1, min(len(key), TOP_PREFIX_LENGTH) + 1):
+            prefix = key[:length]
+            found = top.get(prefix)
+            if found is None:
+                top[prefix] = [suggestions[i]]
+                labels[prefix] = {label}
+            elif len(found) < MAX_LIMIT and label not in labels[prefix]:
+                found.append(suggestions[i])
+                labels[prefix].add(label)
+
+    return {
+        "keys": keys,
+        "suggestions": suggestions,
+        "rank": rank,
+        "by_rank": by_rank,
+        "top": top,
+        # Distinct keys, for the typo search.
+        "unique_keys": sorted(set(keys)),
+    }
+
+
+def get_index():
+    """Return the current suggestion index, rebuilding it if the data changed."""
+    global _index
+
+    version = get_data_version()
+    current = _index
+    if current is not None and current["version"] == version:
+        return current
+
+    with _index_lock:
+        if _index is None or _index["version"] != version:
+            index = build_index(get_campsite_names())
+            index["version"] = version
+            _index = index
+        return _index
+
+
+def invalidate():
+    global _index
+    _index = None
+
+
+def _prefix_range(keys, prefix):
+    lo = bisect.bisect_left(keys, prefix)
+    hi = bisect.bisect_left(keys, prefix + "￿", lo)
+    return lo, hi
+
+
+def _prefix_matches(index, prefix, limit):
+    """The best ``limit`` suggestions (distinct labels) whose key starts with ``prefix``."""
+    if len(prefix) <= TOP_PREFIX_LENGTH:
+        return index["top"].get(prefix, [])[:limit]
+
+    keys, suggestions, by_rank = index["keys"], index["suggestions"], index["by_rank"]
+    lo, hi = _prefix_range(keys, prefix)
+    ranks = index["rank"][lo:hi]
+    # A few times the limit is normally enough to get past duplicate labels;
+    # look further only when it isn't.
+    wanted = limit * 4
+    while True:
+        if wanted < len(ranks):
+            best = np.sort(np.partition(ranks, wanted)[:wanted])
+        else:
+            best = np.sort(ranks)
+        results = []
+        labels = set()
+        for r in best:
+            suggestion = suggestions[by_rank[r]]
+            if suggestion["label"] not in labels:
+                labels.add(suggestion["label"])
+                results.append(suggestion)
+                if len(results) >= limit:
+                    return results
+        if wanted >= len(ranks):
+            return results
+        wanted *= 4
+
+
+def suggest(q, limit=DEFAULT_LIMIT):
+    """Top ``limit`` suggestions for the partial query ``q``."""
+    query = normalize(q)
+    if not query:
+        return []
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    index = get_index()
+
+    # Exact prefix hits first, shortest (closest) names first.
+    results = _prefix_matches(index, query, limit)
+    if len(results) >= limit or len(query) <= BUCKET_PREFIX:
+        return results
+
+    # Typo tolerance: compare the query with the same-length start of every
+    # distinct key in its bucket, then take the best suggestions for each
+    # start that is close enough.
+    results = list(results)
+    labels = {suggestion["label"] for suggestion in results}
+    unique_keys = index["unique_keys"]
+    lo, hi = _prefix_range(unique_keys, query[:BUCKET_PREFIX])
+    heads = list(dict.fromkeys(key[: len(query)] for key in unique_keys[lo:hi]))
+    for head, _, _ in process.extract(query, heads, scorer=fuzz.ratio, score_cutoff=FUZZY_CUTOFF, limit=limit):
+        for suggestion in _prefix_matches(index, head, limit):
+            if suggestion["label"] not in labels:
+                labels.add(suggestion["label"])
+                results.append(suggestion)
+                if len(results) >= limit:
+                    return results
+
+    return results
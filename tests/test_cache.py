@@ -0,0 +1,80 @@
+import pytest
+
+import cache
+from cache import MISSING, TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+def test_get_and_set(clock):
+    c = TTLCache(maxsize=4, ttl=10)
+    assert c.get("a") is MISSING
+    assert c.get("a", "default") == "default"
+    c.set("a", None)
+    assert c.get("a") is None
+    assert c.stats()["hits"] == 1 and c.stats()["misses"] == 2
+
+
+def test_entries_expire(clock):
+    c = TTLCache(maxsize=4, ttl=10)
+    c.set("a", 1)
+    c.set("b", 2, ttl=30)
+    clock.now += 10
+    assert c.get("a") is MISSING
+    # The expired entry is dropped on read.
+    assert len(c) == 1
+    assert c.get("b") == 2
+    clock.now += 20
+    assert c.get("b") is MISSING
+
+
+def test_least_recently_used_is_evicted(clock):
+    c = TTLCache(maxsize=2, ttl=10)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")
+    c.set("c", 3)
+    assert c.get("b") is MISSING
+    assert c.get("a") == 1 and c.get("c") == 3
+    assert c.evictions == 1
+
+
+def test_set_refreshes_an_entry(clock):
+    c = TTLCache(maxsize=2, ttl=10)
+    c.set("a", 1)
+    clock.now += 8
+    c.set("a", 2)
+    clock.now += 8
+    assert c.get("a") == 2
+
+
+def test_zero_size_keeps_nothing(clock):
+    c = TTLCache(maxsize=0, ttl=10)
+    c.set("a", 1)
+    assert c.get("a") is MISSING
+    assert len(c) == 0
+
+
+def test_clear_and_stats(clock):
+    c = TTLCache(maxsize=3, ttl=5)
+    c.set("a", 1)
+    c.get("a")
+    c.get("b")
+    c.clear()
+    stats = c.stats()
+    assert stats["size"] == 0
+    assert stats["hit_rate"] == 0.5
+    assert (stats["maxsize"], stats["ttl"]) == (3, 5)
@@ -0,0 +1,111 @@
+import pytest
+
+from campsite_store import CampsiteRecord, CampsiteStore
+
+# (id, name, forest_name, latitude, longitude, is_open, forecast_json, water, restrooms)
+ROWS = [
+    (4, "Aspen Group", "Inyo National Forest", 37.40, -118.60, None, None, False, False),
+    (1, "Pinecrest", "Stanislaus National Forest", 38.19, -119.99, True, {"temp": 70}, True, True),
+    (3, "Big Pine Creek", "Inyo National Forest", 37.12, -118.43, True, None, None, True),
+    (2, "Pine Marten", "Stanislaus National Forest", 38.40, -119.77, False, None, True, None),
+    (5, "Lone Camp", None, None, None, True, None, True, False),
+    (6, "Lake Alpine", "Stanislaus National Forest", 38.48, -120.00, True, None, True, True),
+]
+
+
+@pytest.fixture
+def store():
+    return CampsiteStore(ROWS, version=7)
+
+
+def ids(records):
+    return [r.id for r in records]
+
+
+def test_records_are_in_id_order(store):
+    assert len(store) == 6
+    assert ids(store.records) == [1, 2, 3, 4, 5, 6]
+    assert isinstance(store.records[0], CampsiteRecord)
+    assert tuple(store.records[0]) == ROWS[1]
+    assert store.version == 7
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        ({}, [1, 2, 3, 4, 5, 6]),
+        # Flags only apply when True, and NULL counts as no.
+        ({"is_open": True}, [1, 3, 5, 6]),
+        ({"is_open": False}, [1, 2, 3, 4, 5, 6]),
+        ({"has_water": True, "has_restrooms": True}, [1, 6]),
+        ({"forest": "  STAN "}, [1, 2, 6]),
+        ({"forest": "national"}, [1, 2, 3, 4, 6]),
+        ({"forest": "shasta"}, []),
+        ({"forest": "inyo", "is_open": True}, [3]),
+    ],
+)
+def test_filter(store, filters, expected):
+    assert ids(store.filter(**filters)) == expected
+
+
+def test_bbox_includes_edges_and_skips_missing_coordinates(store):
+    assert ids(store.filter(bbox=(-120.0, 38.19, -119.77, 38.48))) == [1, 2, 6]
+    assert ids(store.filter(bbox=(-180, -90, 180, 90))) == [1, 2, 3, 4, 6]
+
+
+def test_inverted_bbox_matches_nothing(store):
+    assert ids(store.filter(bbox=(-118, 37, -120, 39))) == []
+    assert ids(store.filter(bbox=(-120, 39, -118, 37))) == []
+
+
+def test_browse_pages_in_forest_name_order(store):
+    # Sites without a forest sort first, like COALESCE(forest_name, '').
+    assert ids(store.browse(limit=10)) == [5, 4, 3, 6, 2, 1]
+    first = store.browse(limit=2)
+    assert ids(first) == [5, 4]
+    last = first[-1]
+    after = (last.forest_name or "", last.name, last.id)
+    assert ids(store.browse(after=after, limit=2)) == [3, 6]
+    assert ids(store.browse(after=after, limit=10, has_water=True)) == [6, 2, 1]
+
+
+def test_browse_rejects_incomparable_cursor(store):
+    with pytest.raises(ValueError):
+        store.browse(after=(1, 2, 3))
+
+
+def test_map_points_skip_sites_without_coordinates(store):
+    points = store.map_points()
+    assert [p["id"] for p in points] == [1, 2, 3, 4, 6]
+    assert points[0] == {
+        "id": 1,
+        "name": "Pinecrest",
+        "forest_name": "Stanislaus National Forest",
+        "latitude": 38.19,
+        "longitude": -119.99,
+    }
+
+
+@pytest.mark.parametrize("filters", [{}, {"is_open": True}, {"forest": "inyo"}, {"bbox": (-121, 38, -119, 39)}])
+def test_facet_counts_match_the_filtered_rows(store, filters):
+    records = store.filter(**filters)
+    forests = {}
+    for r in records:
+        if r.forest_name is not None:
+            forests[r.forest_name] = forests.get(r.forest_name, 0) + 1
+    assert store.facet_counts(**filters) == {
+        "total": len(records),
+        "is_open": sum(r.is_open is True for r in records),
+        "water": sum(r.water is True for r in records),
+        "restrooms": sum(r.restrooms is True for r in records),
+        "forests": forests,
+    }
+
+
+def test_empty_store():
+    store = CampsiteStore([])
+    assert store.filter(is_open=True) == []
+    assert store.browse() == []
+    assert store.map_points() == []
+    assert store.facet_counts()["total"] == 0
+    assert store.nbytes() >= 0
@@ -0,0 +1,76 @@
+import pytest
+
+import search
+from search import InvalidCursor, decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize(
+    "mode, key",
+    [
+        ("name", ("Stanislaus National Forest", "Pinecrest", 12)),
+        ("distance", (4.25, "Inyo National Forest", "Big Pine Creek", 7)),
+        ("rank", (-87.5, 3)),
+        ("rank", (0, 3)),
+    ],
+)
+def test_round_trip(mode, key):
+    assert decode_cursor(encode_cursor(mode, key), mode) == key
+
+
+def test_cursor_from_another_mode_is_rejected():
+    cursor = encode_cursor("rank", (-80.0, 3))
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, "name")
+
+
+@pytest.mark.parametrize(
+    "mode, cursor",
+    [
+        ("name", "not a cursor"),
+        ("name", ""),
+        ("name", encode_cursor("name", ("a", "b"))),
+        ("name", encode_cursor("name", ("a", "b", "12"))),
+        ("name", encode_cursor("name", ("a", 5, 12))),
+        ("name", encode_cursor("name", ("a", "b", True))),
+        ("rank", encode_cursor("rank", ("high", 3))),
+        ("distance", encode_cursor("distance", (None, "a", "b", 1))),
+    ],
+)
+def test_bad_cursors_are_rejected(mode, cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, mode)
+
+
+def test_invalid_cursor_is_a_value_error():
+    assert issubclass(InvalidCursor, ValueError)
+
+
+def test_decoded_key_sorts_with_result_keys():
+    key = decode_cursor(encode_cursor("name", ("Inyo", "Aspen", 1)), "name")
+    results = [{"forest_name": "Inyo", "name": "Big Pine", "id": 2}, {"forest_name": None, "name": "X", "id": 3}]
+    assert sorted([key] + [search._name_sort_key(r) for r in results])[0] == ("", "X", 3)
+
+
+@pytest.fixture
+def client():
+    import app
+
+    return app.app.test_client()
+
+
+def test_api_rejects_bad_cursor(client):
+    response = client.get("/api/search?cursor=garbage")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Invalid cursor"
+
+
+def test_other_value_errors_are_not_cursor_errors(client, monkeypatch):
+    import app
+
+    def broken(**kwargs):
+        raise ValueError("something else")
+
+    monkeypatch.setattr(app, "search_campsites_page", broken)
+    response = client.get("/api/search?query=pine")
+    assert response.status_code == 500
+    assert response.get_json()["error"] == "Search failed"
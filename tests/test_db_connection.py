@@ -0,0 +1,88 @@
+import threading
+
+import psycopg2
+import pytest
+
+import db
+
+
+class FakeConn:
+    def __init__(self):
+        self.closed = 0
+        self.rollbacks = 0
+        self.commits = 0
+        self.rollback_error = None
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+        if self.rollback_error is not None:
+            raise self.rollback_error
+
+
+class FakePool:
+    def __init__(self):
+        self.conn = FakeConn()
+        self.returned = []
+
+    def getconn(self):
+        return self.conn
+
+    def putconn(self, conn, close=False):
+        self.returned.append((conn, close))
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    fake = FakePool()
+    monkeypatch.setattr(db, "_get_pool", lambda: fake)
+    monkeypatch.setattr(db, "_pool_slots", threading.BoundedSemaphore(1))
+    return fake
+
+
+def resets():
+    return db.pool_stats()["resets"]
+
+
+@pytest.mark.parametrize(
+    "error",
+    [psycopg2.errors.QueryCanceled("statement timeout"), psycopg2.errors.DeadlockDetected("deadlock"), ValueError()],
+)
+def test_errors_on_a_healthy_connection_roll_back_and_keep_it(fake_pool, error):
+    before = resets()
+    with pytest.raises(type(error)):
+        with db.get_connection():
+            raise error
+    assert fake_pool.conn.rollbacks == 1
+    assert fake_pool.returned == [(fake_pool.conn, False)]
+    assert resets() == before
+
+
+def test_closed_connection_is_discarded(fake_pool):
+    before = resets()
+    with pytest.raises(psycopg2.OperationalError):
+        with db.get_connection() as conn:
+            conn.closed = 2
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+    assert fake_pool.conn.rollbacks == 0
+    assert fake_pool.returned == [(fake_pool.conn, True)]
+    assert resets() == before + 1
+
+
+def test_failed_rollback_discards_the_connection(fake_pool):
+    fake_pool.conn.rollback_error = psycopg2.InterfaceError("connection already closed")
+    with pytest.raises(psycopg2.errors.QueryCanceled):
+        with db.get_connection():
+            raise psycopg2.errors.QueryCanceled("statement timeout")
+    assert fake_pool.returned == [(fake_pool.conn, True)]
+
+
+def test_clean_exit_commits(fake_pool):
+    with db.get_connection():
+        pass
+    assert fake_pool.conn.commits == 1
+    assert fake_pool.returned == [(fake_pool.conn, False)]
+    # The slot is free again.
+    assert db._pool_slots.acquire(timeout=0)
@@ -0,0 +1,81 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import pytest
+
+from scripts import dynamic
+from weather import forecast_cell
+
+DAY = date(2026, 7, 1)
+# Sites 1 and 2 are ~300 m apart (one cell); site 3 is ~20 km away.
+BATCH = [(1, 38.2001, -120.0001), (2, 38.2021, -120.0031), (3, 38.3800, -120.0001)]
+
+
+class FreeBucket:
+    def __init__(self):
+        self.tokens = 0
+
+    def acquire(self):
+        self.tokens += 1
+
+
+def test_plan_groups_sites_by_storage_cell():
+    plan = dynamic.plan_fetches(BATCH, DAY)
+    assert plan == {
+        (*forecast_cell(38.2001, -120.0001), DAY): [1, 2],
+        (*forecast_cell(38.3800, -120.0001), DAY): [3],
+    }
+
+
+def test_plan_keys_are_the_stored_cells():
+    for (cell_lat, cell_lon, day), ids in dynamic.plan_fetches(BATCH, DAY).items():
+        for site_id, lat, lon in BATCH:
+            if site_id in ids:
+                assert forecast_cell(lat, lon) == (cell_lat, cell_lon)
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    calls = []
+
+    def get_forecast(lat, lon, day, units, use_cache=True):
+        assert use_cache is False
+        calls.append((lat, lon, day))
+        return {"date": str(day), "temp_max": lat}
+
+    monkeypatch.setattr(dynamic, "get_forecast", get_forecast)
+    return calls
+
+
+def test_fetch_batch_fetches_each_cell_day_once(upstream):
+    days = [DAY + timedelta(days=i) for i in range(3)]
+    bucket = FreeBucket()
+    stats = {"sites": 0, "fetches": 0}
+    forecasts = {}
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        rows, daily_rows, failures = dynamic.fetch_batch(
+            executor, bucket, BATCH, days, forecasts=forecasts, stats=stats
+        )
+        # The next batch reuses the run's forecasts instead of fetching again.
+        dynamic.fetch_batch(executor, bucket, BATCH[:1], days, forecasts=forecasts, stats=stats)
+
+    assert len(upstream) == bucket.tokens == 2 * 3
+    assert stats == {"sites": 4, "fetches": 6}
+    assert failures == 0
+    assert [site_id for site_id, _ in rows] == [1, 2, 3]
+
+    # One daily row per site and day, and every key is fetched exactly once.
+    keys = [row[:4] for row in daily_rows]
+    assert len(keys) == 3 * 3
+    assert set(keys) == {(lat, lon, "imperial", day) for lat, lon, day in upstream}
+
+
+def test_fetch_batch_counts_failures(upstream, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("down")
+
+    monkeypatch.setattr(dynamic, "get_forecast", broken)
+    monkeypatch.setattr(dynamic.traceback, "print_exc", lambda: None)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        rows, daily_rows, failures = dynamic.fetch_batch(executor, FreeBucket(), BATCH, [DAY])
+    assert (rows, daily_rows, failures) == ([], [], 3)
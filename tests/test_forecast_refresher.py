@@ -0,0 +1,111 @@
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+
+import weather
+from weather import ForecastRefresher, RefreshQueueFull
+
+KEY = (38.2, -120.0, "2026-07-01", "imperial")
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """Replace the upstream fetch; tests decide what each call does."""
+    calls = []
+    behaviour = {"result": {"temp_max": 80}, "gate": None}
+
+    def refresh(*key):
+        calls.append(key)
+        if behaviour["gate"] is not None:
+            behaviour["gate"].wait(5)
+        if isinstance(behaviour["result"], Exception):
+            raise behaviour["result"]
+        return behaviour["result"]
+
+    monkeypatch.setattr(weather, "refresh_daily_forecast", refresh)
+    return calls, behaviour
+
+
+def test_same_key_is_fetched_once(fetches):
+    calls, behaviour = fetches
+    behaviour["gate"] = threading.Event()
+    refresher = ForecastRefresher(workers=1, rate=1000, burst=1000)
+
+    first = refresher.request(KEY)
+    second = refresher.request(KEY)
+    assert first is second
+    behaviour["gate"].set()
+    assert first.result(timeout=5) == {"temp_max": 80}
+    assert len(calls) == 1
+    assert refresher.stats["deduped"] == 1
+
+
+def test_failed_key_backs_off(fetches, monkeypatch, caplog):
+    calls, behaviour = fetches
+    behaviour["result"] = RuntimeError("upstream down")
+    refresher = ForecastRefresher(workers=1, rate=1000, burst=1000, failure_backoff=60)
+
+    with caplog.at_level(logging.ERROR, logger="weather"):
+        with pytest.raises(RuntimeError):
+            refresher.request(KEY).result(timeout=5)
+    # The worker logs the failure with its traceback before failing the future.
+    [log] = caplog.records
+    assert "Forecast refresh failed" in log.getMessage() and log.exc_info[0] is RuntimeError
+    # Within the backoff the stored error comes straight back, no new fetch.
+    with pytest.raises(RuntimeError):
+        refresher.request(KEY).result(timeout=0)
+    assert len(calls) == 1
+    assert refresher.stats["backed_off"] == 1
+
+    # Once it expires the key is queued again.
+    clock = weather.time.monotonic() + 61
+    monkeypatch.setattr(weather.time, "monotonic", lambda: clock)
+    behaviour["result"] = {"temp_max": 70}
+    assert refresher.request(KEY).result(timeout=5) == {"temp_max": 70}
+    assert len(calls) == 2
+
+
+def test_queue_is_bounded(fetches):
+    calls, behaviour = fetches
+    behaviour["gate"] = threading.Event()
+    refresher = ForecastRefresher(workers=1, rate=1000, burst=1000, queue_size=2)
+
+    futures = [refresher.request(KEY[:2] + (f"day-{i}", "imperial")) for i in range(4)]
+    # One is being fetched, two wait in the queue, the last is turned away
+    # (or, if the worker hasn't picked one up yet, the last two are).
+    rejected = [f for f in futures if f.done() and isinstance(f.exception(), RefreshQueueFull)]
+    assert 1 <= len(rejected) <= 2
+    assert refresher.stats["rejected"] == len(rejected)
+    behaviour["gate"].set()
+
+
+def test_refresh_reads_through_the_forecast_cache(monkeypatch):
+    upstream = []
+    monkeypatch.setattr(weather, "_fetch_forecast", lambda *args: upstream.append(args) or {"temp_max": 75})
+    monkeypatch.setattr(weather, "WEATHER_CACHE_PATH", "")
+    monkeypatch.setattr(weather, "_memory_cache", weather.TTLCache(maxsize=8, ttl=60))
+    stored = []
+    monkeypatch.setattr(weather, "upsert_daily_forecasts", lambda cur, rows: stored.extend(rows))
+
+    class Conn:
+        def cursor(self):
+            return None
+
+    @contextmanager
+    def connection():
+        yield Conn()
+
+    monkeypatch.setattr(weather, "get_connection", connection)
+    before = weather.cache_stats()
+
+    day = date(2026, 7, 1)
+    assert weather.refresh_daily_forecast(38.2, -120.0, day) == {"temp_max": 75}
+    assert weather.refresh_daily_forecast(38.2, -120.0, day) == {"temp_max": 75}
+    assert len(upstream) == 1
+    assert len(stored) == 2
+    after = weather.cache_stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["memory_hits"] - before["memory_hits"] == 1
@@ -0,0 +1,49 @@
+import math
+
+import pytest
+
+from geo import bbox_around, haversine_km, intersect_bbox, parse_bbox, parse_point
+
+
+def test_parse_bbox():
+    assert parse_bbox("-121.5,37,-119,38.5") == (-121.5, 37.0, -119.0, 38.5)
+
+
+@pytest.mark.parametrize("text", ["1,2,3", "a,b,c,d", "-119,37,-121,38", "-121,38,-119,37"])
+def test_parse_bbox_rejects_bad_boxes(text):
+    with pytest.raises(ValueError):
+        parse_bbox(text)
+
+
+def test_parse_point():
+    assert parse_point("38.2,-120.0") == (38.2, -120.0)
+    with pytest.raises(ValueError):
+        parse_point("91,0")
+    with pytest.raises(ValueError):
+        parse_point("38")
+
+
+def test_intersect_bbox():
+    assert intersect_bbox((-122, 36, -119, 39), (-120, 37, -118, 40)) == (-120, 37, -119, 39)
+    # Touching edges still overlap.
+    assert intersect_bbox((-122, 36, -120, 39), (-120, 36, -118, 39)) == (-120, 36, -120, 39)
+
+
+def test_intersect_bbox_disjoint():
+    assert intersect_bbox((-122, 36, -121, 37), (-119, 38, -118, 39)) is None
+    assert intersect_bbox((-122, 36, -118, 37), (-122, 38, -118, 39)) is None
+
+
+def test_bbox_around_contains_the_circle():
+    lat, lon, radius = 38.0, -120.0, 50
+    west, south, east, north = bbox_around(lat, lon, radius)
+    assert haversine_km(lat, lon, [north], [lon])[0] == pytest.approx(radius, rel=1e-6)
+    assert haversine_km(lat, lon, [lat], [east])[0] <= radius + 1e-6
+    assert west < lon < east and south < lat < north
+
+
+def test_haversine_km():
+    # One degree of latitude is ~111.2 km.
+    distances = haversine_km(0.0, 0.0, [1.0, 0.0], [0.0, 0.0])
+    assert distances[0] == pytest.approx(math.radians(1) * 6371.0088)
+    assert distances[1] == 0
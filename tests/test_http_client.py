@@ -0,0 +1,145 @@
+import pytest
+import requests
+
+import http_client
+from http_client import CircuitBreaker, CircuitOpenError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(http_client.time, "monotonic", clock)
+    return clock
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(threshold=3, reset_seconds=30)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.trips == 1
+    assert not breaker.allow()
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(threshold=2, reset_seconds=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.now += 31
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens(clock):
+    breaker = CircuitBreaker(threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.now += 31
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.trips == 2
+    clock.now += 31
+    assert breaker.allow()
+
+
+def test_released_trial_can_be_retried(clock):
+    breaker = CircuitBreaker(threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.now += 31
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+@pytest.fixture
+def host(monkeypatch, clock):
+    monkeypatch.setattr(http_client, "_hosts", {})
+    monkeypatch.setattr(http_client, "_hosts_pid", None)
+    monkeypatch.setattr(http_client.time, "sleep", lambda seconds: None)
+    host = http_client._host("upstream.test")
+    host.breaker.threshold = 1
+    return host
+
+
+def raising(exc):
+    def request(*args, **kwargs):
+        raise exc
+    return request
+
+
+@pytest.mark.parametrize(
+    "exc",
+    [requests.exceptions.ChunkedEncodingError(), requests.exceptions.TooManyRedirects(), ValueError("hook")],
+)
+def test_trial_is_always_released(host, clock, monkeypatch, exc):
+    monkeypatch.setattr(host.session, "request", raising(requests.ConnectionError()))
+    with pytest.raises(requests.ConnectionError):
+        http_client.get("https://upstream.test/x", retries=0)
+    assert host.breaker.state == "open"
+
+    clock.now += http_client.HTTP_BREAKER_RESET_SECONDS + 1
+    monkeypatch.setattr(host.session, "request", raising(exc))
+    with pytest.raises(type(exc)):
+        http_client.get("https://upstream.test/x", retries=0)
+
+    # Whatever the trial raised, the breaker isn't stuck half-open: either it
+    # re-opened (the host misbehaved) or the next call gets the trial.
+    if host.breaker.state == "open":
+        clock.now += http_client.HTTP_BREAKER_RESET_SECONDS + 1
+    assert host.breaker.allow()
+
+
+def test_open_breaker_fails_fast(host, monkeypatch):
+    calls = []
+
+    def request(*args, **kwargs):
+        calls.append(1)
+        raise requests.ConnectionError()
+
+    monkeypatch.setattr(host.session, "request", request)
+    with pytest.raises(requests.ConnectionError):
+        http_client.get("https://upstream.test/x", retries=3)
+    with pytest.raises(CircuitOpenError):
+        http_client.get("https://upstream.test/x")
+    # The breaker opened after the first failure, so no retries went out.
+    assert len(calls) == 1
+    assert host.stats["rejected"] == 2
+
+
+def test_every_attempt_is_timed_for_the_request(host, monkeypatch):
+    recorded = []
+    monkeypatch.setattr(http_client.timing, "record", lambda kind, seconds: recorded.append(kind))
+    host.breaker.threshold = 10
+    monkeypatch.setattr(host.session, "request", raising(requests.Timeout()))
+    with pytest.raises(requests.Timeout):
+        http_client.get("https://upstream.test/x", retries=2)
+    monkeypatch.setattr(host.session, "request", raising(requests.exceptions.TooManyRedirects()))
+    with pytest.raises(requests.exceptions.TooManyRedirects):
+        http_client.get("https://upstream.test/x")
+    assert recorded == ["http"] * 4
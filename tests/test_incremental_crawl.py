@@ -0,0 +1,104 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from scripts import pull_static_info_for_park as crawl
+from scripts.page_cache import PageCache, PageFetchError
+
+FOREST = "r05/stanislaus"
+URLS = [f"https://www.fs.usda.gov/recarea/stanislaus/recarea/?recid={i}" for i in (1, 2, 3)]
+
+
+def record(overview):
+    return dict(dict.fromkeys(crawl.CAMPSITE_FIELDS), overview=overview, body_of_water=False)
+
+
+def crawl_result(records):
+    """What scrape_forest_static_data returns for URLS with these records."""
+    df = pd.DataFrame(
+        {
+            "site_name": [f"Site {i}" for i in range(len(records))],
+            "site_url": URLS[: len(records)],
+            "park_name": "Stanislaus National Forest",
+            "park_url": "https://www.fs.usda.gov/r05/stanislaus",
+        }
+    )
+    for col in crawl.CAMPSITE_FIELDS:
+        df[col] = [r[col] for r in records]
+    return df
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PageCache(str(tmp_path / "pages.sqlite3"))
+
+
+def fake_forest(monkeypatch, records, failed=()):
+    def scrape(url, save_html_dir=None, cache=None, failures=None):
+        for u in failed:
+            failures[u] = "PageFetchError: boom"
+        return crawl_result([dict.fromkeys(crawl.CAMPSITE_FIELDS) if u in failed else r for u, r in zip(URLS, records)])
+
+    monkeypatch.setattr(crawl, "scrape_forest_static_data", scrape)
+
+
+def test_failed_page_keeps_its_previous_row(tmp_path, cache, monkeypatch):
+    out = str(tmp_path / "parquet")
+    fake_forest(monkeypatch, [record("a"), record("b")])
+    crawl.scrape_incremental(FOREST, out, cache)
+
+    fake_forest(monkeypatch, [record("a"), record("b")], failed=[URLS[1]])
+    changes = crawl.scrape_incremental(FOREST, out, cache)
+
+    assert changes["changed"] == [] and changes["removed"] == []
+    assert changes["failed"] == {URLS[1]: "PageFetchError: boom"}
+    stored = pd.read_parquet(crawl.partition_path(out, FOREST))
+    assert list(stored["overview"]) == ["a", "b"]
+
+
+def test_failed_new_page_uses_the_cached_record_or_is_skipped(cache):
+    def get(url, headers=None):
+        return type("Response", (), {"status_code": 200, "text": "<html/>", "content": b"<html/>", "headers": {}})()
+
+    _, _, sha256 = cache.fetch(URLS[0], get)
+    cache.save_record(URLS[0], record("cached"), sha256)
+
+    df = crawl_result([dict.fromkeys(crawl.CAMPSITE_FIELDS)] * 2)
+    kept = crawl.keep_previous_rows(df, {URLS[0]: "x", URLS[1]: "y"}, None, cache)
+    assert list(kept["site_url"]) == [URLS[0]]
+    assert kept["overview"][0] == "cached"
+
+
+def test_failed_forest_leaves_its_partition_and_the_run_goes_on(tmp_path, cache, monkeypatch):
+    out = str(tmp_path / "parquet")
+    fake_forest(monkeypatch, [record("a")])
+    crawl.scrape_incremental(FOREST, out, cache)
+    before = os.path.getmtime(crawl.partition_path(out, FOREST))
+
+    def listing_fails(url, save_html_dir=None, cache=None, failures=None):
+        raise PageFetchError(url, 503)
+
+    monkeypatch.setattr(crawl, "scrape_forest_static_data", listing_fails)
+    changes = crawl.scrape_incremental(FOREST, out, cache)
+    assert "503" in changes["error"] and not changes["written"]
+    assert os.path.getmtime(crawl.partition_path(out, FOREST)) == before
+
+    fake_forest(monkeypatch, [record("a")], failed=[URLS[0]])
+    other = crawl.scrape_incremental("r05/sierra", out, cache)
+    manifest = crawl.write_manifest(out, {FOREST: changes, "r05/sierra": other}, cache)
+    assert manifest["totals"]["failed"] == 1
+    assert manifest["totals"]["failed_forests"] == 1
+    with open(os.path.join(out, crawl.MANIFEST_NAME)) as f:
+        assert json.load(f)["forests"][FOREST]["error"] == changes["error"]
+
+
+def test_scrape_campsite_records_its_failure(cache, monkeypatch):
+    def error_page(url, headers=None):
+        return type("Response", (), {"status_code": 500, "text": "oops", "content": b"oops", "headers": {}})()
+
+    monkeypatch.setattr(crawl, "polite_get", error_page)
+    failures = {}
+    assert crawl.scrape_campsite(URLS[0], cache=cache, failures=failures) == dict.fromkeys(crawl.CAMPSITE_FIELDS)
+    assert failures == {URLS[0]: f"PageFetchError: {URLS[0]} returned HTTP 500"}
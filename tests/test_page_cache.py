@@ -0,0 +1,102 @@
+import hashlib
+
+import pytest
+
+from scripts.page_cache import PageCache, PageFetchError
+
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.headers = headers or {}
+
+
+class FakeServer:
+    """``get(url, headers=...)`` that answers from a queue of responses."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent_headers = []
+
+    def __call__(self, url, headers=None):
+        self.sent_headers.append(headers)
+        return self.responses.pop(0)
+
+
+URL = "https://www.fs.usda.gov/recarea/example"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PageCache(str(tmp_path / "pages.sqlite3"))
+
+
+def sha(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def test_new_page_is_stored_and_record_saved(cache):
+    text, entry, digest = cache.fetch(URL, FakeServer(FakeResponse(200, "<p>v1</p>", {"ETag": '"a"'})))
+    assert (text, entry, digest) == ("<p>v1</p>", None, sha("<p>v1</p>"))
+
+    cache.save_record(URL, {"water": "yes"}, digest)
+    stored = cache.lookup(URL)
+    assert stored["etag"] == '"a"'
+    assert stored["record"] == {"water": "yes"}
+    assert cache.stats["new"] == 1
+
+
+def test_not_modified_reuses_entry_and_sends_validators(cache):
+    cache.fetch(URL, FakeServer(FakeResponse(200, "body", {"ETag": '"a"', "Last-Modified": "Mon"})))
+    cache.save_record(URL, {"water": "yes"}, sha("body"))
+
+    server = FakeServer(FakeResponse(304, "", {"ETag": '"b"'}))
+    text, entry, digest = cache.fetch(URL, server)
+    assert server.sent_headers == [{"If-None-Match": '"a"', "If-Modified-Since": "Mon"}]
+    assert text == "body"
+    assert entry["record"] == {"water": "yes"}
+    assert digest == sha("body")
+    assert cache.lookup(URL)["etag"] == '"b"'
+    assert cache.stats["not_modified"] == 1
+
+
+def test_same_body_counts_as_unchanged(cache):
+    cache.fetch(URL, FakeServer(FakeResponse(200, "body")))
+    text, entry, digest = cache.fetch(URL, FakeServer(FakeResponse(200, "body")))
+    assert entry is not None and digest == sha("body")
+    assert cache.stats["same_hash"] == 1
+
+
+def test_changed_body_drops_old_record(cache):
+    cache.fetch(URL, FakeServer(FakeResponse(200, "v1")))
+    cache.save_record(URL, {"water": "yes"}, sha("v1"))
+
+    _, entry, digest = cache.fetch(URL, FakeServer(FakeResponse(200, "v2")))
+    assert entry is None and digest == sha("v2")
+    assert cache.lookup(URL)["record"] is None
+    assert cache.stats["changed"] == 1
+
+
+def test_error_page_raises_and_keeps_good_record(cache):
+    cache.fetch(URL, FakeServer(FakeResponse(200, "good")))
+    cache.save_record(URL, {"water": "yes"}, sha("good"))
+
+    with pytest.raises(PageFetchError) as excinfo:
+        cache.fetch(URL, FakeServer(FakeResponse(503, "Service Unavailable")))
+    assert excinfo.value.status_code == 503
+
+    # The next unchanged fetch still serves the record parsed from "good".
+    _, entry, _ = cache.fetch(URL, FakeServer(FakeResponse(304)))
+    assert entry["text"] == "good"
+    assert entry["record"] == {"water": "yes"}
+
+
+def test_record_for_a_replaced_body_is_not_saved(cache):
+    cache.fetch(URL, FakeServer(FakeResponse(200, "v1")))
+    cache.fetch(URL, FakeServer(FakeResponse(200, "v2")))
+
+    # A record parsed from v1 arriving after v2 was stored is dropped.
+    cache.save_record(URL, {"water": "stale"}, sha("v1"))
+    assert cache.lookup(URL)["record"] is None
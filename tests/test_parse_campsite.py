@@ -0,0 +1,38 @@
+import glob
+import os
+
+import pytest
+
+from scripts.bench_parse_campsite import _safe, legacy_parse_campsite_page
+from scripts.pull_static_info_for_park import HTML_PARSER, parse_campsite_page
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "campsite_pages")
+FIXTURES = sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html")))
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.mark.skipif(bool(os.getenv("SCRAPER_HTML_PARSER")), reason="parser overridden")
+def test_default_parser_is_html_parser():
+    assert HTML_PARSER == "html.parser"
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=os.path.basename)
+def test_matches_legacy_extraction(path):
+    html = read(path)
+    assert _safe(parse_campsite_page, html) == _safe(legacy_parse_campsite_page, html)
+
+
+def test_unclosed_paragraphs_keep_legacy_fields():
+    # html.parser nests unclosed <p>s, and the stored data was built that way.
+    record = parse_campsite_page(read(os.path.join(FIXTURES_DIR, "r05_stanislaus_recarea_recid_14980.html")))
+    assert record["latitude"] == "38.1Longitude: -120.2From Sonora take 108 east to Spring Gap Road."
+    assert record["restrooms"] == "Restroom: VaultNo water"
+
+
+def test_non_campsite_page_raises():
+    with pytest.raises(AttributeError):
+        parse_campsite_page(read(os.path.join(FIXTURES_DIR, "r05_sierra_recarea_notacampsite.html")))
@@ -0,0 +1,64 @@
+import pytest
+
+import search
+from campsite_store import CampsiteStore
+
+ROWS = [
+    (1, "Pinecrest", "Stanislaus National Forest", 38.19, -119.99, True, None, True, True),
+    (2, "Pine Marten", "Stanislaus National Forest", 38.40, -119.77, False, None, True, None),
+    (3, "Big Pine Creek", "Inyo National Forest", 37.12, -118.43, True, None, None, True),
+    (4, "Aspen Group", "Inyo National Forest", 37.40, -118.60, None, None, False, False),
+    (5, "Lone Camp", None, 36.00, -118.00, True, None, True, False),
+    (6, "Lake Alpine", "Stanislaus National Forest", 38.48, -120.00, True, None, True, True),
+]
+
+
+@pytest.fixture(autouse=True)
+def store(monkeypatch):
+    store = CampsiteStore(ROWS, version=1)
+    monkeypatch.setattr(search, "SEARCH_IN_MEMORY", True)
+    monkeypatch.setattr(search, "get_store", lambda: store)
+    monkeypatch.setattr(search, "get_data_version", lambda: 1)
+    search._result_cache.clear()
+    yield store
+    search._result_cache.clear()
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [{}, {"is_open": True}, {"has_water": True, "forest": "stan"}, {"bbox": (-119, 37, -118, 38)}, {"forest": "nope"}],
+)
+def test_browse_facets_match_counting_every_row(store, filters):
+    page = search.search_campsites_page(page_size=2, facets=True, **filters)
+    assert page["facets"] == search._facet_counts(store.filter(**filters))
+
+
+def test_browse_facets_do_not_run_the_full_search(monkeypatch):
+    def full_search(*args):
+        raise AssertionError("browse should page with the keyset, not the full match list")
+
+    monkeypatch.setattr(search, "_cached_search", full_search)
+    page = search.search_campsites_page(page_size=2, facets=True)
+    assert [r["id"] for r in page["results"]] == [5, 4]
+    assert page["facets"]["total"] == 6
+    assert page["facets"]["forests"][0] == {"forest_name": "Stanislaus National Forest", "count": 3}
+
+
+def test_limit_builds_only_the_returned_dicts(monkeypatch):
+    built = []
+    to_result = search._row_to_result
+
+    def counting(row, score=None):
+        built.append(row[0])
+        return to_result(row, score)
+
+    monkeypatch.setattr(search, "_row_to_result", counting)
+    results, facets = search.search_campsites("pine", limit=1, facets=True)
+    assert len(results) == 1 and len(built) == 1
+    assert facets["total"] > 1
+
+
+def test_text_pages_join_up_to_the_full_list():
+    full = search.search_campsites("pine", limit=None)
+    paged = list(search.iter_search_results("pine", page_size=1))
+    assert paged == full
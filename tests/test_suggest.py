@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+import suggest
+
+ROWS = [
+    (1, "Pine", "Stanislaus National Forest"),
+    (2, "Pine", "Inyo National Forest"),
+    (3, "Pine", "Sierra National Forest"),
+    (4, "Pine Creek", "Inyo National Forest"),
+    (5, "Big Pine Creek", "Inyo National Forest"),
+    (6, "Pinecrest", "Stanislaus National Forest"),
+    (7, "Creekside", "Sierra National Forest"),
+    (8, "Lake Alpine", "Stanislaus National Forest"),
+]
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = suggest.build_index(ROWS)
+    monkeypatch.setattr(suggest, "get_index", lambda: index)
+    return index
+
+
+def labels(suggestions):
+    return [s["label"] for s in suggestions]
+
+
+def test_same_label_is_suggested_once(index):
+    assert labels(suggest.suggest("pine")) == ["Pine", "Pine Creek", "Big Pine Creek", "Pinecrest"]
+
+
+def test_word_starts_and_forests_are_indexed(index):
+    assert labels(suggest.suggest("creek")) == ["Pine Creek", "Big Pine Creek", "Creekside"]
+    assert suggest.suggest("inyo") == [{"type": "forest", "label": "Inyo National Forest"}]
+
+
+def test_typos_fill_the_page(index):
+    assert "Pinecrest" in labels(suggest.suggest("pinr cr"))
+
+
+def test_limit(index):
+    assert len(suggest.suggest("p", limit=2)) == 2
+    assert suggest.suggest("   ") == []
+
+
+def test_precomputed_prefixes_match_scanning_the_range(index, monkeypatch):
+    prefixes = sorted({key[:n] for key in index["keys"] for n in range(1, suggest.TOP_PREFIX_LENGTH + 1)})
+    assert prefixes
+    # Rebuild with nothing precomputed so every prefix takes the range path.
+    monkeypatch.setattr(suggest, "TOP_PREFIX_LENGTH", 0)
+    scanned = suggest.build_index(ROWS)
+    assert scanned["top"] == {}
+    rng = random.Random(3)
+    for prefix in prefixes:
+        limit = rng.randint(1, suggest.MAX_LIMIT)
+        expected = suggest._prefix_matches(scanned, prefix, limit)
+        monkeypatch.setattr(suggest, "TOP_PREFIX_LENGTH", 4)
+        assert suggest._prefix_matches(index, prefix, limit) == expected
+        monkeypatch.setattr(suggest, "TOP_PREFIX_LENGTH", 0)
@@ -0,0 +1,41 @@
+import pytest
+
+import timing
+
+
+class Stats:
+    def __init__(self):
+        self.calls = []
+
+    def add(self, kind, seconds):
+        self.calls.append((kind, seconds))
+
+
+@pytest.fixture
+def stats():
+    stats = Stats()
+    token = timing.request_stats.set(stats)
+    yield stats
+    timing.request_stats.reset(token)
+
+
+def test_timed_records_into_the_current_request(stats, monkeypatch):
+    monkeypatch.setattr(timing, "ENABLED", True)
+    with timing.timed("scoring"):
+        pass
+    with pytest.raises(KeyError):
+        with timing.timed("scoring"):
+            raise KeyError("still counted")
+    assert [kind for kind, _ in stats.calls] == ["scoring", "scoring"]
+    assert all(seconds >= 0 for _, seconds in stats.calls)
+
+
+def test_disabled_timer_is_a_no_op(stats, monkeypatch):
+    monkeypatch.setattr(timing, "ENABLED", False)
+    with timing.timed("scoring"):
+        pass
+    assert stats.calls == []
+
+
+def test_record_outside_a_request_does_nothing():
+    timing.record("db", 1.0)
@@ -0,0 +1,45 @@
+import sqlite3
+
+import pytest
+
+import weather
+
+
+@pytest.fixture
+def disk_cache(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache" / "weather.sqlite3")
+    monkeypatch.setattr(weather, "WEATHER_CACHE_PATH", path)
+    monkeypatch.setattr(weather, "_disk_ready_path", None)
+    return path
+
+
+def test_round_trip(disk_cache):
+    key = (38.2, -120.0, "2026-07-01", "imperial")
+    assert weather._disk_get(key) is None
+    weather._disk_set(key, {"temp_max": 80})
+    summary, ttl_left = weather._disk_get(key)
+    assert summary == {"temp_max": 80}
+    assert 0 < ttl_left <= weather.WEATHER_CACHE_TTL
+
+
+def test_schema_is_set_up_once_per_path(disk_cache, monkeypatch):
+    setups = []
+    setup = weather._setup_disk_cache
+    monkeypatch.setattr(weather, "_setup_disk_cache", lambda path: setups.append(path) or setup(path))
+
+    for i in range(3):
+        weather._disk_set(("k", i), {"i": i})
+        weather._disk_get(("k", i))
+    assert setups == [disk_cache]
+
+    with sqlite3.connect(disk_cache) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_deleted_cache_file_is_set_up_again(disk_cache):
+    weather._disk_set(("k",), {"a": 1})
+    with sqlite3.connect(disk_cache) as conn:
+        conn.execute("DROP TABLE forecasts")
+    assert weather._disk_get(("k",)) is None
+    weather._disk_set(("k",), {"a": 2})
+    assert weather._disk_get(("k",))[0] == {"a": 2}
@@ -0,0 +1,52 @@
+"""Per-request work timers, with no dependencies beyond the standard library.
+
+Code that does measurable work (fuzzy scoring, database queries, outbound
+HTTP calls) reports it here, and metrics.py turns it into histograms. Keeping
+this apart from metrics.py means the search and HTTP code can be timed
+without importing Flask, the database driver or the weather module.
+
+``request_stats`` holds the stats object of the request being handled (None
+outside one, in which case ``record`` does nothing). metrics.py sets it; any
+object with an ``add(kind, seconds)`` method will do.
+"""
+
+import contextvars
+import os
+import time
+from contextlib import nullcontext
+
+ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+_NOOP = nullcontext()
+
+# Stats for the request currently being handled (None outside a request).
+request_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+def record(kind, seconds):
+    """Attribute ``seconds`` of ``kind`` work to the current request, if any."""
+    stats = request_stats.get()
+    if stats is not None:
+        stats.add(kind, seconds)
+
+
+class _Timer:
+    __slots__ = ("kind", "started")
+
+    def __init__(self, kind):
+        self.kind = kind
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.kind, time.perf_counter() - self.started)
+        return False
+
+
+def timed(kind):
+    """``with timed("scoring"): ...`` -- a no-op when metrics are disabled."""
+    if not ENABLED:
+        return _NOOP
+    return _Timer(kind)
@@ -1,8 +1,183 @@
-import requests
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import psycopg2
+import queue
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from datetime import datetime
+from psycopg2.extras import execute_values
 
-# get forecast for ONE day
-def get_forecast(lat, lon, date):
+import http_client
+from cache import TTLCache
+from db import get_connection
+from ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Forecasts are cached per grid cell rather than per exact coordinate: a
+# day_summary forecast doesn't change between two campsites a few hundred
+# metres apart. 0.01 degrees is roughly 1 km.
+WEATHER_GRID_DEG = float(os.getenv("WEATHER_GRID_DEG", "0.01"))
+# How long a cached forecast is trusted before we ask OpenWeather again.
+WEATHER_CACHE_TTL = int(os.getenv("WEATHER_CACHE_TTL", str(3 * 60 * 60)))
+WEATHER_CACHE_SIZE = int(os.getenv("WEATHER_CACHE_SIZE", "4096"))
+# Shared on-disk store so every worker process (and the refresh scripts) see
+# each other's forecasts. Set to an empty string to keep the cache in memory.
+WEATHER_CACHE_PATH = os.getenv("WEATHER_CACHE_PATH", ".cache/weather.sqlite3")
+
+# Day-by-day forecasts are also kept in Postgres (daily_forecasts in
+# schema.sql), one row per grid cell and date. scripts/dynamic.py fills the
+# next few days ahead of time and page views read whole date ranges from it.
+# 0.05 degrees is about 5 km.
+FORECAST_GRID_DEG = float(os.getenv("WEATHER_FORECAST_GRID_DEG", "0.05"))
+# Stored days older than this are still served, flagged ``stale``, and
+# queued for the background refresher (stale-while-revalidate).
+FORECAST_MAX_AGE_HOURS = float(os.getenv("WEATHER_FORECAST_MAX_AGE_HOURS", "24"))
+# How long a request waits for days that aren't stored at all before
+# answering without them. Bounds page latency whatever OpenWeather does.
+FORECAST_WAIT_SECONDS = float(os.getenv("WEATHER_FORECAST_WAIT_SECONDS", "1.5"))
+# Background refresher threads per process and their call budget (the same
+# settings scripts/dynamic.py uses). The budget is per process: every web
+# worker and every refresh run gets its own bucket, so set WEATHER_API_RATE
+# to the OpenWeather quota divided by the number of processes that run at
+# the same time.
+REFRESH_WORKERS = int(os.getenv("WEATHER_REFRESH_WORKERS", "2"))
+REFRESH_RATE_PER_SEC = float(os.getenv("WEATHER_API_RATE", "10"))
+REFRESH_BURST = int(os.getenv("WEATHER_API_BURST", "20"))
+# Keys waiting for a refresher thread; beyond this new keys are turned away
+# (stale days are still served, missing ones show as unavailable).
+REFRESH_QUEUE_SIZE = int(os.getenv("WEATHER_REFRESH_QUEUE_SIZE", "256"))
+# After a failed fetch the key isn't tried again for this long, so a page
+# that keeps getting viewed doesn't requeue a failing call every time.
+REFRESH_FAILURE_BACKOFF_SECONDS = float(os.getenv("WEATHER_REFRESH_FAILURE_BACKOFF_SECONDS", "60"))
+
+# The day_summary fields we keep; also the typed columns of daily_forecasts.
+SUMMARY_FIELDS = ("precipitation_total", "temp_min", "temp_max", "cloud_cover_afternoon")
+
+_memory_cache = TTLCache(maxsize=WEATHER_CACHE_SIZE, ttl=WEATHER_CACHE_TTL)
+
+_stats_lock = threading.Lock()
+_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def snap_coordinate(value, grid=None):
+    """Round a latitude/longitude onto the cache grid."""
+    grid = WEATHER_GRID_DEG if grid is None else grid
+    return round(round(float(value) / grid) * grid, 6)
+
+
+def forecast_cache_key(lat, lon, date, units="imperial"):
+    """Cache key for one day's forecast: (snapped lat, snapped lon, date, units)."""
+    return (snap_coordinate(lat), snap_coordinate(lon), date.strftime("%Y-%m-%d"), units)
+
+
+# The cache file that has been set up (directory, WAL mode, table) in this
+# process, so lookups only have to connect and query.
+_disk_ready_path = None
+_disk_setup_lock = threading.Lock()
+
+
+def _setup_disk_cache(path):
+    global _disk_ready_path
+
+    with _disk_setup_lock:
+        if _disk_ready_path == path:
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, timeout=5)
+        try:
+            # WAL is a property of the file, so it sticks for later connections.
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS forecasts (
+                    cache_key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+                """
+            )
+        finally:
+            conn.close()
+        _disk_ready_path = path
+
+
+def _forget_disk_setup():
+    # After an error (e.g. the file was deleted) the next call sets it up again.
+    global _disk_ready_path
+    _disk_ready_path = None
+
+
+def _disk_connection():
+    path = WEATHER_CACHE_PATH
+    if _disk_ready_path != path:
+        _setup_disk_cache(path)
+    return sqlite3.connect(path, timeout=5)
+
+
+def _disk_get(key):
+    if not WEATHER_CACHE_PATH:
+        return None
+    try:
+        conn = _disk_connection()
+        try:
+            row = conn.execute(
+                "SELECT payload, fetched_at FROM forecasts WHERE cache_key = ?",
+                (json.dumps(key),),
+            ).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        # The disk cache is an optimisation; never fail a forecast over it.
+        _forget_disk_setup()
+        return None
+
+    if row is None:
+        return None
+    payload, fetched_at = row
+    age = time.time() - fetched_at
+    if age >= WEATHER_CACHE_TTL:
+        return None
+    return json.loads(payload), WEATHER_CACHE_TTL - age
+
+
+def _disk_set(key, summary):
+    if not WEATHER_CACHE_PATH:
+        return
+    try:
+        conn = _disk_connection()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO forecasts (cache_key, payload, fetched_at) VALUES (?, ?, ?)",
+                    (json.dumps(key), json.dumps(summary), time.time()),
+                )
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        _forget_disk_setup()
+
+
+def cache_stats():
+    """Hit/miss counters for the forecast cache (misses are upstream API calls)."""
+    with _stats_lock:
+        snapshot = dict(_stats)
+    lookups = snapshot["memory_hits"] + snapshot["disk_hits"] + snapshot["misses"]
+    hits = snapshot["memory_hits"] + snapshot["disk_hits"]
+    snapshot["hit_rate"] = hits / lookups if lookups else 0.0
+    snapshot["memory"] = _memory_cache.stats()
+    return snapshot
+
+
+def _fetch_forecast(lat, lon, date, units):
     """
     Calls OpenWeather One Call API and returns daily forecast data.
     """
@@ -13,11 +188,13 @@ def get_forecast(lat, lon, date):
         "lat": lat,
         "lon": lon,
         "date": date.strftime("%Y-%m-%d"),
-        "units": "imperial",  # or "metric" 
+        "units": units,  # "imperial" or "metric"
         "appid": API_KEY
     }
 
-    response = requests.get(url, params=params)
+    # Pooled keep-alive connection, timeouts, retries and the OpenWeather
+    # circuit breaker all come from http_client.
+    response = http_client.get(url, params=params)
     response.raise_for_status()
     data = response.json()
     # make a dictionary of the desired fields: precipitation, temp min, temp max, cloud cover
@@ -28,4 +205,291 @@ def get_forecast(lat, lon, date):
         "temp_max": data.get("temperature", {}).get("max"),
         "cloud_cover_afternoon": data.get("cloud_cover", {}).get("afternoon")
     }
-    return summary
\ No newline at end of file
+    return summary
+
+
+# get forecast for ONE day
+def get_forecast(lat, lon, date, units="imperial", use_cache=True):
+    """
+    Returns the daily forecast summary for the grid cell containing (lat, lon).
+
+    Checks the in-process cache, then the shared on-disk cache, and only then
+    calls OpenWeather. The upstream call uses the snapped cell coordinates so
+    the cached answer is valid for every campsite in that cell.
+    """
+    if not use_cache:
+        return _fetch_forecast(lat, lon, date, units)
+
+    key = forecast_cache_key(lat, lon, date, units)
+
+    summary = _memory_cache.get(key, None)
+    if summary is not None:
+        _count("memory_hits")
+        return summary
+
+    cached = _disk_get(key)
+    if cached is not None:
+        summary, ttl_left = cached
+        _count("disk_hits")
+        _memory_cache.set(key, summary, ttl=ttl_left)
+        return summary
+
+    _count("misses")
+    summary = _fetch_forecast(key[0], key[1], date, units)
+    _memory_cache.set(key, summary)
+    _disk_set(key, summary)
+    return summary
+
+
+def forecast_cell(lat, lon):
+    """The daily_forecasts grid cell ``(cell_lat, cell_lon)`` for a location."""
+    return snap_coordinate(lat, FORECAST_GRID_DEG), snap_coordinate(lon, FORECAST_GRID_DEG)
+
+
+def daily_forecast_row(cell, day, units, summary):
+    """One daily_forecasts row for ``upsert_daily_forecasts``."""
+    return (cell[0], cell[1], units, day, *(summary.get(field) for field in SUMMARY_FIELDS))
+
+
+def upsert_daily_forecasts(cur, rows):
+    """Insert or replace daily_forecasts rows (one statement, caller commits)."""
+    # ON CONFLICT can't touch the same row twice in one statement, so keep
+    # the last row for each key.
+    unique = {row[:4]: row for row in rows}
+    execute_values(
+        cur,
+        f"""
+        INSERT INTO daily_forecasts (cell_lat, cell_lon, units, forecast_date, {", ".join(SUMMARY_FIELDS)})
+        VALUES %s
+        ON CONFLICT (cell_lat, cell_lon, units, forecast_date) DO UPDATE
+        SET {", ".join(f"{field} = EXCLUDED.{field}" for field in SUMMARY_FIELDS)},
+            fetched_at = CURRENT_TIMESTAMP
+        """,
+        list(unique.values()),
+    )
+
+
+def _read_daily_forecasts(cell, start, end, units):
+    """Stored forecasts for ``cell`` between two dates: {date: (summary, age in seconds)}."""
+    with get_connection() as conn:
+        cur = conn.cursor()
+        # One range scan on the primary key.
+        cur.execute(
+            f"""
+            SELECT forecast_date, EXTRACT(EPOCH FROM NOW() - fetched_at), {", ".join(SUMMARY_FIELDS)}
+            FROM daily_forecasts
+            WHERE cell_lat = %s AND cell_lon = %s AND units = %s
+              AND forecast_date BETWEEN %s AND %s
+            """,
+            (cell[0], cell[1], units, start, end),
+        )
+        rows = cur.fetchall()
+        cur.close()
+
+    # Same shape as _fetch_forecast's summaries.
+    return {
+        day: ({"date": day.strftime("%Y-%m-%d"), **dict(zip(SUMMARY_FIELDS, values))}, float(age))
+        for day, age, *values in rows
+    }
+
+
+class ForecastPending(Exception):
+    """The day isn't stored yet; the background refresher is fetching it."""
+
+
+class RefreshQueueFull(Exception):
+    """Too many forecasts are already waiting to be fetched; try again later."""
+
+
+class ForecastRefresher:
+    """Background threads that fetch queued ``(cell_lat, cell_lon, date, units)`` keys.
+
+    A key that is already queued or being fetched isn't queued again; every
+    caller gets the same Future. A key whose fetch failed answers with that
+    error for ``failure_backoff`` seconds instead of being queued again, and
+    when ``queue_size`` keys are waiting new ones fail with RefreshQueueFull.
+    All calls share one TokenBucket -- per process, see REFRESH_RATE_PER_SEC.
+    Each result goes into daily_forecasts and the in-process cache. The
+    threads start on first use in each process (so a forking server gets its
+    own).
+    """
+
+    def __init__(
+        self,
+        workers=REFRESH_WORKERS,
+        rate=REFRESH_RATE_PER_SEC,
+        burst=REFRESH_BURST,
+        queue_size=REFRESH_QUEUE_SIZE,
+        failure_backoff=REFRESH_FAILURE_BACKOFF_SECONDS,
+    ):
+        self.workers = workers
+        self.bucket = TokenBucket(rate, burst)
+        self.queue_size = queue_size
+        self.failure_backoff = failure_backoff
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._inflight = {}
+        # key -> (monotonic time it may be retried, the error it failed with)
+        self._failed = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self.stats = {"queued": 0, "deduped": 0, "refreshed": 0, "failed": 0, "backed_off": 0, "rejected": 0}
+
+    def _start(self):
+        # Called with the lock held.
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._inflight = {}
+        self._failed = {}
+        for i in range(self.workers):
+            threading.Thread(target=self._run, name=f"forecast-refresh-{i}", daemon=True).start()
+
+    def request(self, key):
+        """Queue ``key`` for a refresh (once) and return its Future."""
+        with self._lock:
+            self._start()
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats["deduped"] += 1
+                return future
+
+            failed = self._failed.get(key)
+            if failed is not None:
+                retry_at, error = failed
+                if time.monotonic() < retry_at:
+                    self.stats["backed_off"] += 1
+                    return _failed_future(error)
+                del self._failed[key]
+
+            future = Future()
+            try:
+                self._queue.put_nowait(key)
+            except queue.Full:
+                self.stats["rejected"] += 1
+                return _failed_future(RefreshQueueFull(f"{self.queue_size} forecasts already queued"))
+            self._inflight[key] = future
+            self.stats["queued"] += 1
+        return future
+
+    def _remember_failure(self, key, error):
+        # Called with the lock held. Expired entries are swept now and then
+        # so keys that never come back don't pile up.
+        now = time.monotonic()
+        if len(self._failed) >= self.queue_size:
+            self._failed = {k: v for k, v in self._failed.items() if v[0] > now}
+        self._failed[key] = (now + self.failure_backoff, error)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            key = self._queue.get()
+            with self._lock:
+                future = self._inflight[key]
+            try:
+                self.bucket.acquire()
+                summary = refresh_daily_forecast(*key)
+            except Exception as e:
+                with self._lock:
+                    self.stats["failed"] += 1
+                    del self._inflight[key]
+                    self._remember_failure(key, e)
+                logger.exception("Forecast refresh failed for %s", key)
+                future.set_exception(e)
+            else:
+                with self._lock:
+                    self.stats["refreshed"] += 1
+                    del self._inflight[key]
+                future.set_result(summary)
+
+
+def _failed_future(error):
+    future = Future()
+    future.set_exception(error)
+    return future
+
+
+def refresh_daily_forecast(cell_lat, cell_lon, day, units="imperial"):
+    """Get one cell/day through get_forecast and store it in daily_forecasts.
+
+    Cell coordinates are already on the forecast cache's grid, so a forecast
+    another worker process fetched in the last ``WEATHER_CACHE_TTL`` comes
+    from the memory/disk cache instead of OpenWeather. That copy is stored as
+    fetched now; it is at most WEATHER_CACHE_TTL old, well inside
+    FORECAST_MAX_AGE_HOURS.
+    """
+    summary = get_forecast(cell_lat, cell_lon, day, units)
+    try:
+        with get_connection() as conn:
+            upsert_daily_forecasts(conn.cursor(), [daily_forecast_row((cell_lat, cell_lon), day, units, summary)])
+    except psycopg2.Error:
+        # The caller still gets the forecast; the next read just queues it again.
+        pass
+    return summary
+
+
+_refresher = ForecastRefresher()
+
+
+def refresher_stats():
+    """Counters for the background refresher (plus how many keys are queued)."""
+    with _refresher._lock:
+        snapshot = dict(_refresher.stats)
+    snapshot["pending"] = _refresher.pending()
+    snapshot["backing_off"] = len(_refresher._failed)
+    return snapshot
+
+
+def get_forecast_range(lat, lon, dates, units="imperial"):
+    """
+    Forecasts for several days, served from daily_forecasts without waiting
+    on OpenWeather (stale-while-revalidate).
+
+    All of ``dates`` is read with one indexed range query and every stored day
+    is returned straight away, with ``age_seconds`` and a ``stale`` flag.
+    Stale days are queued for the background refresher. Days with nothing
+    stored are queued too, and we wait up to ``FORECAST_WAIT_SECONDS`` for
+    them; any still missing come back with a ``ForecastPending`` error (or
+    the fetch's own error). Returns ``(date, summary, error)`` tuples in
+    ``dates`` order; a day that failed has ``summary=None`` and the exception
+    in ``error`` so callers can still show the days that worked.
+    """
+    if not dates:
+        return []
+
+    cell = forecast_cell(lat, lon)
+    try:
+        stored = _read_daily_forecasts(cell, min(dates), max(dates), units)
+    except psycopg2.Error:
+        # No table yet, or the database is down: everything goes through the
+        # refresher, which still returns what it fetched.
+        stored = {}
+
+    max_age = FORECAST_MAX_AGE_HOURS * 3600
+    served = {}
+    waiting = {}
+    for day in dates:
+        if day in stored:
+            summary, age = stored[day]
+            summary["age_seconds"] = round(age)
+            summary["stale"] = age > max_age
+            if summary["stale"]:
+                _refresher.request((cell[0], cell[1], day, units))
+            served[day] = (summary, None)
+        elif day not in waiting:
+            waiting[day] = _refresher.request((cell[0], cell[1], day, units))
+
+    deadline = time.monotonic() + FORECAST_WAIT_SECONDS
+    for day, future in waiting.items():
+        try:
+            summary = dict(future.result(timeout=max(0.0, deadline - time.monotonic())))
+            summary.update(age_seconds=0, stale=False)
+            served[day] = (summary, None)
+        except FutureTimeoutError:
+            served[day] = (None, ForecastPending(f"forecast for {day} is still being fetched"))
+        except Exception as e:
+            served[day] = (None, e)
+
+    return [(day, *served[day]) for day in dates]